@@ -0,0 +1,48 @@
+import logging
+
+from ..core.client import ZenodoClient
+from ..config.settings import ZENODO_API_URL
+
+logger = logging.getLogger(__name__)
+
+class ActionsAPI:
+    def __init__(self, client=None, base_url=None):
+        self.client = client or ZenodoClient()
+        # base_url is the depositions endpoint, e.g. ".../api/deposit/depositions"
+        self.base_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
+
+    def publish(self, deposition_id):
+        """Publishes a deposition draft, minting its DOI."""
+        url = f"{self.base_url}/{deposition_id}/actions/publish"
+        logger.info("Publishing deposition ID %s at: %s", deposition_id, url)
+        response = self.client.request("POST", url)
+        response.raise_for_status() # Raise an exception for bad status codes
+        logger.info("Deposition %s published successfully.", deposition_id)
+        return response.json()
+
+    def new_version(self, deposition_id):
+        """
+        Creates a new version draft of a published deposition, with the files
+        of the previous version already attached. Returns the draft; if one
+        already exists for this record, Zenodo returns that draft again.
+        """
+        url = f"{self.base_url}/{deposition_id}/actions/newversion"
+        logger.info("Creating a new version of deposition ID %s at: %s", deposition_id, url)
+        response = self.client.request("POST", url)
+        response.raise_for_status()
+        # The response describes the published record; the draft is behind links.latest_draft
+        draft_url = response.json()["links"]["latest_draft"]
+        response = self.client.request("GET", draft_url)
+        response.raise_for_status()
+        draft = response.json()
+        logger.info("New version draft %s created from deposition %s.", draft["id"], deposition_id)
+        return draft
+
+    def discard(self, deposition_id):
+        """Discards the unpublished changes of a draft (e.g. an abandoned new version)."""
+        url = f"{self.base_url}/{deposition_id}/actions/discard"
+        logger.info("Discarding draft ID %s at: %s", deposition_id, url)
+        response = self.client.request("POST", url)
+        response.raise_for_status()
+        logger.info("Draft %s discarded.", deposition_id)
+        return response.json()
@@ -0,0 +1,286 @@
+"""
+asyncio versions of DepositionAPI, FilesAPI and ActionsAPI, on
+AsyncZenodoClient. Method names and return values match the threaded
+classes; every method is a coroutine (``iter_*`` are async generators).
+
+    async with AsyncZenodoClient(token=TOKEN, max_concurrency=200) as client:
+        depositions = AsyncDepositionAPI(client, base_url)
+        drafts = await asyncio.gather(*(depositions.create_draft() for _ in range(1000)))
+"""
+import asyncio
+import functools
+import logging
+import os
+
+import requests
+
+from ..config.settings import UPLOAD_BLOCK_SIZE, ZENODO_API_URL
+from ..core.async_client import AsyncZenodoClient
+from ..core.hashing import HashingFileStream, file_checksum, normalize_checksum
+from .files import ChecksumMismatchError, IncompleteUploadError, _is_transient
+
+logger = logging.getLogger(__name__)
+
+
+class _FileBody:
+    """
+    Upload body for AsyncZenodoClient: each call (one per attempt) gives an
+    async generator over a fresh HashingFileStream, read and hashed off the
+    event loop. ``stream`` is the one of the last attempt.
+    """
+
+    def __init__(self, file_path, on_progress=None, algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE):
+        self.file_path = file_path
+        self.on_progress = on_progress
+        self.algorithms = algorithms
+        self.block_size = block_size
+        self.stream = None
+
+    def __call__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        loop = asyncio.get_running_loop()
+        self.close()
+        # Plain reads: aiohttp may still hold a block when the stream is closed
+        self.stream = await loop.run_in_executor(None, functools.partial(
+            HashingFileStream, self.file_path, algorithms=self.algorithms, block_size=self.block_size,
+            use_mmap=False, on_progress=self.on_progress))
+        blocks = iter(self.stream)
+        while True:
+            block = await loop.run_in_executor(None, next, blocks, None)
+            if block is None:
+                break
+            yield block
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+
+
+async def _iter_paginated(client, url, params=None, page_size=None, max_items=None, prefetch=True):
+    # Same rules as core.utils.iter_paginated: Link rel="next", else page numbers
+    params = dict(params or {})
+    if page_size:
+        params.setdefault("size", page_size)
+        params.setdefault("page", 1)
+    yielded = 0
+    pending = None
+    try:
+        response = await client.request("GET", url, params=params)
+        while response is not None:
+            response.raise_for_status()
+            items = response.json()
+            next_url = response.links.get("next", {}).get("url")
+            next_params = None
+            if not next_url and page_size and len(items) >= page_size:
+                next_url, next_params = url, {**params, "page": params.get("page", 1) + 1}
+            params = next_params if next_params is not None else params
+            needs_more = max_items is None or yielded + len(items) < max_items
+            if next_url and needs_more and prefetch:
+                pending = asyncio.ensure_future(client.request("GET", next_url, params=next_params))
+
+            for item in items:
+                yield item
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+            if not next_url or not needs_more:
+                return
+            if pending is not None:
+                response, pending = await pending, None
+            else:
+                response = await client.request("GET", next_url, params=next_params)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+class AsyncDepositionAPI:
+    def __init__(self, client=None, base_url=None):
+        self.client = client or AsyncZenodoClient()
+        # base_url is the depositions endpoint, e.g. ".../api/deposit/depositions"
+        self.base_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
+
+    async def list_depositions(self, params=None):
+        """Lists depositions for the authenticated user."""
+        response = await self.client.request("GET", self.base_url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def iter_depositions(self, params=None, page_size=100, max_items=None, sort="mostrecent", prefetch=True):
+        """Async generator over all depositions of the account, prefetching the next page."""
+        params = dict(params or {})
+        if sort:
+            params.setdefault("sort", sort)
+        async for deposition in _iter_paginated(self.client, self.base_url, params, page_size, max_items, prefetch):
+            yield deposition
+
+    async def get_deposition(self, deposition_id):
+        """Retrieves details for a specific deposition."""
+        response = await self.client.request("GET", f"{self.base_url}/{deposition_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def create_draft(self):
+        """Creates a new empty deposition draft."""
+        response = await self.client.request("POST", self.base_url, json={})
+        response.raise_for_status()
+        draft = response.json()
+        logger.debug("New deposition draft %s created.", draft.get("id"))
+        return draft
+
+    async def update_metadata(self, deposition_id, metadata):
+        """Updates the metadata for a specific deposition."""
+        response = await self.client.request("PUT", f"{self.base_url}/{deposition_id}", json={"metadata": metadata})
+        response.raise_for_status()
+        return response.json()
+
+
+class AsyncFilesAPI:
+    def __init__(self, client=None, base_url=None):
+        self.client = client or AsyncZenodoClient()
+        depositions_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
+        self.base_url_template = f"{depositions_url}/{{}}/files"
+
+    async def list_files_of_deposition(self, deposition_id):
+        """Lists files associated with a specific deposition ID."""
+        response = await self.client.request("GET", self.base_url_template.format(deposition_id))
+        response.raise_for_status()
+        return response.json()
+
+    async def iter_files_of_deposition(self, deposition_id, max_items=None, prefetch=True):
+        """Async generator over the files of a deposition, following pagination links."""
+        url = self.base_url_template.format(deposition_id)
+        async for f in _iter_paginated(self.client, url, max_items=max_items, prefetch=prefetch):
+            yield f
+
+    async def delete_file(self, deposition_id, file_id):
+        """Removes a file from a deposition draft."""
+        response = await self.client.request("DELETE", f"{self.base_url_template.format(deposition_id)}/{file_id}")
+        response.raise_for_status()
+
+    async def upload_file(self, deposition_id, bucket_url, file_path, retries=2, on_progress=None,
+                          algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE):
+        """
+        Streams a file into a deposition's bucket, read and hashed in one
+        pass off the event loop; same checksum retry, progress callback and
+        return value as FilesAPI.upload_file.
+        """
+        filename = os.path.basename(file_path)
+        size = os.path.getsize(file_path)
+        progress = None
+        if on_progress is not None:
+            def progress(sent, total, bytes_per_second):
+                on_progress(filename, sent, total, bytes_per_second)
+        algorithms = ("md5",) + tuple(a for a in algorithms if a != "md5")
+        for attempt in range(1, retries + 2):
+            body = _FileBody(file_path, progress, algorithms, block_size)
+            try:
+                response = await self.client.request("PUT", f"{bucket_url}/{filename}", data=body,
+                                                     headers={"Content-Length": str(size),
+                                                              "Content-Type": "application/octet-stream"})
+                response.raise_for_status()
+                if not body.stream.complete:
+                    raise IncompleteUploadError(f"only {body.stream.sent} of {size} bytes of {filename} were sent")
+                digests = body.stream.hexdigests()
+            finally:
+                body.close()
+            result = response.json()
+            remote = normalize_checksum(result.get("checksum"))
+            if remote == digests["md5"]:
+                logger.info("File %s uploaded to deposition %s. Status Code: %s", filename, deposition_id,
+                            response.status_code)
+                return {**result, "digests": digests}
+            error = ChecksumMismatchError(f"checksum mismatch (local {digests['md5']}, bucket {remote})")
+            if attempt > retries:
+                raise error
+            logger.warning("Upload of %s failed (attempt %s/%s): %s", filename, attempt, retries + 1, error)
+
+    async def upload_files(self, deposition_id, bucket_url, file_paths, max_in_flight=4, retries=3, skip_existing=False,
+                           on_progress=None, algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE):
+        """
+        Same contract as FilesAPI.upload_files: up to ``max_in_flight``
+        concurrent transfers, each retried on connection errors, timeouts,
+        5xx/429 or a checksum mismatch; a 4xx fails the file at once. Returns ``(uploaded, failed)``.
+        """
+        names = [os.path.basename(p) for p in file_paths]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate file names in one deposition: {', '.join(duplicates)}")
+
+        existing = {}
+        if skip_existing:
+            existing = {f["filename"]: normalize_checksum(f.get("checksum"))
+                        for f in await self.list_files_of_deposition(deposition_id)}
+        slots = asyncio.Semaphore(max(1, max_in_flight))
+        loop = asyncio.get_running_loop()
+
+        async def upload_one(file_path):
+            filename = os.path.basename(file_path)
+            async with slots:
+                size = os.path.getsize(file_path)
+                if filename in existing:
+                    md5 = await loop.run_in_executor(None, file_checksum, file_path)
+                    if existing[filename] == md5:
+                        return {"checksum": md5, "size": size, "attempts": 0, "digests": {"md5": md5}}
+                error = None
+                for attempt in range(1, retries + 2):
+                    try:
+                        # Mismatches are retried here, with the network errors
+                        result = await self.upload_file(deposition_id, bucket_url, file_path, retries=0,
+                                                        on_progress=on_progress, algorithms=algorithms,
+                                                        block_size=block_size)
+                        return {"checksum": result["digests"]["md5"], "size": size, "attempts": attempt,
+                                "digests": result["digests"]}
+                    except asyncio.TimeoutError as e:
+                        error = str(e) or type(e).__name__
+                    except (requests.exceptions.RequestException, ValueError, IOError) as e:
+                        if not _is_transient(e):
+                            raise
+                        error = str(e) or type(e).__name__
+                    logger.warning("Upload of %s failed (attempt %s/%s): %s", filename, attempt, retries + 1, error)
+                raise IOError(error)
+
+        results = await asyncio.gather(*(upload_one(p) for p in file_paths), return_exceptions=True)
+        uploaded, failed = {}, {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                failed[name] = str(result)
+            else:
+                uploaded[name] = result
+        logger.info("%s files uploaded, %s failed for deposition %s.", len(uploaded), len(failed), deposition_id)
+        return uploaded, failed
+
+    async def verify_checksums(self, deposition_id, expected):
+        """Returns (filename, expected, remote) for files missing or differing on the server."""
+        remote = {f["filename"]: normalize_checksum(f.get("checksum"))
+                  for f in await self.list_files_of_deposition(deposition_id)}
+        return [(name, md5, remote.get(name)) for name, md5 in sorted(expected.items()) if remote.get(name) != md5]
+
+
+class AsyncActionsAPI:
+    def __init__(self, client=None, base_url=None):
+        self.client = client or AsyncZenodoClient()
+        self.base_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
+
+    async def publish(self, deposition_id):
+        """Publishes a deposition draft, minting its DOI."""
+        response = await self.client.request("POST", f"{self.base_url}/{deposition_id}/actions/publish")
+        response.raise_for_status()
+        logger.info("Deposition %s published successfully.", deposition_id)
+        return response.json()
+
+    async def new_version(self, deposition_id):
+        """Creates (or returns the existing) new version draft of a published deposition."""
+        response = await self.client.request("POST", f"{self.base_url}/{deposition_id}/actions/newversion")
+        response.raise_for_status()
+        response = await self.client.request("GET", response.json()["links"]["latest_draft"])
+        response.raise_for_status()
+        return response.json()
+
+    async def discard(self, deposition_id):
+        """Discards the unpublished changes of a draft."""
+        response = await self.client.request("POST", f"{self.base_url}/{deposition_id}/actions/discard")
+        response.raise_for_status()
+        return response.json()
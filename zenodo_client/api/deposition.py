@@ -1,45 +1,63 @@
+import logging
+
 from ..core.client import ZenodoClient
+from ..core.utils import iter_paginated
 from ..config.settings import ZENODO_API_URL
 
+logger = logging.getLogger(__name__)
+
 class DepositionAPI:
-    def __init__(self):
-        self.client = ZenodoClient()
-        # Using the sandbox URL for development
-        self.base_url = f"{ZENODO_API_URL}/deposit/depositions"
+    def __init__(self, client=None, base_url=None):
+        self.client = client or ZenodoClient()
+        # base_url is the depositions endpoint, e.g. ".../api/deposit/depositions"
+        self.base_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
 
     def list_depositions(self, params=None):
         """Lists depositions for the authenticated user."""
         # Zenodo API might use pagination. This is a basic implementation.
-        print(f"Fetching depositions from: {self.base_url}")
+        logger.info("Fetching depositions from: %s", self.base_url)
         response = self.client.request("GET", self.base_url, params=params)
         response.raise_for_status() # Raise an exception for bad status codes
-        print("Depositions fetched successfully.")
+        logger.info("Depositions fetched successfully.")
         return response.json()
 
+    def iter_depositions(self, params=None, page_size=100, max_items=None, sort="mostrecent", prefetch=True):
+        """
+        Lazily iterates over all depositions of the authenticated user, page by
+        page, prefetching the next page in the background. Use ``max_items``
+        to stop after the newest N records.
+        """
+        params = dict(params or {})
+        if sort:
+            params.setdefault("sort", sort)
+        logger.info("Iterating depositions from: %s", self.base_url)
+        return iter_paginated(self.client, self.base_url, params=params, page_size=page_size,
+                              max_items=max_items, prefetch=prefetch)
+
     def get_deposition(self, deposition_id):
         """Retrieves details for a specific deposition."""
         url = f"{self.base_url}/{deposition_id}"
-        print(f"Fetching deposition with ID {deposition_id} from: {url}")
+        logger.info("Fetching deposition with ID %s from: %s", deposition_id, url)
         response = self.client.request("GET", url)
         response.raise_for_status() # Raise an exception for bad status codes
-        print(f"Deposition {deposition_id} fetched successfully.")
+        logger.info("Deposition %s fetched successfully.", deposition_id)
         return response.json()
 
     def create_draft(self):
         """Creates a new empty deposition draft."""
-        print(f"Creating a new deposition draft at: {self.base_url}")
+        logger.info("Creating a new deposition draft at: %s", self.base_url)
         # A POST request with an empty JSON body creates a new draft
         response = self.client.request("POST", self.base_url, json={})
         response.raise_for_status() # Raise an exception for bad status codes
-        print("New deposition draft created successfully.")
+        logger.info("New deposition draft created successfully.")
         return response.json()
 
     def update_metadata(self, deposition_id, metadata):
         """Updates the metadata for a specific deposition."""
         url = f"{self.base_url}/{deposition_id}"
         data = {"metadata": metadata}
-        print(f"Updating metadata for deposition ID {deposition_id} at: {url}")
+        logger.info("Updating metadata for deposition ID %s at: %s", deposition_id, url)
         response = self.client.request("PUT", url, json=data)
         response.raise_for_status() # Raise an exception for bad status codes
-        print(f"Metadata for deposition {deposition_id} updated successfully.")
+        logger.info("Metadata for deposition %s updated successfully.", deposition_id)
         return response.json()
\ No newline at end of file
@@ -1,38 +1,229 @@
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+
 from ..core.client import ZenodoClient
-from ..config.settings import ZENODO_API_URL
+from ..core.hashing import HashingFileStream, file_checksum, normalize_checksum
+from ..core.utils import iter_paginated
+from ..config.settings import UPLOAD_BLOCK_SIZE, ZENODO_API_URL
+
+logger = logging.getLogger(__name__)
+
+
+class ChecksumMismatchError(IOError):
+    """The bucket stored different bytes than the ones sent."""
+
+
+class IncompleteUploadError(IOError):
+    """The connection ended before the whole file was sent."""
+
+
+def _is_transient(error):
+    """
+    True if a failed upload attempt is worth repeating: the connection broke
+    or timed out, the server answered 5xx/429, or the bytes arrived damaged.
+    A 4xx (bad token, closed draft, quota) fails the same way every time.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status >= 500 or status == 429
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError, ChecksumMismatchError, IncompleteUploadError))
+
+
+def _put_streamed(put, url, file_path, on_progress=None, algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE,
+                  use_mmap=None):
+    """
+    One PUT of ``file_path`` as a HashingFileStream (read once, hashed while
+    sent). Returns the bucket's file entry plus ``digests``, after checking
+    the MD5 it reports against the local one.
+    """
+    filename = os.path.basename(file_path)
+    progress = None
+    if on_progress is not None:
+        def progress(sent, total, bytes_per_second):
+            on_progress(filename, sent, total, bytes_per_second)
+    # MD5 is what the bucket reports, so it is always computed
+    algorithms = ("md5",) + tuple(a for a in algorithms if a != "md5")
+    with HashingFileStream(file_path, algorithms=algorithms, block_size=block_size, use_mmap=use_mmap,
+                           on_progress=progress) as body:
+        response = put(url, body)
+        response.raise_for_status()
+        if not body.complete:
+            raise IncompleteUploadError(f"only {body.sent} of {body.size} bytes of {filename} were sent")
+        digests = body.hexdigests()
+    result = response.json()
+    remote = normalize_checksum(result.get("checksum"))
+    if remote != digests["md5"]:
+        raise ChecksumMismatchError(f"checksum mismatch (local {digests['md5']}, bucket {remote})")
+    logger.info("File %s uploaded successfully. Status Code: %s", filename, response.status_code)
+    return {**result, "digests": digests}
+
+
+def _retry_mismatch(send, filename, retries):
+    # Retryable statuses are the client's business; damaged or truncated bodies are ours
+    for attempt in range(1, retries + 2):
+        try:
+            return send()
+        except (ChecksumMismatchError, IncompleteUploadError) as e:
+            if attempt > retries:
+                raise
+            logger.warning("Upload of %s failed (attempt %s/%s): %s", filename, attempt, retries + 1, e)
+
 
 # Keep the direct upload function for now, as it targets a specific bucket URL
-def upload_file_to_bucket(bucket_url, file_path, token):
-    """Uploads a file to the given Zenodo bucket URL."""
-    print(f"Attempting to upload file {file_path} to {bucket_url}")
-    with open(file_path, "rb") as f:
-        filename = file_path.split("/")[-1]
-        # Note: Bucket upload often uses access_token query param
-        response = requests.put(
-            f"{bucket_url}/{filename}?access_token={token}",
-            data=f
-        )
-        # Note: Zenodo API returns 200 or 201 on success for uploads
-        response.raise_for_status() # Raise an exception for bad status codes (>=400)
-        print(f"File {filename} uploaded successfully. Status Code: {response.status_code}")
-        # The response might contain details about the uploaded file
-        return response.json()
+def upload_file_to_bucket(bucket_url, file_path, token=None, session=None, retries=2, on_progress=None,
+                          algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE, use_mmap=None, client=None):
+    """
+    Uploads a file to the given Zenodo bucket URL, streamed and verified like
+    FilesAPI.upload_file. Goes through ``client`` (or a ZenodoClient for
+    ``token`` on ``session``), so it is rate limited and retried like every
+    other request and the token travels in the Authorization header, never
+    in the URL where proxies and server logs would record it.
+    """
+    client = client or ZenodoClient(session=session, token=token)
+    logger.info("Attempting to upload file %s to %s", file_path, bucket_url)
+    filename = os.path.basename(file_path)
+    url = f"{bucket_url}/{filename}"
+    return _retry_mismatch(
+        lambda: _put_streamed(lambda u, body: client.request("PUT", u, data=body), url, file_path, on_progress,
+                              algorithms, block_size, use_mmap),
+        filename, retries)
 
 
 class FilesAPI:
-    def __init__(self):
-        self.client = ZenodoClient()
+    def __init__(self, client=None, base_url=None):
+        self.client = client or ZenodoClient()
         # Base URL for file operations related to a deposition
         # The full URL will be like f"{ZENODO_API_URL}/deposit/depositions/{deposition_id}/files"
-        self.base_url_template = f"{ZENODO_API_URL}/deposit/depositions/{{}}/files"
+        depositions_url = base_url or f"{ZENODO_API_URL}/deposit/depositions"
+        self.base_url_template = f"{depositions_url}/{{}}/files"
 
     def list_files_of_deposition(self, deposition_id):
         """Lists files associated with a specific deposition ID."""
         url = self.base_url_template.format(deposition_id)
-        print(f"Fetching files for deposition ID {deposition_id} from: {url}")
+        logger.info("Fetching files for deposition ID %s from: %s", deposition_id, url)
         # Use the ZenodoClient which handles authentication and retries
         response = self.client.request("GET", url)
         response.raise_for_status() # Raise an exception for bad status codes
-        print(f"Files for deposition {deposition_id} fetched successfully.")
-        return response.json()
\ No newline at end of file
+        logger.info("Files for deposition %s fetched successfully.", deposition_id)
+        return response.json()
+
+    def delete_file(self, deposition_id, file_id):
+        """Removes a file from a deposition draft."""
+        url = f"{self.base_url_template.format(deposition_id)}/{file_id}"
+        logger.info("Deleting file %s from deposition ID %s", file_id, deposition_id)
+        response = self.client.request("DELETE", url)
+        response.raise_for_status()
+        self.client.invalidate(self.base_url_template.format(deposition_id))
+        logger.info("File %s deleted from deposition %s.", file_id, deposition_id)
+
+    def upload_file(self, deposition_id, bucket_url, file_path, retries=2, on_progress=None, algorithms=("md5",),
+                    block_size=UPLOAD_BLOCK_SIZE, use_mmap=None):
+        """
+        Uploads a file to a deposition's bucket through the shared client
+        (rate limited, retried) and invalidates the cached file listing.
+
+        The file is read once, in ``block_size`` blocks (memory-mapped for
+        large files unless ``use_mmap`` says otherwise), and hashed as it is
+        sent; if the bucket's MD5 differs, it is sent again up to ``retries``
+        times. ``on_progress(filename, sent, total, bytes_per_second)``
+        reports the transfer. Returns the bucket's file entry plus
+        ``digests`` (algorithm -> hex digest, for ``algorithms``).
+        """
+        filename = os.path.basename(file_path)
+        logger.info("Uploading %s to deposition ID %s", filename, deposition_id)
+        url = f"{bucket_url}/{filename}"
+        try:
+            return _retry_mismatch(
+                lambda: _put_streamed(lambda u, body: self.client.request("PUT", u, data=body), url, file_path,
+                                      on_progress, algorithms, block_size, use_mmap),
+                filename, retries)
+        finally:
+            self.client.invalidate(self.base_url_template.format(deposition_id))
+
+    def upload_files(self, deposition_id, bucket_url, file_paths, max_in_flight=4, retries=3, skip_existing=False,
+                     on_progress=None, algorithms=("md5",), block_size=UPLOAD_BLOCK_SIZE, use_mmap=None):
+        """
+        Uploads many files into one deposition's bucket with up to
+        ``max_in_flight`` concurrent transfers. Each file is streamed and
+        hashed in one pass (see upload_file) and retried up to ``retries``
+        times on connection errors, timeouts, 5xx/429 responses or when the
+        checksum returned by the bucket does not match the local MD5; any
+        other error (e.g. a 4xx) fails the file at once. With ``skip_existing``, files already
+        in the deposition with the same checksum are not sent again.
+
+        Returns ``(uploaded, failed)``: filename -> {checksum, size, attempts,
+        digests} and filename -> error message.
+        """
+        names = [os.path.basename(p) for p in file_paths]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate file names in one deposition: {', '.join(duplicates)}")
+
+        existing = {}
+        if skip_existing:
+            existing = {f["filename"]: normalize_checksum(f.get("checksum"))
+                        for f in self.list_files_of_deposition(deposition_id)}
+
+        def put(url, body):
+            return self.client.request("PUT", url, data=body)
+
+        def upload_one(file_path):
+            filename = os.path.basename(file_path)
+            size = os.path.getsize(file_path)
+            if filename in existing:
+                # The only case that needs the hash before sending
+                md5 = file_checksum(file_path)
+                if existing[filename] == md5:
+                    return {"checksum": md5, "size": size, "attempts": 0, "digests": {"md5": md5}}
+            error = None
+            for attempt in range(1, retries + 2):
+                try:
+                    result = _put_streamed(put, f"{bucket_url}/{filename}", file_path, on_progress, algorithms,
+                                           block_size, use_mmap)
+                    return {"checksum": result["digests"]["md5"], "size": size, "attempts": attempt,
+                            "digests": result["digests"]}
+                except (requests.exceptions.RequestException, ValueError, IOError) as e:
+                    if not _is_transient(e):
+                        raise
+                    error = str(e)
+                logger.warning("Upload of %s failed (attempt %s/%s): %s", filename, attempt, retries + 1, error)
+            raise IOError(error)
+
+        uploaded, failed = {}, {}
+        logger.info("Uploading %s files to deposition ID %s (%s in flight)", len(file_paths), deposition_id, max_in_flight)
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="zenodo-bucket") as executor:
+            # Each transfer runs in a copy of this context, so its spans keep the caller's span as parent
+            futures = {executor.submit(contextvars.copy_context().run, upload_one, p): os.path.basename(p)
+                       for p in file_paths}
+            for future, filename in futures.items():
+                try:
+                    uploaded[filename] = future.result()
+                except Exception as e:
+                    failed[filename] = str(e)
+        self.client.invalidate(self.base_url_template.format(deposition_id))
+        logger.info("%s files uploaded, %s failed for deposition %s.", len(uploaded), len(failed), deposition_id)
+        return uploaded, failed
+
+    def verify_checksums(self, deposition_id, expected):
+        """
+        Compares the server-side MD5 of each file with ``expected``
+        (filename -> md5). Returns a list of (filename, expected, remote)
+        for files that are missing or differ; an empty list means all match.
+        """
+        remote = {f["filename"]: normalize_checksum(f.get("checksum"))
+                  for f in self.list_files_of_deposition(deposition_id)}
+        return [(name, md5, remote.get(name)) for name, md5 in sorted(expected.items()) if remote.get(name) != md5]
+
+    def iter_files_of_deposition(self, deposition_id, max_items=None, prefetch=True):
+        """
+        Lazily iterates over the files of a deposition, following pagination
+        links when the server sends them. Use ``max_items`` to stop early.
+        """
+        url = self.base_url_template.format(deposition_id)
+        logger.info("Iterating files for deposition ID %s from: %s", deposition_id, url)
+        return iter_paginated(self.client, url, max_items=max_items, prefetch=prefetch)
@@ -0,0 +1,240 @@
+"""
+OAI-PMH harvesting (ListRecords with resumption tokens).
+
+Responses are parsed incrementally with ``iterparse``: each record is turned
+into a dict as soon as its closing tag is read and its elements are released
+right away, so memory does not grow with the page or the list size. With
+``prefetch`` the next page is downloaded while the current one is parsed.
+"""
+import io
+import logging
+import queue
+import re
+import threading
+from html import unescape
+from xml.etree import ElementTree
+
+from ..core.client import ZenodoClient
+from ..config.settings import OAI_PMH_URL
+
+logger = logging.getLogger(__name__)
+
+OAI_NS = "http://www.openarchives.org/OAI/2.0/"
+_OAI = "{%s}" % OAI_NS
+
+# The token sits at the end of a page; the fetcher reads it from the raw bytes
+# to request the next page before the parser gets there
+_TOKEN_RE = re.compile(rb"<(?:\w+:)?resumptionToken\b[^>]*?(?:/>|>([^<]*)</(?:\w+:)?resumptionToken>)")
+_TOKEN_TAIL = 64 * 1024
+
+
+class OAIPMHError(Exception):
+    """An OAI-PMH error response, e.g. ``badResumptionToken``."""
+
+    def __init__(self, code, message=""):
+        super().__init__(f"{code}: {message}" if message else code)
+        self.code = code
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _element_to_value(elem):
+    """Leaf -> text; element with children -> dict of lists, keyed by local name."""
+    children = list(elem)
+    if not children:
+        text = (elem.text or "").strip()
+        if elem.attrib:
+            return {"@" + _local(k): v for k, v in elem.attrib.items()} | ({"#text": text} if text else {})
+        return text
+    value = {"@" + _local(k): v for k, v in elem.attrib.items()}
+    for child in children:
+        value.setdefault(_local(child.tag), []).append(_element_to_value(child))
+    return value
+
+
+def parse_record(elem):
+    """Converts a ``<record>`` element into a plain dict."""
+    header = elem.find(f"{_OAI}header")
+    record = {
+        "identifier": header.findtext(f"{_OAI}identifier"),
+        "datestamp": header.findtext(f"{_OAI}datestamp"),
+        "sets": [s.text for s in header.findall(f"{_OAI}setSpec")],
+        "deleted": header.get("status") == "deleted",
+        "metadata": None,
+    }
+    metadata = elem.find(f"{_OAI}metadata")
+    if metadata is not None and len(metadata):
+        # The single child is the format root, e.g. <oai_dc:dc>
+        record["metadata"] = _element_to_value(metadata[0])
+    return record
+
+
+def find_resumption_token(data):
+    """Token of a raw page (None on the last page), read from its tail first."""
+    match = None
+    for match in _TOKEN_RE.finditer(data, max(0, len(data) - _TOKEN_TAIL)):
+        pass
+    if match is None and len(data) > _TOKEN_TAIL:
+        for match in _TOKEN_RE.finditer(data):
+            pass
+    if match is None or not match.group(1):
+        return None
+    return unescape(match.group(1).decode("utf-8").strip()) or None
+
+
+class OAIPage:
+    """
+    One ListRecords response. Iterate ``records()`` once; afterwards
+    ``resumption_token`` (None on the last page), ``cursor``,
+    ``complete_list_size`` and ``response_date`` are set.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self.resumption_token = None
+        self.cursor = None
+        self.complete_list_size = None
+        self.response_date = None
+        self.count = 0
+
+    def records(self):
+        container = None
+        try:
+            for event, elem in ElementTree.iterparse(self._source, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == f"{_OAI}ListRecords":
+                        container = elem
+                    continue
+                if tag == f"{_OAI}record":
+                    self.count += 1
+                    yield parse_record(elem)
+                    # Drop the parsed record so the tree never holds more than one
+                    elem.clear()
+                    if container is not None:
+                        container.clear()
+                elif tag == f"{_OAI}resumptionToken":
+                    self.resumption_token = (elem.text or "").strip() or None
+                    self.cursor = int(elem.get("cursor")) if elem.get("cursor") else None
+                    size = elem.get("completeListSize")
+                    self.complete_list_size = int(size) if size else None
+                elif tag == f"{_OAI}responseDate":
+                    self.response_date = (elem.text or "").strip()
+                elif tag == f"{_OAI}error":
+                    code = elem.get("code", "unknown")
+                    if code != "noRecordsMatch":
+                        raise OAIPMHError(code, (elem.text or "").strip())
+        finally:
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+
+
+class OAIPMHAPI:
+    def __init__(self, client=None, base_url=None):
+        # OAI-PMH is public: no token needed, and none sent to whatever host base_url names
+        self.client = client or ZenodoClient(anonymous=True)
+        # base_url is the OAI-PMH endpoint, e.g. "https://zenodo.org/oai2d"
+        self.base_url = base_url or OAI_PMH_URL
+
+    def _get(self, params, stream=False):
+        response = self.client.request("GET", self.base_url, params=params, stream=stream)
+        response.raise_for_status()
+        return response
+
+    def identify(self):
+        """Returns the Identify fields (repositoryName, granularity, earliestDatestamp...)."""
+        response = self._get({"verb": "Identify"})
+        root = ElementTree.fromstring(response.content)
+        error = root.find(f"{_OAI}error")
+        if error is not None:
+            raise OAIPMHError(error.get("code", "unknown"), (error.text or "").strip())
+        identify = root.find(f"{_OAI}Identify")
+        return {_local(child.tag): (child.text or "").strip() for child in identify if len(child) == 0}
+
+    def _params(self, metadata_prefix, set_spec, from_date, until, resumption_token):
+        # A resumption token replaces every other argument
+        if resumption_token:
+            return {"verb": "ListRecords", "resumptionToken": resumption_token}
+        params = {"verb": "ListRecords", "metadataPrefix": metadata_prefix}
+        if set_spec:
+            params["set"] = set_spec
+        if from_date:
+            params["from"] = from_date
+        if until:
+            params["until"] = until
+        return params
+
+    def iter_pages(self, metadata_prefix="oai_dc", set_spec=None, from_date=None, until=None,
+                   resumption_token=None, prefetch=True):
+        """
+        Yields an OAIPage per response, following resumption tokens. Consume
+        each page's ``records()`` before moving to the next one.
+
+        Without ``prefetch`` the XML is parsed straight from the socket. With
+        it, a background thread downloads the next page (at most one page
+        ahead) while the caller parses the current one.
+        """
+        params = self._params(metadata_prefix, set_spec, from_date, until, resumption_token)
+        if not prefetch:
+            while params is not None:
+                response = self._get(params, stream=True)
+                response.raw.decode_content = True
+                page = OAIPage(response.raw)
+                yield page
+                if page.resumption_token is None:
+                    return
+                params = {"verb": "ListRecords", "resumptionToken": page.resumption_token}
+            return
+
+        pages = queue.Queue(maxsize=1)
+        stop = threading.Event()
+
+        def fetch():
+            next_params = params
+            try:
+                while next_params is not None and not stop.is_set():
+                    data = self._get(next_params).content
+                    token = find_resumption_token(data)
+                    next_params = {"verb": "ListRecords", "resumptionToken": token} if token else None
+                    while not stop.is_set():
+                        try:
+                            pages.put((data, token), timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+            except Exception as e:
+                pages.put((e, None))
+                return
+            pages.put((None, None))
+
+        fetcher = threading.Thread(target=fetch, name="zenodo-oai-fetch", daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                data, token = pages.get()
+                if data is None:
+                    return
+                if isinstance(data, Exception):
+                    raise data
+                page = OAIPage(io.BytesIO(data))
+                del data
+                yield page
+                if page.resumption_token != token:
+                    logger.warning("Resumption token read ahead (%s) differs from the parsed one (%s)",
+                                   token, page.resumption_token)
+        finally:
+            stop.set()
+            # Unblock the fetcher if it is waiting on a full queue
+            try:
+                pages.get_nowait()
+            except queue.Empty:
+                pass
+
+    def iter_records(self, metadata_prefix="oai_dc", set_spec=None, from_date=None, until=None,
+                     resumption_token=None, prefetch=True):
+        """Lazily yields every record dict of a ListRecords request, across pages."""
+        for page in self.iter_pages(metadata_prefix, set_spec, from_date, until, resumption_token, prefetch):
+            yield from page.records()
@@ -0,0 +1,342 @@
+"""
+Single entry point for the upload pipeline and the maintenance scripts:
+
+    python -m zenodo_client upload --file artigo.pdf --title "..." --creator "Silva, Maria" --type publication \
+        --publication-type article
+    python -m zenodo_client monitor --watch --workers 8
+    python -m zenodo_client bulk acervo.jsonl --workers 8
+    python -m zenodo_client list --limit 20
+    python -m zenodo_client version 123456 --dir dataset/ --version-label v2.0
+    python -m zenodo_client index search "machine learning"
+
+Only argparse and the metadata rules are imported up front; requests, the
+SQLite stores and the APIs load when a subcommand needs them, and the token
+is read (environment or .env) only before the first API call. ``--help`` and
+``--dry-run`` never touch the network.
+"""
+import argparse
+import json
+import os
+import sys
+
+from .config.settings import ARCHIVE_FOLDER, JOB_STORE_FILE, UPLOAD_QUEUE_FOLDER, get_access_token
+from .core.validation import IMAGE_TYPES, PUBLICATION_TYPES, UPLOAD_TYPES, validate_metadata
+
+# Delegated to the existing scripts, with their own arguments and --help
+SCRIPTS = {
+    "index": ("zenodo_client.scripts.index", "Índice local dos depósitos (sync, search, show, stats)."),
+    "harvest": ("zenodo_client.scripts.harvest", "Coleta de registros públicos via OAI-PMH."),
+    "benchmark": ("zenodo_client.scripts.benchmark", "Benchmark offline contra o servidor falso."),
+}
+
+
+def _add_metadata_arguments(parser, required):
+    parser.add_argument("--title", required=required, help="Título da publicação.")
+    parser.add_argument("--desc", help="Descrição da publicação.")
+    parser.add_argument("--creator", action="append", required=required,
+                        help="Criador no formato 'Sobrenome, Nome'. Use múltiplos para adicionar mais de um.")
+    parser.add_argument("--type", choices=UPLOAD_TYPES, required=required, help="Tipo de publicação.")
+    parser.add_argument("--publication-type", choices=PUBLICATION_TYPES,
+                        help="Subtipo, obrigatório com --type publication (ex.: article).")
+    parser.add_argument("--image-type", choices=IMAGE_TYPES, help="Subtipo, obrigatório com --type image (ex.: figure).")
+
+
+def _add_file_arguments(parser):
+    parser.add_argument("--file", action="append", help="Arquivo do depósito. Use múltiplos para enviar vários.")
+    parser.add_argument("--dir", help="Pasta cujos arquivos vão juntos no mesmo depósito.")
+    parser.add_argument("--parallel-uploads", type=int, default=4, help="Transferências simultâneas (padrão: 4).")
+    parser.add_argument("--upload-retries", type=int, default=3, help="Retentativas por arquivo (padrão: 3).")
+
+
+def build_parser():
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument("--cache-ttl", type=float, metavar="SEGUNDOS",
+                       help="Reaproveita respostas GET por este tempo e depois as revalida com ETag "
+                            "(padrão: ZENODO_CACHE_TTL; 0 desliga).")
+    cache.add_argument("--cache-file", help="Guarda o cache de respostas neste banco SQLite (padrão: só em memória).")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[cache])
+    common.add_argument("--job-store", default=JOB_STORE_FILE,
+                        help=f"Banco de jobs, duplicidade e cache de metadados (padrão: {JOB_STORE_FILE}).")
+    common.add_argument("--trace-file", help="Grava a duração de cada chamada à API e etapa do pipeline (JSON-lines).")
+    common.add_argument("--metrics-file", help="Grava métricas no formato Prometheus neste arquivo.")
+    common.add_argument("--metrics-port", type=int, help="Expõe métricas Prometheus em http://127.0.0.1:PORTA/metrics.")
+
+    parser = argparse.ArgumentParser(prog="python -m zenodo_client", description="Uploads automatizados para o Zenodo.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMANDO")
+
+    upload = commands.add_parser("upload", parents=[common], help="Publica um depósito com um ou mais arquivos.")
+    _add_file_arguments(upload)
+    _add_metadata_arguments(upload, required=True)
+    upload.add_argument("--draft", type=int, help="ID de um rascunho existente para continuar (arquivos já enviados são pulados).")
+    upload.add_argument("--archive", metavar="PASTA",
+                        help="Move o arquivo enviado para esta pasta (só com um arquivo; padrão: não move).")
+    upload.add_argument("--dry-run", action="store_true", help="Só valida arquivos e metadados, sem chamar a API.")
+
+    monitor = commands.add_parser("monitor", parents=[common], help="Envia os arquivos da pasta de monitoramento.")
+    monitor.add_argument("--queue", default=UPLOAD_QUEUE_FOLDER, help=f"Pasta monitorada (padrão: {UPLOAD_QUEUE_FOLDER}).")
+    monitor.add_argument("--archive", default=ARCHIVE_FOLDER, help=f"Pasta dos arquivos enviados (padrão: {ARCHIVE_FOLDER}).")
+    monitor.add_argument("--watch", action="store_true", help="Fica em execução e envia novos arquivos assim que estiverem completos.")
+    monitor.add_argument("--settle", type=float, default=0.5,
+                         help="Segundos sem alteração de tamanho/mtime para considerar um arquivo completo (padrão: 0.5).")
+    monitor.add_argument("--workers", type=int, default=4, help="Uploads simultâneos (padrão: 4).")
+    monitor.add_argument("--metadata-command",
+                         help="Comando que imprime o JSON de metadados de um arquivo ({file} = caminho). Padrão: ZENODO_METADATA_COMMAND.")
+    monitor.add_argument("--metadata-workers", type=int, help="Gerações de metadados simultâneas (padrão: ZENODO_METADATA_WORKERS ou 2).")
+
+    bulk = commands.add_parser("bulk", parents=[common], help="Envio em massa a partir de um manifesto JSONL ou CSV.")
+    bulk.add_argument("manifest", help="Manifesto (arquivo + metadados por linha).")
+    bulk.add_argument("--results", help="Manifesto de resultados (padrão: <manifesto>.results.jsonl; .csv também aceito).")
+    bulk.add_argument("--restart", action="store_true", help="Ignora o checkpoint, sobrescreve os resultados e começa do início do manifesto.")
+    bulk.add_argument("--workers", type=int, default=4, help="Uploads simultâneos (padrão: 4).")
+    bulk.add_argument("--dry-run", action="store_true", help="Só valida as linhas do manifesto, sem chamar a API.")
+
+    listing = commands.add_parser("list", parents=[cache], help="Lista os depósitos da conta, mais recentes primeiro.")
+    listing.add_argument("--limit", type=int, help="Máximo de depósitos (padrão: todos).")
+    listing.add_argument("--json", action="store_true", help="Um objeto JSON por linha.")
+
+    version = commands.add_parser("version", parents=[common],
+                                  help="Publica uma nova versão de um depósito, enviando só os arquivos novos ou alterados.")
+    version.add_argument("id", type=int, help="ID do depósito publicado.")
+    _add_file_arguments(version)
+    _add_metadata_arguments(version, required=False)
+    version.add_argument("--version-label", help="Valor do campo 'version' (ex.: v2.0).")
+
+    commands.add_parser("reindex", parents=[common],
+                        help="Reconstrói o índice de duplicidade a partir dos depósitos publicados da conta.")
+
+    archive = commands.add_parser("archive", help="Consulta e manutenção da pasta de arquivos enviados.")
+    archive.add_argument("--archive", default=ARCHIVE_FOLDER, help=f"Pasta dos arquivos enviados (padrão: {ARCHIVE_FOLDER}).")
+    actions = archive.add_subparsers(dest="action", required=True)
+    find = actions.add_parser("find", help="Onde está um arquivo enviado e com qual DOI.")
+    find.add_argument("name", nargs="?", help="Nome original do arquivo.")
+    find.add_argument("--doi")
+    find.add_argument("--md5")
+    compact = actions.add_parser("compact", help="Aplica a retenção, organiza arquivos antigos em subpastas e remove pastas vazias.")
+    compact.add_argument("--retention-days", type=float, help="Apaga arquivos enviados há mais dias que isso (padrão: ZENODO_ARCHIVE_RETENTION_DAYS).")
+    actions.add_parser("stats", help="Quantidade e tamanho dos arquivos guardados.")
+
+    # Listed in --help only; main() hands their arguments to the script
+    for name, (_, description) in SCRIPTS.items():
+        commands.add_parser(name, help=description, add_help=False)
+    return parser
+
+
+def _metadata_from_args(args):
+    metadata = {
+        "title": args.title,
+        "upload_type": args.type,
+        "description": args.desc,
+        "creators": [{"name": name, "affiliation": ""} for name in args.creator] if args.creator else None,
+        "publication_type": args.publication_type,
+        "image_type": args.image_type,
+    }
+    return {k: v for k, v in metadata.items() if v}
+
+
+def _print_errors(label, erros):
+    print(f"!!! Metadados inválidos para {label}:")
+    for erro in erros:
+        print(f"    - {erro}")
+
+
+def _connection_pool(size):
+    # Um pool de conexões pelo menos do tamanho das transferências simultâneas
+    from .config.settings import HTTP_POOL_SIZE
+    from .core.session import configure_session
+
+    configure_session(pool_size=max(HTTP_POOL_SIZE, size))
+
+
+def _dry_run_upload(file_paths, metadata):
+    missing = [p for p in file_paths if not os.path.isfile(p)]
+    for path in missing:
+        print(f"!!! Arquivo não encontrado: {path}")
+    erros = validate_metadata(metadata)
+    if erros:
+        _print_errors(file_paths[0] if len(file_paths) == 1 else f"{len(file_paths)} arquivos", erros)
+    if missing or erros:
+        return 1
+    total = sum(os.path.getsize(p) for p in file_paths)
+    print(f"OK: {len(file_paths)} arquivo(s), {total / (1024 * 1024):.1f} MB; metadados válidos. Nada foi enviado.")
+    return 0
+
+
+def _dry_run_bulk(manifest_path):
+    from .jobs.manifest import iter_manifest
+
+    rows = invalid = 0
+    for row in iter_manifest(manifest_path):
+        rows += 1
+        if row.errors:
+            invalid += 1
+            _print_errors(f"linha {row.row}", row.errors)
+    print(f"{rows} linha(s), {invalid} inválida(s). Nada foi enviado.")
+    return 1 if invalid else 0
+
+
+def _cmd_upload(args, parser):
+    from .core.utils import collect_files
+
+    file_paths = collect_files(args.file, args.dir)
+    if not file_paths:
+        parser.error("upload requer --file ou --dir")
+    metadata = {**_metadata_from_args(args), "description": args.desc or "N/A",
+                "access_right": "open", "license": "cc-by-4.0"}
+    if args.dry_run:
+        return _dry_run_upload(file_paths, metadata)
+
+    from .jobs import pipeline
+
+    if len(file_paths) > 1 or args.dir or args.draft:
+        _connection_pool(args.parallel_uploads)
+        record = pipeline.process_files_for_upload(file_paths, metadata, max_in_flight=args.parallel_uploads,
+                                                   retries=args.upload_retries, draft_id=args.draft)
+        return 0 if record else 1
+    if args.archive:
+        os.makedirs(args.archive, exist_ok=True)
+    job_store, dedup_index, _ = pipeline.open_job_stores(args.job_store)
+    record = pipeline.process_file_for_upload(file_paths[0], metadata, args.archive, job_store, dedup_index)
+    return 0 if record else 1
+
+
+def _cmd_monitor(args, parser):
+    from .jobs import pipeline
+
+    os.makedirs(args.archive, exist_ok=True)
+    os.makedirs(args.queue, exist_ok=True)
+    job_store, dedup_index, generator = pipeline.open_job_stores(args.job_store, args.metadata_command,
+                                                                 args.metadata_workers)
+    _connection_pool(args.workers)
+    if args.watch:
+        pipeline.watch_upload_queue(args.queue, args.archive, job_store, dedup_index, generator,
+                                    workers=args.workers, settle_time=args.settle)
+    else:
+        pipeline.process_upload_queue(args.queue, args.archive, job_store, dedup_index, generator, workers=args.workers)
+    return 0
+
+
+def _cmd_bulk(args, parser):
+    if args.dry_run:
+        return _dry_run_bulk(args.manifest)
+
+    from .jobs import pipeline
+
+    job_store, dedup_index, _ = pipeline.open_job_stores(args.job_store)
+    _connection_pool(args.workers)
+    counts = pipeline.run_bulk_ingest(args.manifest, args.results, job_store, dedup_index, workers=args.workers,
+                                      restart=args.restart)
+    return 0 if counts is not None else 1
+
+
+def _cmd_list(args, parser):
+    from .api.deposition import DepositionAPI
+    from .jobs import pipeline
+
+    api = DepositionAPI(pipeline.get_api_client(), base_url=pipeline.depositions_url())
+    for deposition in api.iter_depositions(max_items=args.limit):
+        if args.json:
+            print(json.dumps(deposition, ensure_ascii=False))
+            continue
+        metadata = deposition.get("metadata") or {}
+        state = "published" if deposition.get("submitted") else deposition.get("state") or ""
+        print(f"{deposition['id']:>9}  {deposition.get('doi') or '-':<28}  {(deposition.get('modified') or '')[:10]}  "
+              f"{state:<11}  {metadata.get('title') or deposition.get('title') or ''}")
+    return 0
+
+
+def _cmd_version(args, parser):
+    from .core.utils import collect_files
+
+    file_paths = collect_files(args.file, args.dir)
+    if not file_paths:
+        parser.error("version requer --file ou --dir")
+    updates = {**_metadata_from_args(args), "version": args.version_label}
+    updates = {k: v for k, v in updates.items() if v}
+
+    from .jobs import pipeline
+
+    _connection_pool(args.parallel_uploads)
+    record = pipeline.process_new_version(args.id, file_paths, updates, max_in_flight=args.parallel_uploads,
+                                          retries=args.upload_retries)
+    return 0 if record else 1
+
+
+def _cmd_reindex(args, parser):
+    from .jobs import pipeline
+
+    job_store, dedup_index, _ = pipeline.open_job_stores(args.job_store)
+    pipeline.rebuild_dedup_index(dedup_index, job_store)
+    return 0
+
+
+def _cmd_archive(args, parser):
+    from .jobs import pipeline
+
+    store = pipeline.get_archive(args.archive)
+    if args.action == "find":
+        if args.doi:
+            rows = store.find_doi(args.doi)
+        elif args.md5:
+            rows = store.find_checksum(args.md5)
+        elif args.name:
+            rows = store.lookup(args.name)
+        else:
+            parser.error("archive find requer um nome, --doi ou --md5")
+        for row in rows:
+            print(f"{row['original_name']}  {row['doi'] or '-'}  {row['path'] or '(removido pela retenção)'}")
+        return 0 if rows else 1
+    if args.action == "compact":
+        removed = store.apply_retention(args.retention_days)
+        result = store.compact()
+        print(f"{removed} arquivo(s) removido(s) pela retenção, {result['adopted']} organizado(s) em subpastas, "
+              f"{result['missing']} ausente(s), {result['pruned']} pasta(s) vazia(s) removida(s).")
+        return 0
+    print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
+COMMANDS = {
+    "upload": _cmd_upload,
+    "monitor": _cmd_monitor,
+    "bulk": _cmd_bulk,
+    "list": _cmd_list,
+    "version": _cmd_version,
+    "reindex": _cmd_reindex,
+    "archive": _cmd_archive,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SCRIPTS:
+        # Passed through untouched (argparse would claim options such as --help)
+        import importlib
+
+        sys.argv[0] = f"python -m zenodo_client {argv[0]}"
+        return importlib.import_module(SCRIPTS[argv[0]][0]).main(argv[1:])
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    import logging
+
+    from .core import instrumentation
+
+    # Mensagens das bibliotecas (zenodo_client) no console, como no zenodoapp.py
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Instrumentação desligada por padrão; ativada por argumentos ou ZENODO_TRACE_FILE/ZENODO_METRICS_*
+    instrumentation.configure(getattr(args, "trace_file", None), getattr(args, "metrics_file", None),
+                              getattr(args, "metrics_port", None))
+    if getattr(args, "cache_ttl", None) is not None or getattr(args, "cache_file", None):
+        from .jobs import pipeline
+
+        pipeline.configure(cache_ttl=args.cache_ttl, cache_file=args.cache_file)
+    if not getattr(args, "dry_run", False) and args.command != "archive":
+        # Token lido só agora (ambiente ou .env), antes da primeira chamada à API
+        try:
+            get_access_token()
+        except EnvironmentError as e:
+            print(f"!!! {e}", file=sys.stderr)
+            return 1
+    return COMMANDS[args.command](args, parser)
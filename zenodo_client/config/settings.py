@@ -1,3 +1,84 @@
+import os
+
 ZENODO_API_URL = "https://zenodo.org/api"
 ZENODO_SANDBOX_URL = "https://sandbox.zenodo.org/api"
-ACCESS_TOKEN = "seu_token"
\ No newline at end of file
+
+# Shared HTTP transport (see core/session.py)
+HTTP_POOL_SIZE = int(os.getenv("ZENODO_HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ZENODO_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("ZENODO_READ_TIMEOUT", "300"))
+
+# Client-side rate limit (see core/ratelimit.py); corrected at runtime from
+# the X-RateLimit-* headers returned by the server
+RATE_LIMIT_PER_MINUTE = float(os.getenv("ZENODO_RATE_LIMIT_PER_MINUTE", "100"))
+RATE_LIMIT_BURST = int(os.getenv("ZENODO_RATE_LIMIT_BURST", "20"))
+MAX_RETRIES = int(os.getenv("ZENODO_MAX_RETRIES", "5"))
+
+# Cache of GET responses (see core/cache.py), off unless a TTL is set; with a
+# file the entries survive restarts (keys are scoped to the token)
+HTTP_CACHE_TTL = float(os.getenv("ZENODO_CACHE_TTL", "0")) or None
+HTTP_CACHE_FILE = os.getenv("ZENODO_CACHE_FILE")
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("ZENODO_CACHE_MAX_ENTRIES", "1024"))
+
+# Read size of streamed uploads (see core/hashing.py HashingFileStream); memory
+# per transfer in flight stays at one block
+UPLOAD_BLOCK_SIZE = int(os.getenv("ZENODO_UPLOAD_BLOCK_SIZE", str(1024 * 1024)))
+
+# Instrumentation exporters (see core/instrumentation.py); all off by default
+TRACE_FILE = os.getenv("ZENODO_TRACE_FILE")
+METRICS_FILE = os.getenv("ZENODO_METRICS_FILE")
+METRICS_PORT = int(os.getenv("ZENODO_METRICS_PORT", "0")) or None
+
+# Metadata generation for the upload queue (see jobs/metadata.py), e.g.
+# ZENODO_METADATA_COMMAND="fabric -ps create_zenodo_json {file}"
+METADATA_COMMAND = os.getenv("ZENODO_METADATA_COMMAND", "")
+METADATA_WORKERS = int(os.getenv("ZENODO_METADATA_WORKERS", "2"))
+METADATA_TIMEOUT = float(os.getenv("ZENODO_METADATA_TIMEOUT", "600"))
+
+# OAI-PMH endpoint for harvesting public records (see api/oai_pmh.py)
+OAI_PMH_URL = os.getenv("ZENODO_OAI_URL", "https://zenodo.org/oai2d")
+
+
+# Upload pipeline (see jobs/pipeline.py): folders and job database, relative
+# to the working directory (zenodoapp.py resolves them next to the script)
+UPLOAD_QUEUE_FOLDER = "upload_queue"
+ARCHIVE_FOLDER = "uploaded_files"
+JOB_STORE_FILE = "zenodo_jobs.db"
+
+# Seconds before a file whose upload failed in --watch mode is tried again
+QUEUE_RETRY_INTERVAL = float(os.getenv("ZENODO_QUEUE_RETRY_INTERVAL", "60"))
+
+# Archive of uploaded files (see jobs/archive.py): "date" (YYYY/MM/DD) or "hash"
+# (MD5 prefix) shards; files older than the retention are deleted, 0 keeps all
+ARCHIVE_SHARD = os.getenv("ZENODO_ARCHIVE_SHARD", "date")
+ARCHIVE_RETENTION_DAYS = float(os.getenv("ZENODO_ARCHIVE_RETENTION_DAYS", "0")) or None
+ARCHIVE_MAINTENANCE_INTERVAL = float(os.getenv("ZENODO_ARCHIVE_MAINTENANCE_INTERVAL", "3600"))
+
+# Credentials and the deposit endpoint are read on first use (see
+# get_access_token), so importing the package has no side effects
+_env_loaded = False
+
+
+def load_env():
+    """Loads a .env file from the working directory into os.environ, once."""
+    global _env_loaded
+    if not _env_loaded:
+        import dotenv
+
+        dotenv.load_dotenv()
+        _env_loaded = True
+
+
+def get_access_token():
+    """ZENODO_TOKEN from the environment or .env; EnvironmentError if unset."""
+    load_env()
+    token = os.getenv("ZENODO_TOKEN")
+    if not token:
+        raise EnvironmentError("ZENODO_TOKEN não encontrado. Crie um arquivo .env com ZENODO_TOKEN=seu_token")
+    return token
+
+
+def get_depositions_url():
+    """Depositions endpoint: ZENODO_API_URL from the environment or .env, else production."""
+    load_env()
+    return os.getenv("ZENODO_API_URL", f"{ZENODO_API_URL}/deposit/depositions")
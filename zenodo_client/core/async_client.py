@@ -0,0 +1,153 @@
+"""
+asyncio counterpart of ZenodoClient, on aiohttp (optional dependency,
+imported on first use: ``pip install aiohttp``).
+
+Same retry and rate-limit semantics as the threaded client: both take their
+tokens from the process-wide RateLimiter (``reserve()`` never blocks), so
+threaded and asyncio callers in one process pace together. A semaphore caps
+the requests in flight; thousands of coroutines can wait on it without a
+thread each.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import urlsplit
+
+import requests
+
+from ..config.settings import (HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE, HTTP_READ_TIMEOUT, MAX_RETRIES,
+                               get_access_token)
+from .client import RETRY_STATUSES, should_retry
+from .instrumentation import span
+from .ratelimit import get_rate_limiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def _aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("AsyncZenodoClient requires aiohttp: pip install aiohttp") from None
+    return aiohttp
+
+
+class AsyncResponse:
+    """
+    Fully read response, with the parts of ``requests.Response`` the API
+    classes use (``status_code``, ``headers``, ``json()``, ``links``,
+    ``raise_for_status()``).
+    """
+
+    def __init__(self, method, url, status_code, reason, headers, content, links):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.links = links
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        # The same exception as the threaded client, so callers handle both alike
+        if self.status_code >= 400:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}", response=self)
+
+
+class AsyncZenodoClient:
+    """
+    Use as ``async with AsyncZenodoClient(token=...) as client``, or call
+    ``close()`` when done. ``max_concurrency`` bounds the requests in
+    flight and ``pool_size`` the open connections.
+
+    A callable ``data`` is called on every attempt to get a fresh body
+    (e.g. an async generator over a file), so streamed uploads are retried
+    with the full content.
+    """
+
+    def __init__(self, token=None, rate_limiter=None, max_retries=None, max_concurrency=None,
+                 pool_size=None, session=None):
+        self.headers = {"Authorization": f"Bearer {token or get_access_token()}"}
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.pool_size = pool_size or max(HTTP_POOL_SIZE, min(self.max_concurrency, 100))
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+
+    def _get_session(self):
+        if self._session is None:
+            aiohttp = _aiohttp()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT),
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method, url, headers=None, **kwargs):
+        session = self._get_session()
+        headers = {**self.headers, **(headers or {})}
+        data = kwargs.pop("data", None)
+        # requests-style keyword for query parameters
+        params = kwargs.pop("params", None)
+        if params:
+            kwargs["params"] = {k: str(v) for k, v in params.items() if v is not None}
+
+        with span(f"http.{method.upper()}", path=urlsplit(url).path) as s:
+            async with self._semaphore:
+                for attempt in range(self.max_retries + 1):
+                    wait = self.rate_limiter.reserve()
+                    s.add("rate_limit_wait", wait)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    body = data() if callable(data) else data
+                    async with session.request(method, url, headers=headers, data=body, **kwargs) as r:
+                        content = await r.read()
+                        links = {str(rel): {"url": str(link["url"])} for rel, link in r.links.items()}
+                        response = AsyncResponse(method, str(r.url), r.status, r.reason, r.headers, content, links)
+                        sent = r.request_info.headers.get("Content-Length")
+                    s.add("bytes_sent", int(sent or 0))
+                    self.rate_limiter.update_from_headers(response.headers)
+                    if not should_retry(method, response.status_code) or attempt == self.max_retries:
+                        break
+                    if response.status_code == 429:
+                        # Blocks every caller sharing the limiter until Retry-After
+                        delay = self.rate_limiter.on_throttled(response.headers, attempt)
+                        logger.warning("Tentativa %d: limite de requisições atingido (429). Retentando em %.1f segundos...",
+                                       attempt + 1, delay)
+                    else:
+                        delay = self.rate_limiter.backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                        logger.warning("Tentativa %d falhou com status %d. Retentando em %.1f segundos...",
+                                       attempt + 1, response.status_code, delay)
+                        await asyncio.sleep(delay)
+            s.set(status_code=response.status_code, retries=attempt)
+        if response.status_code in RETRY_STATUSES:
+            response.raise_for_status()
+        return response
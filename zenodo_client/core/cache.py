@@ -0,0 +1,235 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .sqlite import SQLiteStore
+
+# Response headers kept with a cached entry
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+class CacheEntry:
+    """A cached GET response: body, a few headers and its validators."""
+
+    def __init__(self, url, status_code, body, headers, stored_at):
+        self.url = url
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+        self.stored_at = stored_at
+
+    @property
+    def etag(self):
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self):
+        return self.headers.get("Last-Modified")
+
+    @classmethod
+    def from_response(cls, url, response):
+        headers = {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers}
+        return cls(url, response.status_code, response.content, headers, time.time())
+
+    def to_response(self):
+        """Rebuilds a requests.Response so callers cannot tell it came from the cache."""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = self.body
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = "utf-8"
+        response.reason = "OK"
+        response.request = requests.Request("GET", self.url).prepare()
+        return response
+
+
+class MemoryCacheBackend:
+    """In-process LRU store of cache entries."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """Stores an entry; returns how many entries were evicted."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+
+class DiskCacheBackend(SQLiteStore):
+    """SQLite store of cache entries, so warm data survives restarts."""
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS http_cache (
+        key         TEXT PRIMARY KEY,
+        url         TEXT NOT NULL,
+        status_code INTEGER NOT NULL,
+        body        BLOB NOT NULL,
+        headers     TEXT NOT NULL,
+        stored_at   REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS http_cache_accessed ON http_cache (accessed_at);
+    """
+
+    def __init__(self, path, max_entries):
+        super().__init__(path)
+        self.max_entries = max_entries
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM http_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE http_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(row["url"], row["status_code"], row["body"], json.loads(row["headers"]), row["stored_at"])
+
+    def put(self, key, entry):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, entry.url, entry.status_code, entry.body, json.dumps(entry.headers), entry.stored_at, time.time()),
+        )
+        excess = conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM http_cache WHERE key IN (SELECT key FROM http_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            return excess
+        return 0
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM http_cache WHERE key = ?", (key,))
+
+    def keys(self):
+        return [r[0] for r in self._connect().execute("SELECT key FROM http_cache")]
+
+
+def _url_of(key):
+    # Keys are "<credentials fingerprint> <url>"; prepared URLs never contain spaces
+    return key.split(" ", 1)[-1]
+
+
+class ResponseCache:
+    """
+    Optional cache of GET responses keyed by URL (including the query string)
+    and a fingerprint of the credentials, so a cache shared on disk never
+    serves one account's depositions to another.
+
+    Entries younger than ``ttl`` seconds are served without a round trip.
+    Older entries are revalidated with ``If-None-Match``/``If-Modified-Since``
+    and reused when the server answers 304. Eviction is LRU beyond
+    ``max_entries``. Pass ``path`` to keep the entries in SQLite on disk.
+    """
+
+    def __init__(self, ttl=60.0, max_entries=1024, path=None):
+        self.ttl = ttl
+        self.backend = DiskCacheBackend(path, max_entries) if path else MemoryCacheBackend(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(url, params=None, credentials=None):
+        """Cache key of a GET; ``credentials`` is the Authorization header (hashed, never stored)."""
+        scope = hashlib.sha256(credentials.encode()).hexdigest()[:16] if credentials else "anonymous"
+        return f"{scope} {requests.Request('GET', url, params=params).prepare().url}"
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def lookup(self, key):
+        """Returns (entry, fresh) for a key; entry is None on a miss."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None, False
+        fresh = time.time() - entry.stored_at < self.ttl
+        if fresh:
+            self._count("hits")
+        return entry, fresh
+
+    def conditional_headers(self, entry):
+        """Validators to send when revalidating a stale entry."""
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, key, response):
+        """Records a full download (a miss) and keeps it if it was successful."""
+        self._count("misses")
+        if response.status_code == 200:
+            self._count("evictions", self.backend.put(key, CacheEntry.from_response(_url_of(key), response)))
+
+    def refresh(self, key, entry, response):
+        """Handles a 304: the stale entry is valid again for another ``ttl``."""
+        self._count("revalidated")
+        entry.stored_at = time.time()
+        for name in ("ETag", "Last-Modified"):
+            if name in response.headers:
+                entry.headers[name] = response.headers[name]
+        self.backend.put(key, entry)
+        return entry.to_response()
+
+    def invalidate(self, url):
+        """
+        Drops the entries affected by a write to ``url``: the resource itself,
+        everything below it and the collections above it (e.g. a PUT to
+        .../depositions/1 drops .../depositions/1, .../depositions/1/files
+        and the .../depositions listings), whatever credentials cached them.
+        """
+        base = url.split("?", 1)[0].rstrip("/")
+        for key in self.backend.keys():
+            path = _url_of(key).split("?", 1)[0].rstrip("/")
+            if path == base or path.startswith(base + "/") or base.startswith(path + "/"):
+                self.backend.delete(key)
+                self._count("invalidations")
+
+    def stats(self):
+        """Hit/miss counters; ``saved`` is the number of round trips avoided."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.revalidated
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "saved": self.hits,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
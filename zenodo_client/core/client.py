@@ -1,17 +1,99 @@
-import requests
-from config.settings import ACCESS_TOKEN
+import logging
 from time import sleep
+from urllib.parse import urlsplit
+
+from ..config.settings import MAX_RETRIES, get_access_token
+from .instrumentation import span
+from .ratelimit import get_rate_limiter, parse_retry_after
+from .session import get_session
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A 5xx from a proxy may arrive after the server acted: only these are safe to resend.
+# 429 means the request was refused untouched, so it is retried for every method.
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+def should_retry(method, status_code):
+    """True if a response with ``status_code`` to ``method`` may be retried."""
+    if status_code == 429:
+        return True
+    return status_code in RETRY_STATUSES and method.upper() in IDEMPOTENT_METHODS
+
 
 class ZenodoClient:
-    def __init__(self):
-        self.headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-
-    def request(self, method, url, **kwargs):
-        for attempt in range(3):
-            r = requests.request(method, url, headers=self.headers, **kwargs)
-            if r.status_code in [429, 500, 503]:
-                print(f"Tentativa {attempt + 1} falhou com status {r.status_code}. Retentando em {2 ** attempt} segundos...")
-                sleep(2 ** attempt)
-                continue
-            return r
-        r.raise_for_status()
\ No newline at end of file
+    def __init__(self, session=None, token=None, rate_limiter=None, max_retries=None, cache=None, anonymous=False):
+        # anonymous: for public endpoints (OAI-PMH), which must never see the account token
+        self.headers = {} if anonymous else {"Authorization": f"Bearer {token or get_access_token()}"}
+        self._session = session
+        # All instances share one limiter, so concurrent workers pace together
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        # Optional core.cache.ResponseCache for GET requests
+        self.cache = cache
+
+    @property
+    def session(self):
+        # All instances share one pooled keep-alive session unless one is given
+        return self._session or get_session()
+
+    def request(self, method, url, headers=None, **kwargs):
+        if self.cache is not None:
+            if method.upper() == "GET" and not kwargs.get("stream"):
+                return self._cached_get(url, headers, **kwargs)
+            response = self._send(method, url, headers, **kwargs)
+            if response.status_code < 400:
+                self.cache.invalidate(url)
+            return response
+        return self._send(method, url, headers, **kwargs)
+
+    def invalidate(self, url):
+        """Drops cached responses affected by a write to ``url`` (no-op without a cache)."""
+        if self.cache is not None:
+            self.cache.invalidate(url)
+
+    def _cached_get(self, url, headers=None, **kwargs):
+        key = self.cache.key_for(url, kwargs.get("params"), self.headers.get("Authorization"))
+        entry, fresh = self.cache.lookup(key)
+        if fresh:
+            return entry.to_response()
+        if entry is not None:
+            headers = {**(headers or {}), **self.cache.conditional_headers(entry)}
+        response = self._send("GET", url, headers, **kwargs)
+        if entry is not None and response.status_code == 304:
+            return self.cache.refresh(key, entry, response)
+        self.cache.store(key, response)
+        return response
+
+    def _send(self, method, url, headers=None, **kwargs):
+        headers = {**self.headers, **(headers or {})}
+        # File bodies are rewound before a retry so the full content is sent again
+        body = kwargs.get("data")
+        body_start = body.tell() if hasattr(body, "seek") and hasattr(body, "tell") else None
+
+        with span(f"http.{method.upper()}", path=urlsplit(url).path) as s:
+            for attempt in range(self.max_retries + 1):
+                s.add("rate_limit_wait", self.rate_limiter.acquire())
+                if attempt and body_start is not None:
+                    body.seek(body_start)
+                r = self.session.request(method, url, headers=headers, **kwargs)
+                s.add("bytes_sent", int(r.request.headers.get("Content-Length") or 0))
+                self.rate_limiter.update_from_headers(r.headers)
+                if not should_retry(method, r.status_code) or attempt == self.max_retries:
+                    break
+                if r.status_code == 429:
+                    # Blocks every caller sharing the limiter until Retry-After
+                    delay = self.rate_limiter.on_throttled(r.headers, attempt)
+                    logger.warning("Tentativa %d: limite de requisições atingido (429). Retentando em %.1f segundos...",
+                                   attempt + 1, delay)
+                else:
+                    # A 503 during maintenance says when to come back; only this request waits for it
+                    delay = self.rate_limiter.backoff(attempt, parse_retry_after(r.headers.get("Retry-After")))
+                    logger.warning("Tentativa %d falhou com status %d. Retentando em %.1f segundos...",
+                                   attempt + 1, r.status_code, delay)
+                    sleep(delay)
+            s.set(status_code=r.status_code, retries=attempt)
+        if r.status_code in RETRY_STATUSES:
+            r.raise_for_status()
+        return r
@@ -0,0 +1,144 @@
+import hashlib
+import io
+import mmap
+import os
+import time
+
+# Read size used when hashing files; large enough to keep syscalls cheap,
+# small enough that memory stays constant for multi-GB files.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Upload bodies at least this large are memory-mapped (see HashingFileStream)
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+
+def file_checksum(file_path, algorithm="md5", block_size=HASH_BLOCK_SIZE):
+    """
+    Returns the hex digest of a file, reading it in fixed-size blocks.
+
+    MD5 is the default because it is the checksum Zenodo reports for
+    every stored file, so local and remote hashes can be compared.
+    """
+    digest = hashlib.new(algorithm)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_checksum(checksum):
+    """Strips the 'md5:' prefix used by bucket responses, e.g. 'md5:abc...' -> 'abc...'."""
+    if checksum and ":" in checksum:
+        return checksum.split(":", 1)[1]
+    return checksum
+
+
+class HashingFileStream:
+    """
+    Upload body that reads a file once, in ``block_size`` blocks, hashing
+    each block (``algorithms``, default MD5 only) on its way to the socket.
+
+    It has a length, so requests sends a Content-Length instead of chunked
+    encoding, and http.client iterates it block by block: memory stays at
+    one block whatever the file size. With ``use_mmap`` (default: files of
+    ``mmap_threshold`` bytes or more) blocks are zero-copy slices of a
+    read-only memory map instead of fresh ``read()`` buffers.
+
+    ``on_progress(sent, total, bytes_per_second)`` is called at most every
+    ``progress_interval`` seconds and once at the end. ``seek(0)`` restarts
+    file, digests and clock, which is how ZenodoClient rewinds a body it
+    retries.
+    """
+
+    def __init__(self, file_path, algorithms=("md5",), block_size=HASH_BLOCK_SIZE, use_mmap=None,
+                 mmap_threshold=MMAP_THRESHOLD, on_progress=None, progress_interval=1.0):
+        self.file_path = file_path
+        self.algorithms = tuple(algorithms)
+        self.block_size = block_size
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._file = open(file_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = self.size >= mmap_threshold
+        self._mmap = None
+        if use_mmap and self.size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._mmap, "madvise"):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self.seek(0)
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tell(self):
+        return self.sent
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("HashingFileStream can only be rewound to the start")
+        self._file.seek(0)
+        self.sent = 0
+        self._digests = {name: hashlib.new(name) for name in self.algorithms}
+        self._started = self._reported = time.monotonic()
+        return 0
+
+    def __iter__(self):
+        if self._mmap is not None:
+            blocks = self._mapped_blocks()
+        else:
+            blocks = iter(lambda: self._file.read(self.block_size), b"")
+        for block in blocks:
+            for digest in self._digests.values():
+                digest.update(block)
+            self.sent += len(block)
+            self._report()
+            yield block
+        self._report(final=True)
+
+    def _mapped_blocks(self):
+        view = memoryview(self._mmap)
+        # Pages already sent are dropped from the mapping (they stay in the
+        # page cache), so resident memory does not grow with the file
+        release = hasattr(self._mmap, "madvise") and self.block_size % mmap.PAGESIZE == 0
+        try:
+            for start in range(0, self.size, self.block_size):
+                yield view[start:start + self.block_size]
+                if release:
+                    self._mmap.madvise(mmap.MADV_DONTNEED, start, min(self.block_size, self.size - start))
+        finally:
+            view.release()
+
+    def _report(self, final=False):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if final or now - self._reported >= self.progress_interval:
+            self._reported = now
+            self.on_progress(self.sent, self.size, self.sent / max(now - self._started, 1e-6))
+
+    @property
+    def complete(self):
+        return self.sent == self.size
+
+    def hexdigest(self, algorithm="md5"):
+        """Digest of the bytes sent so far; the file's own once ``complete``."""
+        return self._digests[algorithm].hexdigest()
+
+    def hexdigests(self):
+        return {name: digest.hexdigest() for name, digest in self._digests.items()}
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # A block is still referenced (aborted send); the map goes with it
+            self._mmap = None
+        self._file.close()
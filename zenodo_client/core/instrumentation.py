@@ -0,0 +1,378 @@
+"""
+Spans for API calls and pipeline stages, exported as JSON lines and
+Prometheus metrics.
+
+Instrumentation is off until an exporter or hook is registered. While it is
+off, ``span()`` returns a shared no-op object, so instrumented code pays one
+function call and one attribute check per span.
+
+    from zenodo_client.core import instrumentation
+
+    instrumentation.add_exporter(instrumentation.JsonLinesExporter("spans.jsonl"))
+    with instrumentation.span("pipeline.upload", file="a.pdf") as s:
+        ...
+        s.add("bytes_sent", 1024)
+
+Hooks are objects with optional ``on_start(span)``/``on_end(span)`` methods
+(e.g. to start and stop a profiler around selected spans).
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..config.settings import METRICS_FILE, METRICS_PORT, TRACE_FILE
+
+logger = logging.getLogger(__name__)
+
+# Counters a finished span adds to its parent, so a stage span reports the
+# bytes, retries and waits of the HTTP requests made inside it
+ROLLUP_FIELDS = ("bytes_sent", "retries", "rate_limit_wait")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed operation. Use as a context manager; attributes are free-form."""
+
+    __slots__ = ("name", "span_id", "parent", "trace_id", "attributes", "start_time", "duration", "error",
+                 "_start", "_instrumentation")
+
+    def __init__(self, instrumentation, name, parent, attributes):
+        self._instrumentation = instrumentation
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = attributes
+        self.start_time = None
+        self.duration = None
+        self.error = None
+        self._start = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, name, value):
+        """Increments a numeric attribute."""
+        self.attributes[name] = self.attributes.get(name, 0) + value
+
+    @property
+    def outcome(self):
+        """Label used in metrics: the HTTP status for requests, else ok/error."""
+        if "status_code" in self.attributes:
+            return str(self.attributes["status_code"])
+        if self.error is not None or self.attributes.get("ok") is False:
+            return "error"
+        return "ok"
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._instrumentation._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self._instrumentation._finish(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "trace_id": self.trace_id,
+            "start": self.start_time,
+            "duration": self.duration,
+            "error": self.error,
+            "thread": threading.current_thread().name,
+            **self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned by span() while instrumentation is off."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Instrumentation:
+    """
+    Registry of exporters and hooks. The current span is kept in a context
+    variable: per thread, and per task under asyncio, so concurrent tasks
+    on one thread do not become each other's parents. A thread pool does not
+    carry it over: work submitted with ``contextvars.copy_context().run``
+    keeps the submitting span as its parent.
+    """
+
+    def __init__(self):
+        self.exporters = []
+        self.hooks = []
+        self.enabled = False
+        self._stack = contextvars.ContextVar(f"zenodo_spans_{id(self)}", default=())
+        self._lock = threading.Lock()
+        self._rollup_lock = threading.Lock()  # Children may finish on several threads at once
+
+    def _update(self):
+        self.enabled = bool(self.exporters or self.hooks)
+
+    def add_exporter(self, exporter):
+        with self._lock:
+            self.exporters = self.exporters + [exporter]
+            self._update()
+        return exporter
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self.exporters = [e for e in self.exporters if e is not exporter]
+            self._update()
+
+    def add_hook(self, hook):
+        with self._lock:
+            self.hooks = self.hooks + [hook]
+            self._update()
+        return hook
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self.hooks = [h for h in self.hooks if h is not hook]
+            self._update()
+
+    def current(self):
+        stack = self._stack.get()
+        return stack[-1] if stack else None
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, self.current(), attributes)
+
+    def _push(self, span):
+        self._stack.set(self._stack.get() + (span,))
+        for hook in self.hooks:
+            on_start = getattr(hook, "on_start", None)
+            if on_start is not None:
+                self._call(on_start, span)
+
+    def _finish(self, span):
+        stack = self._stack.get()
+        if stack and stack[-1] is span:
+            self._stack.set(stack[:-1])
+        if span.parent is not None:
+            with self._rollup_lock:
+                for field in ROLLUP_FIELDS:
+                    if field in span.attributes:
+                        span.parent.add(field, span.attributes[field])
+        for hook in self.hooks:
+            on_end = getattr(hook, "on_end", None)
+            if on_end is not None:
+                self._call(on_end, span)
+        for exporter in self.exporters:
+            self._call(exporter.export, span)
+
+    @staticmethod
+    def _call(fn, span):
+        # A broken exporter or hook must never fail an upload
+        try:
+            fn(span)
+        except Exception:
+            logger.exception("Instrumentation callback failed for span %s", span.name)
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusExporter:
+    """
+    Aggregates spans into Prometheus metrics (text exposition format),
+    labelled by span name and outcome. Counters of stage spans include the
+    requests made inside them, so sum within one span name only.
+
+    Pass ``textfile`` to rewrite a file for node_exporter's textfile
+    collector (at most every ``interval`` seconds and on close), or call
+    ``serve(port)`` to expose ``/metrics`` over HTTP.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, textfile=None, interval=10.0):
+        self.buckets = tuple(sorted(buckets))
+        self.textfile = textfile
+        self.interval = interval
+        self._series = {}  # (name, outcome) -> [bucket counts..., count, sum]
+        self._totals = {}  # (field, name) -> value
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+        self._server = None
+
+    def export(self, span):
+        key = (span.name, span.outcome)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += span.duration
+            for field in ROLLUP_FIELDS:
+                if field in span.attributes:
+                    total_key = (field, span.name)
+                    self._totals[total_key] = self._totals.get(total_key, 0) + span.attributes[field]
+            due = self.textfile and time.monotonic() - self._last_write >= self.interval
+        if due:
+            self.write_textfile()
+
+    def render(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+            totals = dict(self._totals)
+        lines = [
+            "# HELP zenodo_span_duration_seconds Duration of API calls and pipeline stages.",
+            "# TYPE zenodo_span_duration_seconds histogram",
+        ]
+        for (name, outcome), values in sorted(series.items()):
+            labels = f'span="{name}",outcome="{outcome}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'zenodo_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'zenodo_span_duration_seconds_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f"zenodo_span_duration_seconds_count{{{labels}}} {values[-2]}")
+            lines.append(f"zenodo_span_duration_seconds_sum{{{labels}}} {values[-1]:.6f}")
+        for field, metric, help_text in (
+                ("bytes_sent", "zenodo_span_bytes_sent_total", "Request body bytes sent."),
+                ("retries", "zenodo_span_retries_total", "Retried requests."),
+                ("rate_limit_wait", "zenodo_span_rate_limit_wait_seconds_total", "Seconds spent waiting for the rate limiter.")):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (f, name), value in sorted(totals.items()):
+                if f == field:
+                    lines.append(f'{metric}{{span="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        """Writes the metrics atomically (the collector never sees a partial file)."""
+        path = path or self.textfile
+        self._last_write = time.monotonic()
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".metrics-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves ``/metrics`` from a daemon thread; returns the HTTP server."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200 if self.path.split("?")[0] in ("/", "/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="zenodo-metrics", daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self.textfile:
+            self.write_textfile()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation():
+    return _instrumentation
+
+
+def span(name, **attributes):
+    """Starts a span on the process-wide registry (a no-op while it is off)."""
+    if not _instrumentation.enabled:
+        return _NOOP
+    return _instrumentation.span(name, **attributes)
+
+
+def add_exporter(exporter):
+    return _instrumentation.add_exporter(exporter)
+
+
+def remove_exporter(exporter):
+    _instrumentation.remove_exporter(exporter)
+
+
+def add_hook(hook):
+    return _instrumentation.add_hook(hook)
+
+
+def remove_hook(hook):
+    _instrumentation.remove_hook(hook)
+
+
+def configure(trace_file=None, metrics_file=None, metrics_port=None):
+    """
+    Enables the exporters selected by the arguments or, when omitted, by
+    ZENODO_TRACE_FILE, ZENODO_METRICS_FILE and ZENODO_METRICS_PORT.
+    Returns the PrometheusExporter, or None when metrics are off.
+    """
+    trace_file = trace_file or TRACE_FILE
+    metrics_file = metrics_file or METRICS_FILE
+    metrics_port = metrics_port or METRICS_PORT
+    if trace_file:
+        atexit.register(add_exporter(JsonLinesExporter(trace_file)).close)
+    if not (metrics_file or metrics_port):
+        return None
+    metrics = add_exporter(PrometheusExporter(textfile=metrics_file))
+    if metrics_port:
+        metrics.serve(metrics_port)
+    atexit.register(metrics.close)
+    return metrics
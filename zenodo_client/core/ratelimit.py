@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from ..config.settings import RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST
+
+
+def parse_retry_after(value, now=None):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class RateLimiter:
+    """
+    Client-side token bucket shared by every request of the process.
+
+    The bucket starts from the configured budget and is corrected from the
+    ``X-RateLimit-Limit``/``-Remaining``/``-Reset`` headers of each response,
+    so the pace follows what the server actually allows (including budget
+    spent by other processes with the same token). A 429 blocks *all*
+    callers until ``Retry-After`` (or the reset time), and retries use full
+    jitter so workers do not wake up and retry in lockstep.
+    """
+
+    def __init__(self, per_minute=None, burst=None, base_backoff=1.0, max_backoff=60.0):
+        per_minute = per_minute or RATE_LIMIT_PER_MINUTE
+        self.capacity = float(burst or RATE_LIMIT_BURST)
+        self.rate = per_minute / 60.0  # tokens per second
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # Counters exposed by stats()
+        self.requests = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self):
+        """
+        Takes one token and returns how many seconds the caller must wait
+        before sending. Does not sleep, so both the threaded and the asyncio
+        clients can use it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = 0.0
+            if self._tokens < 0:
+                wait = -self._tokens / self.rate
+            wait = max(wait, self._blocked_until - now)
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_time += wait
+            return wait
+
+    def acquire(self):
+        """Blocks until a request may be sent; returns the time waited."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def update_from_headers(self, headers):
+        """Learns the remaining budget and reset time from response headers."""
+        limit = _int_header(headers, "X-RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.capacity = float(limit)
+            # The server's count is authoritative (other clients share the budget)
+            self._tokens = min(self._tokens, float(remaining))
+            if reset is not None:
+                until_reset = max(1.0, _seconds_until(reset))
+                if remaining <= 0:
+                    self._blocked_until = max(self._blocked_until, now + until_reset)
+                else:
+                    # Spread what is left evenly over the rest of the window
+                    self.rate = remaining / until_reset
+
+    def on_throttled(self, headers, attempt):
+        """Registers a 429 and blocks every caller; returns the delay before retrying."""
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        if retry_after is None and reset is not None:
+            retry_after = max(0.0, _seconds_until(reset))
+        delay = self.backoff(attempt, retry_after)
+        with self._lock:
+            self.throttled += 1
+            self._tokens = min(self._tokens, 0.0)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Delay before retry ``attempt`` (0-based). Honors Retry-After plus a small
+        jitter; otherwise uses full-jitter exponential backoff.
+        """
+        with self._lock:
+            self.retries += 1
+        if retry_after is not None:
+            return retry_after + random.uniform(0, min(1.0, self.base_backoff))
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def stats(self):
+        """Counters of how often and how long requests waited for the limiter."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 3),
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _seconds_until(reset):
+    # X-RateLimit-Reset is an epoch timestamp; small values are relative seconds
+    return reset - time.time() if reset > 1_000_000_000 else float(reset)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the process-wide shared limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
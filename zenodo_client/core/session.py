@@ -0,0 +1,71 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config.settings import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default (connect, read) timeout to every request."""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(pool_size=None, connect_timeout=None, read_timeout=None):
+    """
+    Creates a requests.Session with keep-alive connection pooling and default timeouts.
+
+    The session keeps no cookies, so the only state shared between threads is
+    urllib3's connection pool, which is thread-safe.
+    """
+    pool_size = pool_size or HTTP_POOL_SIZE
+    timeout = (connect_timeout or HTTP_CONNECT_TIMEOUT, read_timeout or HTTP_READ_TIMEOUT)
+
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the process-wide shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure_session(pool_size=None, connect_timeout=None, read_timeout=None):
+    """Replaces the shared session, e.g. to size the pool for a number of workers."""
+    global _session
+    with _session_lock:
+        old, _session = _session, create_session(pool_size, connect_timeout, read_timeout)
+    if old is not None:
+        old.close()
+    return _session
+
+
+def close_session():
+    """Closes the shared session and its pooled connections."""
+    global _session
+    with _session_lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
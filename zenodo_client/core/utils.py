@@ -0,0 +1,78 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _fetch_page(client, url, params):
+    response = client.request("GET", url, params=params)
+    response.raise_for_status()
+    return response
+
+
+def _next_page(response, params, items, page_size):
+    """Returns (url, params) of the next page, or (None, None) on the last one."""
+    next_link = response.links.get("next", {}).get("url")
+    if next_link:
+        # The link already carries every query parameter
+        return next_link, None
+    if page_size and params is not None and len(items) >= page_size:
+        # No Link header: fall back to incrementing the page number
+        return response.request.url.split("?", 1)[0], {**params, "page": params.get("page", 1) + 1}
+    return None, None
+
+
+def iter_paginated(client, url, params=None, page_size=None, max_items=None, prefetch=True):
+    """
+    Lazily yields the items of a paginated list endpoint, following the
+    ``Link: rel="next"`` header (or the ``page`` parameter when ``page_size``
+    is given and the server sends no links).
+
+    With ``prefetch`` the next page is requested in a background thread
+    while the caller consumes the current one. At most two pages are held
+    in memory, however many records the account has. ``max_items`` stops
+    early without requesting pages that are not needed.
+    """
+    params = dict(params or {})
+    if page_size:
+        params.setdefault("size", page_size)
+        params.setdefault("page", 1)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zenodo-prefetch") if prefetch else None
+    yielded = 0
+    try:
+        response = _fetch_page(client, url, params)
+        while response is not None:
+            items = response.json()
+            next_url, next_params = _next_page(response, params, items, page_size)
+            params = next_params
+            needs_more = max_items is None or yielded + len(items) < max_items
+
+            future = None
+            if next_url and needs_more and executor is not None:
+                # In the caller's context: the request span belongs to the span iterating the pages
+                future = executor.submit(contextvars.copy_context().run, _fetch_page, client, next_url, next_params)
+            del response
+
+            for item in items:
+                yield item
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+            del items
+
+            if not next_url or not needs_more:
+                break
+            response = future.result() if future is not None else _fetch_page(client, next_url, next_params)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def collect_files(file_args, dir_path):
+    """Files of one deposition from --file (repeated) and/or --dir (its visible files, sorted)."""
+    file_paths = list(file_args or [])
+    if dir_path:
+        file_paths += sorted(
+            os.path.join(dir_path, name) for name in os.listdir(dir_path)
+            if not name.startswith('.') and os.path.isfile(os.path.join(dir_path, name))
+        )
+    return file_paths
@@ -0,0 +1,214 @@
+"""
+Local pre-flight validation of deposition metadata.
+
+Mirrors the rules of the Zenodo deposition API closely enough to catch,
+before any draft is created or any byte uploaded, the errors that would
+otherwise only come back as a 400 from the metadata or publish step. All
+problems of a record are reported at once.
+"""
+import re
+from datetime import date
+
+# Tipos de submissão permitidos pela API do Zenodo
+UPLOAD_TYPES = [
+    'publication', 'poster', 'presentation', 'dataset', 'image',
+    'video', 'software', 'lesson', 'physicalobject', 'other'
+]
+
+PUBLICATION_TYPES = [
+    'annotationcollection', 'book', 'section', 'conferencepaper', 'datamanagementplan',
+    'article', 'patent', 'preprint', 'deliverable', 'milestone', 'proposal', 'report',
+    'softwaredocumentation', 'taxonomictreatment', 'technicalnote', 'thesis',
+    'workingpaper', 'other'
+]
+
+IMAGE_TYPES = ['figure', 'plot', 'drawing', 'diagram', 'photo', 'other']
+
+ACCESS_RIGHTS = ['open', 'embargoed', 'restricted', 'closed']
+
+RELATIONS = frozenset([
+    'isCitedBy', 'cites', 'isSupplementTo', 'isSupplementedBy', 'isContinuedBy', 'continues',
+    'isDescribedBy', 'describes', 'hasMetadata', 'isMetadataFor', 'isNewVersionOf',
+    'isPreviousVersionOf', 'isPartOf', 'hasPart', 'isReferencedBy', 'references',
+    'isDocumentedBy', 'documents', 'isCompiledBy', 'compiles', 'isVariantFormOf',
+    'isOriginalFormOf', 'isIdenticalTo', 'isAlternateIdentifier', 'isReviewedBy', 'reviews',
+    'isDerivedFrom', 'isSourceOf', 'requires', 'isRequiredBy', 'isObsoletedBy', 'obsoletes',
+])
+
+CONTRIBUTOR_TYPES = frozenset([
+    'ContactPerson', 'DataCollector', 'DataCurator', 'DataManager', 'Distributor', 'Editor',
+    'HostingInstitution', 'Producer', 'ProjectLeader', 'ProjectManager', 'ProjectMember',
+    'RegistrationAgency', 'RegistrationAuthority', 'RelatedPerson', 'Researcher',
+    'ResearchGroup', 'RightsHolder', 'Supervisor', 'Sponsor', 'WorkPackageLeader', 'Other',
+])
+
+# Every metadata field the deposition API accepts; anything else is rejected
+KNOWN_FIELDS = frozenset([
+    'upload_type', 'publication_type', 'image_type', 'publication_date', 'title', 'creators',
+    'description', 'access_right', 'license', 'embargo_date', 'access_conditions', 'doi',
+    'prereserve_doi', 'keywords', 'notes', 'related_identifiers', 'contributors', 'references',
+    'communities', 'grants', 'journal_title', 'journal_volume', 'journal_issue', 'journal_pages',
+    'conference_title', 'conference_acronym', 'conference_dates', 'conference_place',
+    'conference_url', 'conference_session', 'conference_session_part', 'imprint_publisher',
+    'imprint_isbn', 'imprint_place', 'partof_title', 'partof_pages', 'thesis_supervisors',
+    'thesis_university', 'subjects', 'version', 'language', 'locations', 'dates', 'method',
+])
+
+_ORCID = re.compile(r"^\d{4}-\d{4}-\d{4}-\d{3}[\dX]$")
+_LANGUAGE = re.compile(r"^[a-z]{3}$")
+_DOI = re.compile(r"^10\.\d{4,9}/\S+$")
+
+
+class MetadataValidationError(ValueError):
+    """Raised by ensure_valid(); ``errors`` lists every problem found."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _orcid_checksum_ok(orcid):
+    # ISO 7064 11,2 check digit, as used by ORCID
+    total = 0
+    for ch in orcid[:-1].replace("-", ""):
+        total = (total + int(ch)) * 2
+    check = (12 - total % 11) % 11
+    return orcid[-1] == ("X" if check == 10 else str(check))
+
+
+def _is_text(value):
+    return isinstance(value, str) and value.strip() != ""
+
+
+def _parse_date(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _check_people(errors, field, people, allowed_types=None):
+    if not isinstance(people, list):
+        errors.append(f"{field}: deve ser uma lista")
+        return
+    for i, person in enumerate(people):
+        where = f"{field}[{i}]"
+        if not isinstance(person, dict):
+            errors.append(f"{where}: deve ser um objeto com 'name'")
+            continue
+        if not _is_text(person.get("name")):
+            errors.append(f"{where}.name: obrigatório (formato 'Sobrenome, Nome')")
+        orcid = person.get("orcid")
+        if orcid and not (isinstance(orcid, str) and _ORCID.match(orcid) and _orcid_checksum_ok(orcid)):
+            errors.append(f"{where}.orcid: ORCID inválido: {orcid!r}")
+        if "affiliation" in person and person["affiliation"] is not None and not isinstance(person["affiliation"], str):
+            errors.append(f"{where}.affiliation: deve ser texto")
+        if allowed_types is not None and person.get("type") not in allowed_types:
+            errors.append(f"{where}.type: tipo de contribuidor inválido: {person.get('type')!r}")
+
+
+def _check_string_list(errors, field, values):
+    if not isinstance(values, list) or not all(_is_text(v) for v in values):
+        errors.append(f"{field}: deve ser uma lista de textos não vazios")
+
+
+def validate_metadata(metadata, today=None):
+    """
+    Returns the list of problems found in ``metadata`` (empty when valid).
+    Messages are prefixed with the field path, e.g. ``creators[1].name``.
+    """
+    if not isinstance(metadata, dict):
+        return ["metadados: deve ser um objeto JSON"]
+    errors = []
+    get = metadata.get
+
+    unknown = [k for k in metadata if k not in KNOWN_FIELDS]
+    if unknown:
+        errors.append(f"campos desconhecidos: {', '.join(sorted(unknown))}")
+
+    for field in ("title", "description"):
+        if not _is_text(get(field)):
+            errors.append(f"{field}: obrigatório")
+
+    upload_type = get("upload_type")
+    if upload_type not in UPLOAD_TYPES:
+        errors.append(f"upload_type: obrigatório, um de {', '.join(UPLOAD_TYPES)} (recebido {upload_type!r})")
+    elif upload_type == "publication" and get("publication_type") not in PUBLICATION_TYPES:
+        errors.append(f"publication_type: obrigatório para publication, um de {', '.join(PUBLICATION_TYPES)} "
+                      f"(recebido {get('publication_type')!r})")
+    elif upload_type == "image" and get("image_type") not in IMAGE_TYPES:
+        errors.append(f"image_type: obrigatório para image, um de {', '.join(IMAGE_TYPES)} "
+                      f"(recebido {get('image_type')!r})")
+
+    creators = get("creators")
+    if not creators:
+        errors.append("creators: obrigatório (ao menos um criador)")
+    else:
+        _check_people(errors, "creators", creators)
+    if "contributors" in metadata:
+        _check_people(errors, "contributors", get("contributors"), CONTRIBUTOR_TYPES)
+
+    access_right = get("access_right", "open")
+    if access_right not in ACCESS_RIGHTS:
+        errors.append(f"access_right: um de {', '.join(ACCESS_RIGHTS)} (recebido {access_right!r})")
+    if access_right == "embargoed":
+        embargo = _parse_date(get("embargo_date"))
+        if embargo is None:
+            errors.append("embargo_date: obrigatório para acesso embargoed (AAAA-MM-DD)")
+        elif embargo <= (today or date.today()):
+            errors.append(f"embargo_date: deve ser uma data futura (recebido {get('embargo_date')})")
+    elif "embargo_date" in metadata and _parse_date(get("embargo_date")) is None:
+        errors.append(f"embargo_date: data inválida {get('embargo_date')!r} (AAAA-MM-DD)")
+    if access_right == "restricted" and not _is_text(get("access_conditions")):
+        errors.append("access_conditions: obrigatório para acesso restricted")
+    if access_right in ("open", "embargoed") and "license" in metadata and not _is_text(get("license")):
+        errors.append("license: deve ser um identificador de licença (ex.: cc-by-4.0)")
+
+    if "publication_date" in metadata and _parse_date(get("publication_date")) is None:
+        errors.append(f"publication_date: data inválida {get('publication_date')!r} (AAAA-MM-DD)")
+
+    if "doi" in metadata and get("doi") and not (isinstance(get("doi"), str) and _DOI.match(get("doi"))):
+        errors.append(f"doi: DOI inválido {get('doi')!r}")
+
+    if "language" in metadata and not (isinstance(get("language"), str) and _LANGUAGE.match(get("language"))):
+        errors.append(f"language: código ISO 639-2/3 de três letras (recebido {get('language')!r})")
+
+    for field in ("keywords", "references"):
+        if field in metadata:
+            _check_string_list(errors, field, get(field))
+    if "thesis_supervisors" in metadata:
+        _check_people(errors, "thesis_supervisors", get("thesis_supervisors"))
+
+    related = get("related_identifiers")
+    if related is not None:
+        if not isinstance(related, list):
+            errors.append("related_identifiers: deve ser uma lista")
+        else:
+            for i, item in enumerate(related):
+                where = f"related_identifiers[{i}]"
+                if not isinstance(item, dict):
+                    errors.append(f"{where}: deve ser um objeto com 'identifier' e 'relation'")
+                    continue
+                if not _is_text(item.get("identifier")):
+                    errors.append(f"{where}.identifier: obrigatório")
+                if item.get("relation") not in RELATIONS:
+                    errors.append(f"{where}.relation: relação inválida {item.get('relation')!r}")
+
+    for field, key in (("communities", "identifier"), ("grants", "id")):
+        values = get(field)
+        if values is None:
+            continue
+        if not isinstance(values, list) or not all(isinstance(v, dict) and _is_text(v.get(key)) for v in values):
+            errors.append(f"{field}: deve ser uma lista de objetos com '{key}'")
+
+    return errors
+
+
+def ensure_valid(metadata, today=None):
+    """Raises MetadataValidationError listing every problem, or returns ``metadata``."""
+    errors = validate_metadata(metadata, today)
+    if errors:
+        raise MetadataValidationError(errors)
+    return metadata
@@ -0,0 +1,290 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from ..core.hashing import file_checksum, normalize_checksum
+from ..core.sqlite import SQLiteStore
+from .metadata import SIDECAR_SUFFIX, sidecar_path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_files (
+    id            INTEGER PRIMARY KEY,
+    original_name TEXT NOT NULL,
+    original_path TEXT,
+    archived_path TEXT,
+    doi           TEXT,
+    deposition_id INTEGER,
+    md5           TEXT,
+    size          INTEGER,
+    archived_at   REAL NOT NULL,
+    removed_at    REAL
+);
+CREATE INDEX IF NOT EXISTS archived_files_name ON archived_files (original_name);
+CREATE INDEX IF NOT EXISTS archived_files_doi ON archived_files (doi);
+CREATE INDEX IF NOT EXISTS archived_files_md5 ON archived_files (md5);
+CREATE UNIQUE INDEX IF NOT EXISTS archived_files_path ON archived_files (archived_path);
+CREATE INDEX IF NOT EXISTS archived_files_age ON archived_files (archived_at) WHERE removed_at IS NULL;
+"""
+
+# Kept inside the archive root, next to the shards it describes
+INDEX_FILE = ".archive_index.db"
+
+SHARD_POLICIES = ("date", "hash")
+
+# Entries of the old flat layout: "<YYYYmmdd-HHMMSS>_<original name>"
+_LEGACY_NAME = re.compile(r"^(\d{8}-\d{6})_(.+)$")
+
+
+class ArchiveStore(SQLiteStore):
+    """
+    Archive of uploaded files, sharded so no directory grows without bound:
+    ``<root>/YYYY/MM/DD/<HHMMSS>_<name>`` (``shard="date"``) or
+    ``<root>/ab/cd/<YYYYmmdd-HHMMSS>_<name>`` by MD5 prefix (``shard="hash"``).
+
+    Files are renamed into place (or hardlinked with ``keep_source``) when
+    the archive is on the same filesystem; only a cross-filesystem archive
+    costs a copy. A SQLite index next to the shards maps original name,
+    DOI and MD5 to the archived path.
+
+    Retention (``retention_days``) and compaction run from
+    ``start_maintenance()`` in a background thread, in short transactions
+    that never hold up ``archive()`` calls from upload workers.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, root, shard="date", retention_days=None, index_path=None, timeout=30.0):
+        if shard not in SHARD_POLICIES:
+            raise ValueError(f"shard must be one of {', '.join(SHARD_POLICIES)}, got {shard!r}")
+        os.makedirs(root, exist_ok=True)
+        self.root = os.path.abspath(root)
+        self.shard = shard
+        self.retention_days = retention_days
+        self._device = os.stat(self.root).st_dev
+        self._maintenance = None
+        self._stop = threading.Event()
+        super().__init__(index_path or os.path.join(self.root, INDEX_FILE), timeout=timeout)
+
+    def _shard_dir(self, when, md5):
+        if self.shard == "hash":
+            return os.path.join(md5[:2], md5[2:4])
+        return time.strftime("%Y/%m/%d", time.localtime(when))
+
+    def _stamp(self, when):
+        # The date shard already carries the day
+        return time.strftime("%H%M%S" if self.shard == "date" else "%Y%m%d-%H%M%S", time.localtime(when))
+
+    def _reserve(self, directory, name):
+        """Creates an empty placeholder with a free name (atomic across processes); returns its relative path."""
+        stem, ext = os.path.splitext(name)
+        n = 0
+        while n < 1000:
+            candidate = os.path.join(directory, name if n == 0 else f"{stem}-{n}{ext}")
+            try:
+                os.close(os.open(os.path.join(self.root, candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return candidate
+            except FileExistsError:
+                n += 1
+            except FileNotFoundError:
+                # New shard, or an empty one just pruned by compact()
+                os.makedirs(os.path.join(self.root, directory), exist_ok=True)
+        raise FileExistsError(f"no free name for {name} in {directory}")
+
+    def _transfer(self, source, target, keep_source):
+        """Puts ``source`` at ``target`` (a reserved placeholder); returns how: rename, link or copy."""
+        if os.stat(source).st_dev == self._device:
+            if not keep_source:
+                os.rename(source, target)
+                return "rename"
+            try:
+                os.link(source, target + ".link")
+                os.rename(target + ".link", target)
+                return "link"
+            except OSError:
+                pass  # No hardlinks on this filesystem: copy
+        shutil.copyfile(source, target + ".part")
+        shutil.copystat(source, target + ".part")
+        os.rename(target + ".part", target)
+        if not keep_source:
+            os.remove(source)
+        return "copy"
+
+    def archive(self, file_path, doi=None, deposition_id=None, md5=None, keep_source=False, when=None, name=None):
+        """
+        Moves ``file_path`` (and its metadata sidecar, if any) into its shard
+        and indexes it under ``name`` (default: its base name). Returns the
+        absolute archived path.
+        """
+        when = time.time() if when is None else when
+        name = name or os.path.basename(file_path)
+        size = os.path.getsize(file_path)
+        if md5 is None and self.shard == "hash":
+            md5 = file_checksum(file_path)
+        relative = self._reserve(self._shard_dir(when, md5), f"{self._stamp(when)}_{name}")
+        target = os.path.join(self.root, relative)
+        try:
+            how = self._transfer(file_path, target, keep_source)
+        except BaseException:
+            os.remove(target)
+            raise
+        sidecar = sidecar_path(file_path)
+        if os.path.exists(sidecar):
+            self._transfer(sidecar, sidecar_path(target), keep_source)
+        self._connect().execute(
+            """
+            INSERT INTO archived_files (original_name, original_path, archived_path, doi, deposition_id, md5, size,
+                                        archived_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (name, os.path.abspath(file_path), relative, doi, deposition_id, md5, size, when),
+        )
+        logger.debug("Archived %s -> %s (%s)", file_path, relative, how)
+        return target
+
+    def _rows(self, where, params):
+        rows = self._connect().execute(
+            f"SELECT * FROM archived_files WHERE {where} ORDER BY archived_at DESC, id DESC", params
+        )
+        return [{**dict(row), "path": os.path.join(self.root, row["archived_path"]) if row["archived_path"] else None}
+                for row in rows]
+
+    def lookup(self, name):
+        """Entries archived under an original file name, newest first (``path`` is None once expired)."""
+        return self._rows("original_name = ?", (name,))
+
+    def find_doi(self, doi):
+        return self._rows("doi = ?", (doi,))
+
+    def find_checksum(self, md5):
+        return self._rows("md5 = ?", (normalize_checksum(md5),))
+
+    def apply_retention(self, retention_days=None, batch_size=200):
+        """
+        Deletes archived files older than ``retention_days`` (default: the
+        store's). Their index rows stay, with ``path`` None, so names still
+        resolve to DOIs. Returns how many files were removed.
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if not retention_days:
+            return 0
+        cutoff = time.time() - retention_days * 86400
+        conn = self._connect()
+        removed = 0
+        while not self._stop.is_set():
+            rows = conn.execute(
+                "SELECT id, archived_path FROM archived_files WHERE removed_at IS NULL AND archived_at < ? LIMIT ?",
+                (cutoff, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                path = os.path.join(self.root, row["archived_path"])
+                for p in (path, sidecar_path(path)):
+                    try:
+                        os.remove(p)
+                    except FileNotFoundError:
+                        pass
+            self._mark_removed(conn, [row["id"] for row in rows])
+            removed += len(rows)
+        if removed:
+            logger.info("Archive retention: %s file(s) older than %s day(s) removed", removed, retention_days)
+        return removed
+
+    def _mark_removed(self, conn, ids):
+        # One short transaction per batch: archive() calls wait at most this long
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("UPDATE archived_files SET archived_path = NULL, removed_at = ? WHERE id = ?",
+                             [(time.time(), i) for i in ids])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _adopt_legacy(self):
+        """Moves files of the old flat layout (``<YYYYmmdd-HHMMSS>_<name>`` in the root) into shards."""
+        adopted = 0
+        with os.scandir(self.root) as entries:
+            names = [e.name for e in entries if e.is_file(follow_symlinks=False) and not e.name.startswith(".")]
+        # Sidecars go with their file (archive() moves them)
+        for name in names:
+            match = _LEGACY_NAME.match(name)
+            if self._stop.is_set() or name.endswith(SIDECAR_SUFFIX) or not match:
+                continue
+            path = os.path.join(self.root, name)
+            when = datetime.strptime(match.group(1), "%Y%m%d-%H%M%S").timestamp()
+            self.archive(path, when=when, name=match.group(2))
+            adopted += 1
+        return adopted
+
+    def compact(self):
+        """
+        Adopts files left in the old flat layout, forgets index entries whose
+        file was deleted by hand, and removes empty shard directories.
+        Returns {"adopted": n, "missing": n, "pruned": n}.
+        """
+        adopted = self._adopt_legacy()
+        conn = self._connect()
+        missing = []
+        for row in conn.execute("SELECT id, archived_path FROM archived_files WHERE removed_at IS NULL"):
+            if not os.path.exists(os.path.join(self.root, row["archived_path"])):
+                missing.append(row["id"])
+        for start in range(0, len(missing), 200):
+            self._mark_removed(conn, missing[start:start + 200])
+        pruned = 0
+        for directory, _, files in os.walk(self.root, topdown=False):
+            # Bottom-up, so a day emptied above leaves its month empty too
+            if directory != self.root and not files:
+                try:
+                    os.rmdir(directory)
+                    pruned += 1
+                except OSError:
+                    pass  # Something was archived into it meanwhile
+        logger.info("Archive compaction: %s adopted, %s missing, %s empty director(ies) removed",
+                    adopted, len(missing), pruned)
+        return {"adopted": adopted, "missing": len(missing), "pruned": pruned}
+
+    def start_maintenance(self, interval=3600):
+        """Runs retention and compaction now and every ``interval`` seconds, in a daemon thread."""
+        if self._maintenance is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.apply_retention()
+                    self.compact()
+                except Exception:
+                    logger.exception("Archive maintenance failed")
+                self._stop.wait(interval)
+            self.close()
+
+        self._stop.clear()
+        self._maintenance = threading.Thread(target=run, name="archive-maintenance", daemon=True)
+        self._maintenance.start()
+
+    def stop_maintenance(self, timeout=None):
+        if self._maintenance is None:
+            return
+        self._stop.set()
+        self._maintenance.join(timeout)
+        self._maintenance = None
+        self._stop.clear()
+
+    def stats(self):
+        row = self._connect().execute(
+            """
+            SELECT COUNT(*) AS entries,
+                   COALESCE(SUM(removed_at IS NULL), 0) AS files,
+                   COALESCE(SUM(CASE WHEN removed_at IS NULL THEN size END), 0) AS bytes,
+                   MIN(CASE WHEN removed_at IS NULL THEN archived_at END) AS oldest
+            FROM archived_files
+            """
+        ).fetchone()
+        return {**dict(row), "root": self.root, "shard": self.shard, "retention_days": self.retention_days}
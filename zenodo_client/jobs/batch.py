@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchItemResult:
+    """Outcome of processing a single file inside a batch."""
+
+    def __init__(self, file_path, ok, value=None, error=None, duration=0.0, size=0):
+        self.file_path = file_path
+        self.ok = ok
+        self.value = value
+        self.error = error
+        self.duration = duration
+        self.size = size
+
+
+class BatchReport:
+    """
+    Collects per-file results and computes the throughput of a batch run.
+    With ``keep_results=False`` (long-running daemons) only running totals
+    are kept, so memory does not grow with the number of files processed.
+    """
+
+    def __init__(self, keep_results=True):
+        self.keep_results = keep_results
+        self.results = []
+        self.total = 0
+        self.succeeded_count = 0
+        self.succeeded_bytes = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self.total += 1
+            if result.ok:
+                self.succeeded_count += 1
+                self.succeeded_bytes += result.size
+            if self.keep_results:
+                self.results.append(result)
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def failed_count(self):
+        return self.total - self.succeeded_count
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    def summary_lines(self):
+        """Returns the human readable summary printed at the end of a batch."""
+        lines = []
+        for r in sorted(self.results, key=lambda r: r.file_path):
+            lines.append(format_result(r))
+
+        elapsed = self.elapsed or 1e-9
+        lines.append("-" * 50)
+        lines.append(f"  Arquivos: {self.total} | Sucesso: {self.succeeded_count} | Falha: {self.failed_count}")
+        lines.append(f"  Tempo total: {elapsed:.1f}s")
+        lines.append(f"  Vazão: {self.succeeded_count / elapsed * 60:.2f} arquivos/min, "
+                     f"{self.succeeded_bytes / elapsed / (1024 * 1024):.2f} MB/s")
+        return lines
+
+
+def format_result(r):
+    """Formats one BatchItemResult as a summary line."""
+    name = os.path.basename(r.file_path)
+    if r.ok:
+        doi = r.value.get('doi', 'N/A') if isinstance(r.value, dict) else 'N/A'
+        return f"  [OK]    {name} ({r.duration:.1f}s) DOI: {doi}"
+    return f"  [FALHA] {name} ({r.duration:.1f}s) {r.error or ''}".rstrip()
+
+
+def _run_one(worker, file_path, args):
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    start = time.monotonic()
+    try:
+        value = worker(file_path, *args)
+    except Exception as e:  # A failure in one file must not abort the batch
+        return BatchItemResult(file_path, False, error=str(e), duration=time.monotonic() - start, size=size)
+    ok = value is not None and value is not False
+    error = None if ok else "pipeline retornou falha"
+    return BatchItemResult(file_path, ok, value=value, error=error, duration=time.monotonic() - start, size=size)
+
+
+class BatchPool:
+    """
+    Bounded worker pool that runs ``worker(file_path, *args)`` for each
+    submitted file and collects the results in a BatchReport. Files can be
+    submitted as they become ready (metadata generated, a new file in the
+    watched queue).
+    ``on_result(result)`` is called once per file as it finishes, one call
+    at a time, so callers may print or update state without their own lock.
+    ``keep_results=False`` keeps only totals in the report (see BatchReport).
+    """
+
+    def __init__(self, worker, max_workers=4, on_result=None, keep_results=True):
+        self.worker = worker
+        self.on_result = on_result
+        self.report = BatchReport(keep_results)
+        self._result_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="zenodo-upload")
+
+    def submit(self, file_path, args=()):
+        future = self._executor.submit(_run_one, self.worker, file_path, args)
+        future.add_done_callback(self._collect)
+        return future
+
+    def _collect(self, future):
+        result = future.result()
+        with self._result_lock:
+            self.report.add(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+    def shutdown(self, wait=True):
+        """Stops accepting files, waits for the running ones and returns the report."""
+        self._executor.shutdown(wait=wait)
+        self.report.finish()
+        return self.report
+
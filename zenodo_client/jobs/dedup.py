@@ -0,0 +1,134 @@
+import time
+
+from ..core.hashing import normalize_checksum
+from ..core.sqlite import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_index (
+    md5           TEXT PRIMARY KEY,
+    deposition_id INTEGER,
+    doi           TEXT,
+    filename      TEXT,
+    size          INTEGER,
+    owner         TEXT,
+    updated_at    REAL NOT NULL
+);
+"""
+
+
+class DedupIndex(SQLiteStore):
+    """
+    Local index from a file's content hash (MD5, as reported by Zenodo) to
+    the deposition and DOI it was published under.
+
+    Besides published entries, the index holds "claims": rows without a DOI
+    that mark a hash as being uploaded by some job (``owner``). A second
+    copy of the same content arriving while the first is still in flight
+    sees the claim and is skipped instead of creating a second record.
+    A claim whose owner is gone (``is_stale(owner)``: the job failed, the
+    process died, the file was moved) is taken over rather than honoured.
+    """
+
+    schema = _SCHEMA
+
+    def lookup(self, md5):
+        """Returns the entry for a hash as a dict, or None."""
+        row = self._connect().execute("SELECT * FROM content_index WHERE md5 = ?", (md5,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, md5, owner, filename=None, size=None, is_stale=None):
+        """
+        Atomically claims ``md5`` for ``owner``. Returns None if the claim is
+        ours (new, already held by the same owner, or taken over from an
+        owner ``is_stale`` rejects), or the existing entry if the content is
+        published or claimed by another live job.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM content_index WHERE md5 = ?", (md5,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO content_index (md5, filename, size, owner, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (md5, filename, size, owner, time.time()),
+                )
+                existing = None
+            elif row["doi"] is None and row["owner"] == owner:
+                existing = None
+            elif row["doi"] is None and is_stale is not None and is_stale(row["owner"]):
+                conn.execute(
+                    "UPDATE content_index SET filename = ?, size = ?, owner = ?, updated_at = ? WHERE md5 = ?",
+                    (filename, size, owner, time.time(), md5),
+                )
+                existing = None
+            else:
+                existing = dict(row)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return existing
+
+    def release(self, md5, owner):
+        """Drops an unpublished claim held by ``owner``."""
+        self._connect().execute(
+            "DELETE FROM content_index WHERE md5 = ? AND owner = ? AND doi IS NULL", (md5, owner)
+        )
+
+    def record_published(self, md5, deposition_id, doi, filename=None, size=None):
+        """Stores (or completes the claim of) a published file."""
+        self._connect().execute(
+            """
+            INSERT INTO content_index (md5, deposition_id, doi, filename, size, owner, updated_at)
+            VALUES (?, ?, ?, ?, ?, NULL, ?)
+            ON CONFLICT (md5) DO UPDATE SET
+                deposition_id = excluded.deposition_id,
+                doi = excluded.doi,
+                filename = COALESCE(excluded.filename, content_index.filename),
+                size = COALESCE(excluded.size, content_index.size),
+                owner = NULL,
+                updated_at = excluded.updated_at
+            """,
+            (md5, deposition_id, doi, filename, size, time.time()),
+        )
+
+    def prune_stale_claims(self, is_stale):
+        """Drops the unpublished claims whose owner ``is_stale`` rejects; returns how many."""
+        conn = self._connect()
+        owners = [row["owner"] for row in conn.execute(
+            "SELECT DISTINCT owner FROM content_index WHERE doi IS NULL AND owner IS NOT NULL")]
+        stale = [owner for owner in owners if is_stale(owner)]
+        conn.executemany("DELETE FROM content_index WHERE doi IS NULL AND owner = ?", [(o,) for o in stale])
+        return len(stale)
+
+    def rebuild(self, depositions, is_stale=None):
+        """
+        Rebuilds the published entries from an iterable of deposition dicts as
+        returned by the depositions API. Drafts are ignored and in-flight
+        claims are kept, except those ``is_stale`` rejects. Returns the
+        number of indexed files.
+        """
+        # Collect first so the write lock is not held while the API is paged
+        entries = []
+        for deposition in depositions:
+            doi = deposition.get("doi")
+            if not deposition.get("submitted") or not doi:
+                continue
+            for f in deposition.get("files") or []:
+                md5 = normalize_checksum(f.get("checksum"))
+                if md5:
+                    entries.append((md5, deposition.get("id"), doi, f.get("filename"), f.get("filesize")))
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM content_index WHERE doi IS NOT NULL")
+            for entry in entries:
+                self.record_published(*entry)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if is_stale is not None:
+            self.prune_stale_claims(is_stale)
+        return len(entries)
@@ -0,0 +1,279 @@
+import json
+import logging
+import sqlite3
+import time
+
+from ..core.hashing import normalize_checksum
+from ..core.sqlite import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS depositions (
+    id               INTEGER PRIMARY KEY,
+    conceptrecid     TEXT,
+    doi              TEXT,
+    title            TEXT,
+    upload_type      TEXT,
+    publication_type TEXT,
+    access_right     TEXT,
+    license          TEXT,
+    publication_date TEXT,
+    state            TEXT,
+    submitted        INTEGER,
+    created          TEXT,
+    modified         TEXT,
+    data             TEXT NOT NULL,
+    synced_at        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS depositions_modified ON depositions (modified);
+CREATE INDEX IF NOT EXISTS depositions_doi ON depositions (doi);
+CREATE TABLE IF NOT EXISTS deposition_creators (
+    deposition_id INTEGER NOT NULL,
+    position      INTEGER NOT NULL,
+    name          TEXT,
+    affiliation   TEXT,
+    orcid         TEXT,
+    PRIMARY KEY (deposition_id, position)
+);
+CREATE INDEX IF NOT EXISTS deposition_creators_name ON deposition_creators (name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS deposition_keywords (
+    deposition_id INTEGER NOT NULL,
+    keyword       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deposition_keywords_keyword ON deposition_keywords (keyword COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS deposition_keywords_deposition ON deposition_keywords (deposition_id);
+CREATE TABLE IF NOT EXISTS deposition_files (
+    deposition_id INTEGER NOT NULL,
+    file_id       TEXT,
+    filename      TEXT,
+    filesize      INTEGER,
+    checksum      TEXT
+);
+CREATE INDEX IF NOT EXISTS deposition_files_deposition ON deposition_files (deposition_id);
+CREATE INDEX IF NOT EXISTS deposition_files_checksum ON deposition_files (checksum);
+CREATE VIRTUAL TABLE IF NOT EXISTS depositions_fts USING fts5 (
+    title, description, creators, keywords, filenames, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS index_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Columns returned by search(); the full deposition JSON is in get()
+SUMMARY_COLUMNS = ("id", "doi", "title", "upload_type", "state", "publication_date", "modified")
+
+
+def _fts_query(text):
+    """Quotes each term, so user input never trips over FTS5 query syntax."""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " ".join(f'"{t}"' for t in terms)
+
+
+class DepositionIndex(SQLiteStore):
+    """
+    Local copy of the account's depositions (metadata and file listings)
+    for offline queries: filters on indexed columns and full-text search
+    (SQLite FTS5) over titles, descriptions, creators, keywords and
+    filenames.
+
+    ``sync()`` pages the depositions API most recently modified first and
+    stops at the first record not modified since the previous sync, so a
+    routine sync costs one or two requests.
+    """
+
+    schema = _SCHEMA
+
+    def _get_state(self, key):
+        row = self._connect().execute("SELECT value FROM index_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key, value):
+        self._connect().execute("INSERT OR REPLACE INTO index_state (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def last_modified(self):
+        """``modified`` of the newest record seen by the last completed sync."""
+        return self._get_state("last_modified")
+
+    def _delete(self, conn, deposition_id):
+        conn.execute("DELETE FROM depositions WHERE id = ?", (deposition_id,))
+        conn.execute("DELETE FROM deposition_creators WHERE deposition_id = ?", (deposition_id,))
+        conn.execute("DELETE FROM deposition_keywords WHERE deposition_id = ?", (deposition_id,))
+        conn.execute("DELETE FROM deposition_files WHERE deposition_id = ?", (deposition_id,))
+        conn.execute("DELETE FROM depositions_fts WHERE rowid = ?", (deposition_id,))
+
+    def _upsert(self, conn, deposition):
+        dep_id = deposition["id"]
+        metadata = deposition.get("metadata") or {}
+        creators = metadata.get("creators") or []
+        keywords = metadata.get("keywords") or []
+        files = deposition.get("files") or []
+        self._delete(conn, dep_id)
+        conn.execute(
+            """
+            INSERT INTO depositions (id, conceptrecid, doi, title, upload_type, publication_type, access_right,
+                                     license, publication_date, state, submitted, created, modified, data, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (dep_id, deposition.get("conceptrecid"), deposition.get("doi") or metadata.get("doi"),
+             metadata.get("title") or deposition.get("title"), metadata.get("upload_type"),
+             metadata.get("publication_type"), metadata.get("access_right"),
+             metadata.get("license") if isinstance(metadata.get("license"), str) else None,
+             metadata.get("publication_date"), deposition.get("state"), int(bool(deposition.get("submitted"))),
+             deposition.get("created"), deposition.get("modified"),
+             json.dumps(deposition, ensure_ascii=False), time.time()),
+        )
+        conn.executemany(
+            "INSERT INTO deposition_creators (deposition_id, position, name, affiliation, orcid) VALUES (?, ?, ?, ?, ?)",
+            [(dep_id, i, c.get("name"), c.get("affiliation") or None, c.get("orcid") or None)
+             for i, c in enumerate(creators) if isinstance(c, dict)],
+        )
+        conn.executemany("INSERT INTO deposition_keywords (deposition_id, keyword) VALUES (?, ?)",
+                         [(dep_id, k) for k in keywords if isinstance(k, str)])
+        conn.executemany(
+            "INSERT INTO deposition_files (deposition_id, file_id, filename, filesize, checksum) VALUES (?, ?, ?, ?, ?)",
+            [(dep_id, f.get("id"), f.get("filename"), f.get("filesize"), normalize_checksum(f.get("checksum")))
+             for f in files],
+        )
+        conn.execute(
+            "INSERT INTO depositions_fts (rowid, title, description, creators, keywords, filenames) VALUES (?, ?, ?, ?, ?, ?)",
+            (dep_id, metadata.get("title") or "", metadata.get("description") or "",
+             " ; ".join(c.get("name") or "" for c in creators if isinstance(c, dict)),
+             " ; ".join(k for k in keywords if isinstance(k, str)),
+             " ; ".join(f.get("filename") or "" for f in files)),
+        )
+
+    def add(self, depositions):
+        """Inserts or replaces deposition dicts as returned by the API; returns how many."""
+        conn = self._connect()
+        count = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for deposition in depositions:
+                self._upsert(conn, deposition)
+                count += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def sync(self, deposition_api, full=False, page_size=100, batch_size=500):
+        """
+        Brings the index up to date with ``deposition_api``
+        (a DepositionAPI). Incremental unless ``full`` or the index is
+        empty; a full sync also drops records no longer in the account.
+        Returns {"updated": n, "removed": n, "full": bool}.
+        """
+        since = None if full else self.last_modified
+        full = since is None
+        newest = since
+        seen = set()
+        updated = 0
+        batch = []
+        for deposition in deposition_api.iter_depositions(page_size=page_size, sort="mostrecent"):
+            modified = deposition.get("modified")
+            # Listing is newest first: everything after this was already synced
+            if since is not None and modified is not None and modified < since:
+                break
+            if modified is not None and (newest is None or modified > newest):
+                newest = modified
+            seen.add(deposition["id"])
+            batch.append(deposition)
+            if len(batch) >= batch_size:
+                updated += self.add(batch)
+                batch = []
+        updated += self.add(batch)
+
+        removed = 0
+        if full:
+            conn = self._connect()
+            stale = [row["id"] for row in conn.execute("SELECT id FROM depositions") if row["id"] not in seen]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for dep_id in stale:
+                    self._delete(conn, dep_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            removed = len(stale)
+        if newest is not None:
+            self._set_state("last_modified", newest)
+        self._set_state("last_sync", str(time.time()))
+        logger.info("Index sync (%s): %s updated, %s removed", "full" if full else f"since {since}", updated, removed)
+        return {"updated": updated, "removed": removed, "full": full}
+
+    def get(self, deposition_id):
+        """The stored deposition JSON, or None."""
+        row = self._connect().execute("SELECT data FROM depositions WHERE id = ?", (deposition_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def search(self, text=None, creator=None, without_orcid=False, keyword=None, filename=None, checksum=None,
+               upload_type=None, published=None, modified_since=None, limit=50):
+        """
+        Returns summary dicts of the matching depositions: best full-text
+        match first when ``text`` is given, else most recently modified.
+
+        ``creator`` matches creator names (substring, case-insensitive);
+        ``without_orcid`` keeps records with a matching creator that has no
+        ORCID. ``filename`` and ``keyword`` accept ``*`` wildcards.
+        """
+        where, params, joins = [], [], []
+        order = "d.modified DESC"
+        if text:
+            joins.append("JOIN depositions_fts ON depositions_fts.rowid = d.id")
+            where.append("depositions_fts MATCH ?")
+            params.append(_fts_query(text))
+            order = "bm25(depositions_fts)"
+        # "d.id IN (subquery)" rather than a correlated EXISTS: the subquery runs
+        # once (on its index when it has one) instead of once per deposition
+        if creator or without_orcid:
+            conditions = []
+            if creator:
+                conditions.append("name LIKE ?")
+                params.append(f"%{creator}%")
+            if without_orcid:
+                conditions.append("orcid IS NULL")
+            where.append(f"d.id IN (SELECT deposition_id FROM deposition_creators WHERE {' AND '.join(conditions)})")
+        if keyword:
+            # Without a wildcard, an exact (case-insensitive) match can use the keyword index
+            operator = "LIKE ?" if "*" in keyword else "= ? COLLATE NOCASE"
+            where.append(f"d.id IN (SELECT deposition_id FROM deposition_keywords WHERE keyword {operator})")
+            params.append(keyword.replace("*", "%"))
+        if filename:
+            where.append("d.id IN (SELECT deposition_id FROM deposition_files WHERE filename LIKE ?)")
+            params.append(filename.replace("*", "%"))
+        if checksum:
+            where.append("d.id IN (SELECT deposition_id FROM deposition_files WHERE checksum = ?)")
+            params.append(normalize_checksum(checksum))
+        if upload_type:
+            where.append("d.upload_type = ?")
+            params.append(upload_type)
+        if published is not None:
+            where.append("d.submitted = ?")
+            params.append(int(bool(published)))
+        if modified_since:
+            where.append("d.modified >= ?")
+            params.append(modified_since)
+
+        sql = f"SELECT {', '.join('d.' + c for c in SUMMARY_COLUMNS)} FROM depositions d {' '.join(joins)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(int(limit))
+        try:
+            return [dict(row) for row in self._connect().execute(sql, params)]
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"invalid query: {e}")
+
+    def stats(self):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT COUNT(*) AS depositions, COALESCE(SUM(submitted), 0) AS published FROM depositions"
+        ).fetchone()
+        files = conn.execute("SELECT COUNT(*) AS files, COALESCE(SUM(filesize), 0) AS bytes FROM deposition_files").fetchone()
+        return {**dict(row), **dict(files), "last_modified": self.last_modified,
+                "last_sync": float(self._get_state("last_sync") or 0) or None}
@@ -0,0 +1,434 @@
+import csv
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.validation import validate_metadata
+from .batch import _run_one
+
+logger = logging.getLogger(__name__)
+
+# CSV columns holding lists, separated by ";" (e.g. "Silva, Maria; Souza, João")
+CSV_LIST_FIELDS = ("creators", "keywords")
+
+RESULT_FIELDS = ("row", "file", "status", "deposition_id", "doi", "error", "duration")
+
+
+class ManifestError(Exception):
+    """The manifest or its checkpoint cannot be used."""
+
+
+class ManifestRow:
+    """One manifest record: its 1-based row number, where it starts and ends in the file, and its content."""
+
+    def __init__(self, row, end_offset, file_path, metadata, errors=None, start_offset=None):
+        self.row = row
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.file_path = file_path
+        self.metadata = metadata
+        self.errors = errors or []
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(";") if item.strip()]
+
+
+def _resolve(file_path, base_dir):
+    if not file_path:
+        return file_path
+    file_path = os.path.expanduser(file_path)
+    return file_path if os.path.isabs(file_path) else os.path.join(base_dir, file_path)
+
+
+def _metadata_from_jsonl(record):
+    # {"file": ..., "metadata": {...}} or the metadata fields next to "file"
+    if isinstance(record.get("metadata"), dict):
+        return dict(record["metadata"])
+    return {k: v for k, v in record.items() if k != "file"}
+
+
+def _metadata_from_csv(record):
+    metadata = {}
+    extra = record.pop("metadata", None)
+    for name, value in record.items():
+        if name is None or value is None or value == "":
+            continue
+        if name == "creators":
+            metadata[name] = [{"name": creator} for creator in _split_list(value)]
+        elif name in CSV_LIST_FIELDS:
+            metadata[name] = _split_list(value)
+        else:
+            metadata[name] = value
+    if extra:
+        # A "metadata" column with a JSON object for fields CSV cannot express
+        metadata.update(json.loads(extra))
+    return metadata
+
+
+def _read_records(f, fmt):
+    """Yields (raw record text, end offset) from a binary file, one record at a time."""
+    pending = b""
+    while True:
+        line = f.readline()
+        if not line:
+            if pending.strip():
+                yield pending, f.tell()
+            return
+        pending += line
+        # A CSV record may span lines inside a quoted field: wait for balanced quotes
+        if fmt == "csv" and pending.count(b'"') % 2:
+            continue
+        if pending.strip():
+            yield pending, f.tell()
+        pending = b""
+
+
+def detect_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def iter_manifest(path, start_offset=0, start_row=0, base_dir=None, validator=validate_metadata):
+    """
+    Streams ManifestRow objects from a JSONL or CSV manifest in constant
+    memory, starting after ``start_offset`` bytes (a checkpoint). Each row is
+    validated as it is read; problems go to ``row.errors``, never raised.
+    """
+    fmt = detect_format(path)
+    base_dir = base_dir or os.path.dirname(os.path.abspath(path))
+    with open(path, "rb") as f:
+        header = None
+        if fmt == "csv":
+            # The header is re-read on resume; it is always the first record
+            for raw, end in _read_records(f, fmt):
+                header = next(csv.reader([raw.decode("utf-8-sig")]))
+                break
+            if header is None:
+                return
+            start_offset = max(start_offset, f.tell())
+        f.seek(start_offset)
+
+        row = start_row
+        next_start = start_offset
+        for raw, end in _read_records(f, fmt):
+            row += 1
+            row_start, next_start = next_start, end
+            try:
+                if fmt == "csv":
+                    values = next(csv.reader([raw.decode("utf-8")]))
+                    record = dict(zip(header, values))
+                    file_path = record.pop("file", "")
+                    metadata = _metadata_from_csv(record)
+                else:
+                    record = json.loads(raw)
+                    if not isinstance(record, dict):
+                        raise ValueError("a linha não é um objeto JSON")
+                    file_path = record.get("file", "")
+                    metadata = _metadata_from_jsonl(record)
+            except (ValueError, StopIteration) as e:
+                yield ManifestRow(row, end, None, None, [f"linha inválida: {e}"], row_start)
+                continue
+
+            file_path = _resolve(file_path, base_dir)
+            errors = []
+            if not file_path:
+                errors.append("coluna 'file' ausente")
+            elif not os.path.isfile(file_path):
+                errors.append(f"arquivo não encontrado: {file_path}")
+            if validator is not None:
+                errors.extend(validator(metadata))
+            yield ManifestRow(row, end, file_path, metadata, errors, row_start)
+
+
+class ResultsWriter:
+    """
+    Appends one result per row to a JSONL (or CSV, by extension) results
+    manifest; ``truncate`` starts it over. A row retried on resume gets a new
+    line, so its last line is its current result.
+    """
+
+    def __init__(self, path, truncate=False):
+        self.path = path
+        self.format = detect_format(path)
+        is_new = truncate or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "w" if truncate else "a", encoding="utf-8", newline="")
+        self._lock = threading.Lock()
+        self._csv = None
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            if is_new:
+                self._csv.writeheader()
+
+    def write(self, result):
+        with self._lock:
+            if self._csv is not None:
+                self._csv.writerow(result)
+            else:
+                self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Checkpoint:
+    """
+    Resume point of a bulk run: the byte offset after the last row such that
+    it and every row before it are done, plus the few rows already done past
+    it (rows finish out of order when uploads run in parallel).
+
+    Rows that failed, with where they start, go to an append-only log next
+    to it (``<checkpoint>.failed``), so recording one costs one line however
+    many have failed; it is compacted once per run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.failures_path = f"{path}.failed"
+        self._failures = None
+
+    def load(self, manifest_path):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("manifest") != os.path.abspath(manifest_path):
+            raise ManifestError(f"checkpoint {self.path} pertence a outro manifesto: {state.get('manifest')}")
+        return state
+
+    def save(self, manifest_path, offset, row, done_ahead):
+        state = {
+            "manifest": os.path.abspath(manifest_path),
+            "offset": offset,
+            "row": row,
+            "done_ahead": sorted(done_ahead),
+            "updated_at": time.time(),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def load_failures(self):
+        """Replays the failure log into {row: start offset} of the rows still failed."""
+        failed = {}
+        if not os.path.exists(self.failures_path):
+            return failed
+        with open(self.failures_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # A line cut short by a crash: everything before it stands
+                if entry.get("offset") is None:
+                    failed.pop(entry["row"], None)
+                else:
+                    failed[entry["row"]] = entry["offset"]
+        return failed
+
+    def open_failures(self, failed):
+        """Rewrites the failure log with just ``failed`` and keeps it open for appending."""
+        tmp_path = self.failures_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row, offset in sorted(failed.items()):
+                f.write(json.dumps({"row": row, "offset": offset}) + "\n")
+        os.replace(tmp_path, self.failures_path)
+        self._failures = open(self.failures_path, "a", encoding="utf-8")
+
+    def record_failure(self, row, offset):
+        """Appends a failed row, or with ``offset=None`` one that no longer is."""
+        self._failures.write(json.dumps({"row": row, "offset": offset}) + "\n")
+        self._failures.flush()
+
+    def close_failures(self):
+        if self._failures is not None:
+            self._failures.close()
+            self._failures = None
+
+    def clear(self):
+        for path in (self.path, self.failures_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+class BulkIngest:
+    """
+    Streams a manifest into the upload pipeline.
+
+    ``worker(file_path, metadata)`` runs one deposition and returns the
+    published record (or None on failure). Rows are read only as fast as
+    the pool drains them: at most ``window`` rows are in flight or waiting
+    for an earlier row to finish, which bounds memory regardless of the
+    manifest size. Results are appended as rows finish, and the checkpoint
+    lets an interrupted run continue from the last completed row. Rows that
+    failed are not done: every later run retries them first.
+
+    The checkpoint is saved every ``checkpoint_every`` rows or
+    ``checkpoint_interval`` seconds, and when the run ends, is interrupted
+    or gets SIGTERM. After a hard kill, the rows finished since the last
+    save run again; the job store and the dedup index make that harmless.
+    """
+
+    def __init__(self, manifest_path, worker, results_path=None, max_workers=4, window=None,
+                 validator=validate_metadata, base_dir=None, on_result=None, checkpoint_every=100,
+                 checkpoint_interval=5.0):
+        self.manifest_path = manifest_path
+        self.worker = worker
+        self.results_path = results_path or f"{manifest_path}.results.jsonl"
+        self.checkpoint = Checkpoint(f"{self.results_path}.checkpoint")
+        self.max_workers = max(1, int(max_workers))
+        self.window = window or self.max_workers * 16
+        self.validator = validator
+        self.base_dir = base_dir
+        self.on_result = on_result
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self.checkpoint_interval = checkpoint_interval
+
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.window)
+        self._order = deque()  # (row, end_offset) not yet covered by the checkpoint
+        self._done = set()
+        self._failed = {}  # row -> start offset, retried on the next run
+        self._watermark = (0, 0)  # (row, offset)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def _record(self, manifest_row, status, value=None, error=None, duration=None, retry=False):
+        value = value if isinstance(value, dict) else {}
+        result = {
+            "row": manifest_row.row,
+            "file": manifest_row.file_path,
+            "status": status,
+            "deposition_id": value.get("id"),
+            "doi": value.get("doi"),
+            "error": error,
+            "duration": round(duration, 3) if duration is not None else None,
+        }
+        self._results.write(result)
+        if self.on_result is not None:
+            self.on_result(result)
+        self._complete(manifest_row, status, retry)
+
+    def _complete(self, manifest_row, status=None, retry=False):
+        with self._lock:
+            if status is not None:
+                self.counts[status] = self.counts.get(status, 0) + 1
+            if status == "failed":
+                self._failed[manifest_row.row] = manifest_row.start_offset
+                self.checkpoint.record_failure(manifest_row.row, manifest_row.start_offset)
+            elif status is not None and self._failed.pop(manifest_row.row, None) is not None:
+                self.checkpoint.record_failure(manifest_row.row, None)
+            if retry:
+                advanced = 1  # Already behind the watermark: only its slot to give back
+            else:
+                self._done.add(manifest_row.row)
+                advanced = 0
+                while self._order and self._order[0][0] in self._done:
+                    self._watermark = self._order.popleft()
+                    self._done.discard(self._watermark[0])
+                    advanced += 1
+            self._unsaved += 1
+            if (self._unsaved >= self.checkpoint_every
+                    or time.monotonic() - self._saved_at >= self.checkpoint_interval):
+                self._save()
+        for _ in range(advanced):
+            self._slots.release()
+
+    def _save(self):
+        # Called with self._lock held
+        self.checkpoint.save(self.manifest_path, self._watermark[1], self._watermark[0], self._done)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def _finished(self, manifest_row, future, retry=False):
+        if future.cancelled():
+            return  # Dropped by an interruption: stays after the checkpoint (or failed) and runs on resume
+        try:
+            r = future.result()
+            if r.ok:
+                status = "duplicate" if isinstance(r.value, dict) and r.value.get("duplicate") else "published"
+            else:
+                status = "failed"
+            self._record(manifest_row, status, r.value, r.error, r.duration, retry)
+        except Exception:
+            # Never leave a row unaccounted for: it would hold its window slot forever
+            logger.exception("Could not record the result of row %s", manifest_row.row)
+            self._complete(manifest_row, "failed", retry)
+
+    def _submit(self, executor, manifest_row, retry=False):
+        future = executor.submit(_run_one, self.worker, manifest_row.file_path, (manifest_row.metadata,))
+        future.add_done_callback(lambda f: self._finished(manifest_row, f, retry))
+
+    def _failed_rows(self):
+        # Each failed row is read again from where it starts in the manifest
+        for row, start_offset in sorted(self._failed.items()):
+            for manifest_row in iter_manifest(self.manifest_path, start_offset, row - 1, self.base_dir,
+                                              self.validator):
+                yield manifest_row
+                break
+
+    def run(self, restart=False):
+        """Processes the manifest; returns the count of rows per status."""
+        if restart:
+            self.checkpoint.clear()
+        state = self.checkpoint.load(self.manifest_path)
+        offset, row = (state["offset"], state["row"]) if state else (0, 0)
+        skip = set(state["done_ahead"]) if state else set()
+        # Failed rows past the watermark are read again by the main loop below
+        failed = self.checkpoint.load_failures() if state else {}
+        self._failed = {r: start for r, start in failed.items() if r <= row or r in skip}
+        self._watermark = (row, offset)
+        if state:
+            logger.info("Resuming %s after row %s (byte %s), retrying %s failed row(s)", self.manifest_path,
+                        row, offset, len(self._failed))
+
+        self._results = ResultsWriter(self.results_path, truncate=restart)
+        self.checkpoint.open_failures(self._failed)
+        self._saved_at = time.monotonic()
+        # A plain executor rather than BatchPool: its report would keep every result in memory
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="zenodo-bulk")
+        interrupted = True
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            # SIGTERM stops the run like Ctrl+C, so the checkpoint is saved on the way out
+            previous_handler = signal.signal(signal.SIGTERM, _raise_interrupt)
+        try:
+            for manifest_row in self._failed_rows():
+                self._slots.acquire()
+                if manifest_row.errors:
+                    self._record(manifest_row, "invalid", error="; ".join(manifest_row.errors), retry=True)
+                else:
+                    self._submit(executor, manifest_row, retry=True)
+            for manifest_row in iter_manifest(self.manifest_path, offset, row, self.base_dir, self.validator):
+                # Backpressure: wait until the window has room before reading further
+                self._slots.acquire()
+                with self._lock:
+                    self._order.append((manifest_row.row, manifest_row.end_offset))
+                if manifest_row.row in skip:
+                    self._complete(manifest_row)
+                elif manifest_row.errors:
+                    self._record(manifest_row, "invalid", error="; ".join(manifest_row.errors))
+                else:
+                    self._submit(executor, manifest_row)
+            interrupted = False
+        finally:
+            # On interruption only the uploads already running are finished
+            executor.shutdown(wait=True, cancel_futures=interrupted)
+            with self._lock:
+                self._save()
+            self.checkpoint.close_failures()
+            self._results.close()
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+        return dict(self.counts)
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config.settings import METADATA_COMMAND, METADATA_TIMEOUT, METADATA_WORKERS
+from ..core.hashing import file_checksum
+from ..core.instrumentation import span
+from ..core.sqlite import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Per-file sidecar next to the queued file: "artigo.pdf" -> "artigo.metadata.json"
+SIDECAR_SUFFIX = ".metadata.json"
+# Single shared file written by the old fabric flow, still read as a fallback
+LEGACY_METADATA_FILE = "metadata.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata_cache (
+    md5        TEXT NOT NULL,
+    generator  TEXT NOT NULL,
+    metadata   TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (md5, generator)
+);
+"""
+
+
+class MetadataError(Exception):
+    """Metadata for a file could not be generated or read."""
+
+
+def sidecar_path(file_path):
+    return os.path.splitext(file_path)[0] + SIDECAR_SUFFIX
+
+
+def read_metadata_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_sidecar(file_path, metadata):
+    """Writes the sidecar atomically, so a reader never sees half a file."""
+    path = sidecar_path(file_path)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def parse_generator_output(text):
+    """
+    Extracts the JSON object printed by the generator. Tolerates text around
+    it (e.g. a Markdown code fence from an LLM-based fabric pattern).
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise MetadataError("generator output contains no JSON object")
+    try:
+        metadata = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise MetadataError(f"generator output is not valid JSON: {e}")
+    # Some generators wrap the fields as the API body does: {"metadata": {...}}
+    if isinstance(metadata.get("metadata"), dict):
+        metadata = metadata["metadata"]
+    return metadata
+
+
+class MetadataCache(SQLiteStore):
+    """
+    Generated metadata keyed by the file's content hash and the generator
+    command, so a re-queued or retried file never runs the generator again.
+    """
+
+    schema = _SCHEMA
+
+    def get(self, md5, generator):
+        row = self._connect().execute(
+            "SELECT metadata FROM metadata_cache WHERE md5 = ? AND generator = ?", (md5, generator)
+        ).fetchone()
+        return json.loads(row["metadata"]) if row else None
+
+    def put(self, md5, generator, metadata):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO metadata_cache (md5, generator, metadata, created_at) VALUES (?, ?, ?, ?)",
+            (md5, generator, json.dumps(metadata, ensure_ascii=False), time.time()),
+        )
+
+
+class MetadataGenerator:
+    """
+    Metadata stage of the upload queue.
+
+    For each file, in order: an existing sidecar, the cache (by content
+    hash), the external generator command, and finally the shared legacy
+    ``metadata.json``. Whatever is found is written to the file's sidecar.
+
+    ``command`` is an argument list or a shell-style string; ``{file}`` is
+    replaced by the file path, or the path is appended when absent. The
+    command must print the metadata JSON on stdout. ``submit()`` runs
+    generation on a bounded pool, so several files are generated at once
+    while earlier ones are already uploading.
+    """
+
+    def __init__(self, command=None, cache=None, max_workers=None, timeout=None):
+        command = METADATA_COMMAND if command is None else command
+        self.command = shlex.split(command) if isinstance(command, str) else list(command or [])
+        self.signature = " ".join(self.command)
+        self.cache = cache
+        self.timeout = METADATA_TIMEOUT if timeout is None else timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers or METADATA_WORKERS),
+                                            thread_name_prefix="zenodo-metadata")
+        # Reentrant: a future that is already done runs its callback inside submit()
+        self._lock = threading.RLock()
+        self._inflight = {}  # path -> Future, so a re-queued file joins the running job
+
+        # Counters exposed by stats()
+        self.sidecar_hits = 0
+        self.cache_hits = 0
+        self.generated = 0
+        self.legacy = 0
+        self.failures = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _run_command(self, file_path):
+        args = [a.replace("{file}", file_path) for a in self.command]
+        if not any("{file}" in a for a in self.command):
+            args.append(file_path)
+        try:
+            result = subprocess.run(args, capture_output=True, text=True, timeout=self.timeout, check=True)
+        except FileNotFoundError:
+            raise MetadataError(f"generator command not found: {self.command[0]}")
+        except subprocess.TimeoutExpired:
+            raise MetadataError(f"generator timed out after {self.timeout}s")
+        except subprocess.CalledProcessError as e:
+            raise MetadataError(f"generator exited with status {e.returncode}: {(e.stderr or '').strip()[:500]}")
+        return parse_generator_output(result.stdout)
+
+    def load(self, file_path):
+        """Returns the metadata for ``file_path`` (blocking); raises MetadataError."""
+        sidecar = sidecar_path(file_path)
+        try:
+            if os.path.exists(sidecar):
+                self._count("sidecar_hits")
+                return read_metadata_file(sidecar)
+
+            md5 = None
+            if self.cache is not None and self.command:
+                md5 = file_checksum(file_path)
+                metadata = self.cache.get(md5, self.signature)
+                if metadata is not None:
+                    self._count("cache_hits")
+                    write_sidecar(file_path, metadata)
+                    return metadata
+
+            if self.command:
+                with span("pipeline.generate_metadata", file=os.path.basename(file_path)):
+                    metadata = self._run_command(file_path)
+                self._count("generated")
+                logger.info("Metadata generated for %s", os.path.basename(file_path))
+                if self.cache is not None:
+                    self.cache.put(md5, self.signature, metadata)
+                write_sidecar(file_path, metadata)
+                return metadata
+
+            legacy = os.path.join(os.path.dirname(file_path), LEGACY_METADATA_FILE)
+            if os.path.exists(legacy):
+                # Snapshot into the sidecar: the shared file is removed after the first upload
+                metadata = read_metadata_file(legacy)
+                self._count("legacy")
+                write_sidecar(file_path, metadata)
+                return metadata
+        except json.JSONDecodeError as e:
+            self._count("failures")
+            raise MetadataError(f"invalid metadata JSON: {e}")
+        except MetadataError:
+            self._count("failures")
+            raise
+        self._count("failures")
+        raise MetadataError("no sidecar, no generator configured and no metadata.json in the folder")
+
+    def submit(self, file_path):
+        """Schedules load() on the generation pool; returns a Future with the metadata."""
+        with self._lock:
+            future = self._inflight.get(file_path)
+            if future is None:
+                future = self._executor.submit(self.load, file_path)
+                self._inflight[file_path] = future
+                future.add_done_callback(lambda f: self._done(file_path, f))
+            return future
+
+    def _done(self, file_path, future):
+        with self._lock:
+            if self._inflight.get(file_path) is future:
+                del self._inflight[file_path]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sidecar_hits": self.sidecar_hits,
+                "cache_hits": self.cache_hits,
+                "generated": self.generated,
+                "legacy": self.legacy,
+                "failures": self.failures,
+            }
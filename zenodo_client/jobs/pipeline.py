@@ -0,0 +1,666 @@
+"""
+The upload pipeline behind zenodoapp.py and ``python -m zenodo_client``:
+create -> upload -> metadata -> publish for single files, multi-file
+depositions, new versions, the monitored queue and bulk manifests. Progress
+is printed for the operator, in Portuguese like the rest of the CLI.
+
+Nothing happens at import: the shared client is created on first use from
+ZENODO_TOKEN/ZENODO_API_URL (environment or .env), or set with configure().
+"""
+import json
+import os
+import threading
+from concurrent.futures import as_completed
+
+import requests
+
+from ..api.deposition import DepositionAPI
+from ..api.files import FilesAPI
+from ..config.settings import (ARCHIVE_MAINTENANCE_INTERVAL, ARCHIVE_RETENTION_DAYS, ARCHIVE_SHARD, HTTP_CACHE_FILE,
+                               HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_TTL, QUEUE_RETRY_INTERVAL, get_access_token,
+                               get_depositions_url)
+from ..core.cache import ResponseCache
+from ..core.client import ZenodoClient
+from ..core.hashing import file_checksum
+from ..core.instrumentation import span
+from ..core.validation import MetadataValidationError, validate_metadata
+from .archive import ArchiveStore
+from .batch import BatchPool, format_result
+from .dedup import DedupIndex
+from .manifest import BulkIngest, ManifestError
+from .metadata import LEGACY_METADATA_FILE, MetadataCache, MetadataError, MetadataGenerator, sidecar_path
+from .store import JobStore
+from .versioning import publish_new_version
+from .watcher import QueueWatcher
+
+# Uploads menores que isso não mostram linhas de progresso
+UPLOAD_PROGRESS_MIN_SIZE = 8 * 1024 * 1024
+
+_client = None
+_depositions_url = None
+_cache_ttl = HTTP_CACHE_TTL
+_cache_file = HTTP_CACHE_FILE
+_lock = threading.Lock()
+_archives = {}
+
+
+def configure(client=None, depositions_url=None, cache_ttl=None, cache_file=None):
+    """
+    Sets the client and/or depositions endpoint used by the pipeline (default:
+    from the environment), or the GET cache of the client created on first use.
+    """
+    global _client, _depositions_url, _cache_ttl, _cache_file
+    with _lock:
+        if client is not None:
+            _client = client
+        if depositions_url is not None:
+            _depositions_url = depositions_url
+        if cache_ttl is not None:
+            _cache_ttl = cache_ttl or None
+        if cache_file is not None:
+            _cache_file = cache_file
+
+
+def get_api_client():
+    """Shared ZenodoClient: pooled session and a rate limit common to all workers."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                cache = None
+                if _cache_ttl:
+                    cache = ResponseCache(ttl=_cache_ttl, max_entries=HTTP_CACHE_MAX_ENTRIES, path=_cache_file)
+                _client = ZenodoClient(token=get_access_token(), cache=cache)
+    return _client
+
+
+def depositions_url():
+    return _depositions_url or get_depositions_url()
+
+
+def get_archive(archive_folder_path):
+    """ArchiveStore of a folder, shared by all workers (shard policy and retention from settings)."""
+    root = os.path.abspath(archive_folder_path)
+    with _lock:
+        if root not in _archives:
+            _archives[root] = ArchiveStore(root, shard=ARCHIVE_SHARD, retention_days=ARCHIVE_RETENTION_DAYS)
+        return _archives[root]
+
+
+def open_job_stores(job_store_path, metadata_command=None, metadata_workers=None):
+    """
+    Progresso dos jobs, índice de duplicidade e gerador de metadados da fila,
+    todos no mesmo banco SQLite. Retorna (job_store, dedup_index, generator).
+    """
+    job_store = JobStore(job_store_path)
+    # Índice hash do conteúdo -> DOI, para não publicar o mesmo arquivo duas vezes
+    dedup_index = DedupIndex(job_store_path)
+    # Geração de metadados da fila: vários arquivos ao mesmo tempo, com cache por hash do conteúdo
+    generator = MetadataGenerator(command=metadata_command, cache=MetadataCache(job_store_path),
+                                  max_workers=metadata_workers)
+    return job_store, dedup_index, generator
+
+
+# --- FUNÇÕES DA API ---
+
+def create_new_deposition():
+    """Passo 1: Cria um novo rascunho (deposition) no Zenodo."""
+    print(" PASSO 1: Criando novo rascunho no Zenodo...")
+    try:
+        response = get_api_client().request("POST", depositions_url(), json={})
+        response.raise_for_status()
+        deposition_data = response.json()
+        print(f"-> Sucesso! Rascunho criado com ID: {deposition_data['id']}")
+        return deposition_data
+    except requests.exceptions.HTTPError as err:
+        print(f"!!! Erro HTTP ao criar rascunho ({err.response.status_code}): {err.response.text}")
+        return None
+    except json.JSONDecodeError:
+        print("!!! Erro: Resposta inválida da API")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"!!! Erro de conexão ao criar rascunho: {e}")
+        return None
+
+
+def upload_file(deposition_data, file_path):
+    """
+    Passo 2: Faz o upload de um arquivo para o 'bucket' do rascunho, lido uma
+    única vez e conferido pelo MD5 calculado durante o envio. Retorna a
+    entrada do arquivo no bucket (com ``digests``) ou None em caso de falha.
+    """
+    print(f"\n PASSO 2: Fazendo upload do arquivo '{os.path.basename(file_path)}'...")
+    if not os.path.exists(file_path):
+        print(f"!!! Erro: O arquivo '{file_path}' não foi encontrado.")
+        return None
+
+    files_api = FilesAPI(get_api_client(), base_url=depositions_url())
+    try:
+        result = files_api.upload_file(deposition_data['id'], deposition_data['links']['bucket'], file_path,
+                                       on_progress=print_upload_progress)
+        print(f"-> Sucesso! Upload do arquivo concluído (MD5 {result['digests']['md5']} conferido).")
+        return result
+    except requests.exceptions.HTTPError as err:
+        print(f"!!! Erro HTTP no upload do arquivo ({err.response.status_code}): {err.response.text}")
+        return None
+    except Exception as e:
+        print(f"!!! Erro inesperado no upload: {str(e)}")
+        return None
+
+
+def print_upload_progress(filename, sent, total, bytes_per_second):
+    """Mostra o andamento de um upload (chamada no máximo uma vez por segundo)."""
+    if sent == total and sent < UPLOAD_PROGRESS_MIN_SIZE:
+        return  # Arquivos pequenos: basta a mensagem de sucesso
+    mb = 1024 * 1024
+    percent = 100 * sent / total if total else 100
+    print(f"   {filename}: {percent:.0f}% ({sent / mb:.1f} de {total / mb:.1f} MB, {bytes_per_second / mb:.2f} MB/s)")
+
+
+def add_metadata(deposition_data, metadata):
+    """Passo 3: Adiciona os metadados ao rascunho."""
+    print("\n PASSO 3: Adicionando metadados...")
+    url = f"{depositions_url()}/{deposition_data['id']}"
+    try:
+        response = get_api_client().request(
+            "PUT",
+            url, 
+            data=json.dumps({'metadata': metadata}), 
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        print("-> Sucesso! Metadados adicionados.")
+        return True
+    except requests.exceptions.HTTPError as err:
+        print(f"!!! Erro HTTP ao adicionar metadados ({err.response.status_code}): {err.response.text}")
+        return False
+    except Exception as e:
+        print(f"!!! Erro inesperado ao adicionar metadados: {str(e)}")
+        return False
+
+
+def publish_deposition(deposition_data):
+    """Passo 4: Publica o rascunho, tornando-o um registro permanente com DOI."""
+    print("\n PASSO 4: Publicando o registro...")
+    publish_url = deposition_data['links']['publish']
+    try:
+        response = get_api_client().request("POST", publish_url)
+        response.raise_for_status()
+        published_record = response.json()
+        print("-" * 50)
+        print(" SUCESSO! Registro publicado.")
+        print(f" DOI: {published_record.get('doi', 'DOI não disponível')}")
+        print(f" Link: {published_record['links']['latest_html']}")
+        print("-" * 50)
+        return published_record
+    except requests.exceptions.HTTPError as err:
+        print(f"!!! Erro HTTP ao publicar ({err.response.status_code}): {err.response.text}")
+        return None
+    except json.JSONDecodeError:
+        print("!!! Erro: Resposta inválida da API após publicação")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"!!! Erro de conexão ao publicar: {e}")
+        return None
+
+
+# --- FUNÇÕES DE PROCESSAMENTO ---
+
+def process_file_for_upload(file_path, metadata, archive_folder_path, job_store=None, dedup_index=None):
+    """
+    Orquestra o processo de upload de um único arquivo para o Zenodo,
+    incluindo a movimentação para o arquivo após o sucesso.
+    Retorna o registro publicado, ou None se algum passo falhar.
+
+    Com um job_store, cada etapa concluída é registrada em disco e uma nova
+    execução retoma o arquivo a partir da última etapa, reutilizando o rascunho.
+    Com um dedup_index, arquivos cujo conteúdo já foi publicado não geram
+    um novo registro: o DOI existente é retornado.
+    Com archive_folder_path=None o arquivo de origem não é movido (modo --bulk).
+    """
+    print("\n--- INICIANDO PROCESSO DE UPLOAD ---")
+    print(f"Arquivo: {file_path}")
+    print(f"Metadados: {json.dumps(metadata, indent=2, ensure_ascii=False)}")
+
+    job_key = job = None
+    if job_store is not None and os.path.exists(file_path):
+        job_key = job_store.key_for(file_path)
+        job = job_store.get(job_key)
+        if job:
+            print(f"Retomando job existente (etapa concluída: '{job['stage']}', rascunho ID: {job['deposition_id']}).")
+
+    def checkpoint(stage, **fields):
+        if job_key is not None:
+            job_store.record(job_key, file_path, stage, **fields)
+
+    md5 = None
+    claimed = False
+    owner = job_key or os.path.abspath(file_path)
+
+    def fail(message):
+        print(message)
+        if job_key is not None:
+            job_store.mark_failed(job_key, message)
+        if claimed:
+            # Sem isso, cópias futuras do mesmo conteúdo seriam puladas para sempre
+            dedup_index.release(md5, owner)
+        return None
+
+    # --- Validação local dos metadados (antes de qualquer chamada à API) ---
+    erros = validate_metadata(metadata)
+    if erros:
+        print_validation_errors(file_path, erros)
+        return fail(f"Metadados inválidos ({len(erros)} erro(s)); nenhum rascunho foi criado.")
+
+    # --- Verificação de duplicidade (antes de qualquer chamada à API) ---
+    filename = os.path.basename(file_path)
+    if dedup_index is not None and not JobStore.reached(job, 'created') and os.path.exists(file_path):
+        with span("pipeline.dedup", file=filename):
+            md5 = file_checksum(file_path)
+            existing = dedup_index.claim(md5, owner, filename, os.path.getsize(file_path),
+                                         is_stale=lambda other: claim_is_stale(other, job_store))
+            claimed = existing is None
+        if existing and existing['doi']:
+            print(f"-> Conteúdo já publicado (MD5 {md5}) no depósito {existing['deposition_id']}.")
+            print(f" DOI existente: {existing['doi']}. Nenhum novo registro será criado.")
+            duplicate = {'id': existing['deposition_id'], 'doi': existing['doi'], 'duplicate': True}
+            if archive_folder_path:
+                archive_uploaded_file(file_path, archive_folder_path, duplicate, md5)
+            return duplicate
+        if existing:
+            return fail(f"Conteúdo idêntico (MD5 {md5}) já está sendo enviado por outro job. Pulando este arquivo.")
+
+    # Executa a sequência de passos da API, pulando as etapas já concluídas
+    if JobStore.reached(job, 'created'):
+        rascunho = job['deposition']
+    else:
+        with span("pipeline.create", file=filename) as s:
+            rascunho = create_new_deposition()
+            s.set(ok=bool(rascunho))
+        if not rascunho:
+            return fail("Falha ao criar novo rascunho.")
+        checkpoint('created', deposition=rascunho)
+
+    if not JobStore.reached(job, 'uploaded'):
+        with span("pipeline.upload", file=filename) as s:
+            uploaded = upload_file(rascunho, file_path)
+            s.set(ok=bool(uploaded))
+        if not uploaded:
+            return fail("Falha no upload do arquivo.")
+        # Calculado durante o envio: dispensa reler o arquivo ao registrar o DOI
+        md5 = md5 or uploaded['digests']['md5']
+        checkpoint('uploaded')
+
+    if not JobStore.reached(job, 'metadata'):
+        with span("pipeline.metadata", file=filename) as s:
+            metadata_ok = add_metadata(rascunho, metadata)
+            s.set(ok=metadata_ok)
+        if not metadata_ok:
+            return fail("Falha ao adicionar metadados.")
+        checkpoint('metadata')
+        print("\nO rascunho foi criado e os dados enviados com sucesso.")
+
+    if JobStore.reached(job, 'published'):
+        published_record = {'id': job['deposition_id'], 'doi': job['doi']}
+    else:
+        # No fluxo atual, publicamos imediatamente a primeira versão
+        with span("pipeline.publish", file=filename) as s:
+            published_record = publish_deposition(rascunho)
+            s.set(ok=bool(published_record))
+        if not published_record:
+            return fail("Falha ao publicar o registro.")
+        checkpoint('published', doi=published_record.get('doi'))
+
+    if dedup_index is not None and published_record.get('doi') and os.path.exists(file_path):
+        md5 = md5 or file_checksum(file_path)
+        dedup_index.record_published(md5, published_record.get('id'), published_record['doi'],
+                                     os.path.basename(file_path), os.path.getsize(file_path))
+
+    doi = published_record.get('doi')
+    if doi:
+        print(f"DOI obtido: {doi}")
+
+    if archive_folder_path:
+        archive_uploaded_file(file_path, archive_folder_path, published_record, md5)
+    return published_record
+
+
+def archive_uploaded_file(file_path, archive_folder_path, record=None, md5=None):
+    """
+    Move o arquivo processado (e seu sidecar) para o arquivo de enviados,
+    em subpastas por data ou hash, e registra nome original -> caminho -> DOI.
+    """
+    try:
+        # Verifique se o arquivo original ainda existe antes de mover
+        if os.path.exists(file_path):
+            record = record or {}
+            destination_path = get_archive(archive_folder_path).archive(
+                file_path, doi=record.get('doi'), deposition_id=record.get('id'), md5=md5)
+            print(f"\nArquivo movido: {os.path.basename(file_path)} -> {destination_path}")
+            # O metadata.json compartilhado fica: outros arquivos da fila ainda podem precisar dele
+            # (ver remove_legacy_metadata)
+        else:
+            print(f"!!! Aviso: Arquivo original não encontrado para mover para o arquivo: {file_path}")
+
+    except Exception as e:
+        print(f"!!! Erro ao mover o arquivo para o arquivo: {e}")
+
+
+def remove_legacy_metadata(upload_queue_folder):
+    """
+    Remove o metadata.json compartilhado da pasta de monitoramento depois que
+    a fila esvaziou. Enquanto restar algum PDF na pasta (por exemplo, um envio
+    que falhou), ele é mantido para a próxima tentativa.
+    """
+    metadata_file_path = os.path.join(upload_queue_folder, LEGACY_METADATA_FILE)
+    if not os.path.exists(metadata_file_path):
+        return
+    pending = [f for f in os.listdir(upload_queue_folder) if f.lower().endswith('.pdf') and not f.startswith('.')]
+    if pending:
+        return
+    print(f"Removendo arquivo de metadados: {metadata_file_path}")
+    try:
+        os.remove(metadata_file_path)
+    except OSError as e:
+        print(f"!!! Erro ao remover {metadata_file_path}: {e}")
+
+
+def process_files_for_upload(file_paths, metadata, max_in_flight=4, retries=3, draft_id=None):
+    """
+    Envia vários arquivos para UM único depósito, com uploads simultâneos ao bucket.
+    O registro só é publicado depois que o checksum de cada arquivo no servidor
+    confere com o local. Os arquivos de origem não são movidos.
+    Com draft_id, continua um rascunho existente (arquivos já enviados são pulados).
+    Retorna o registro publicado, ou None se algum passo falhar.
+    """
+    print("\n--- INICIANDO UPLOAD DE DEPÓSITO COM MÚLTIPLOS ARQUIVOS ---")
+    print(f"Arquivos: {len(file_paths)} ({sum(os.path.getsize(p) for p in file_paths) / (1024 * 1024):.1f} MB)")
+
+    erros = validate_metadata(metadata)
+    if erros:
+        print_validation_errors(file_paths[0] if len(file_paths) == 1 else f"{len(file_paths)} arquivos", erros)
+        print("Metadados inválidos; nenhum rascunho foi criado.")
+        return None
+
+    if draft_id:
+        try:
+            rascunho = DepositionAPI(get_api_client(), base_url=depositions_url()).get_deposition(draft_id)
+        except requests.exceptions.HTTPError as err:
+            print(f"!!! Erro HTTP ao buscar o rascunho {draft_id} ({err.response.status_code}): {err.response.text}")
+            return None
+        except requests.exceptions.RequestException as e:
+            print(f"!!! Erro de conexão ao buscar o rascunho {draft_id}: {e}")
+            return None
+        print(f"-> Continuando rascunho existente ID: {draft_id}")
+    else:
+        rascunho = create_new_deposition()
+        if not rascunho:
+            print("Falha ao criar novo rascunho.")
+            return None
+
+    print(f"\n PASSO 2: Enviando {len(file_paths)} arquivo(s) com até {max_in_flight} transferências simultâneas...")
+    files_api = FilesAPI(get_api_client(), base_url=depositions_url())
+    with span("pipeline.upload", files=len(file_paths)) as s:
+        uploaded, failed = files_api.upload_files(rascunho['id'], rascunho['links']['bucket'], file_paths,
+                                                  max_in_flight=max_in_flight, retries=retries,
+                                                  skip_existing=bool(draft_id))
+        s.set(ok=not failed, failed=len(failed))
+    if failed:
+        for filename, error in sorted(failed.items()):
+            print(f"!!! Falha no upload de '{filename}': {error}")
+        print(f"Rascunho {rascunho['id']} mantido sem publicar. Reenvie com --draft {rascunho['id']}.")
+        return None
+
+    print("\nConferindo checksums no servidor...")
+    with span("pipeline.verify", files=len(uploaded)) as s:
+        mismatches = files_api.verify_checksums(rascunho['id'], {name: info['checksum'] for name, info in uploaded.items()})
+        s.set(ok=not mismatches)
+    if mismatches:
+        for filename, local_md5, remote_md5 in mismatches:
+            print(f"!!! Checksum divergente para '{filename}': local {local_md5}, servidor {remote_md5}")
+        print(f"Rascunho {rascunho['id']} mantido sem publicar. Reenvie com --draft {rascunho['id']}.")
+        return None
+    print(f"-> Todos os {len(uploaded)} checksums conferem.")
+
+    if not add_metadata(rascunho, metadata):
+        print("Falha ao adicionar metadados.")
+        return None
+    published_record = publish_deposition(rascunho)
+    if not published_record:
+        print("Falha ao publicar o registro.")
+    return published_record
+
+
+def process_new_version(deposition_id, file_paths, metadata_updates, max_in_flight=4, retries=3):
+    """
+    Publica uma nova versão de um depósito já publicado contendo exatamente
+    ``file_paths``. Só os arquivos novos ou alterados (MD5 diferente da versão
+    anterior) são enviados; os removidos são apagados e os iguais mantidos.
+    Retorna o registro publicado, ou None se nada mudou ou algum passo falhar.
+    """
+    print(f"\n--- NOVA VERSÃO DO DEPÓSITO {deposition_id} ---")
+    print(f"Arquivos locais: {len(file_paths)} ({sum(os.path.getsize(p) for p in file_paths) / (1024 * 1024):.1f} MB)")
+    try:
+        resultado = publish_new_version(deposition_id, file_paths, metadata_updates, client=get_api_client(),
+                                        base_url=depositions_url(), max_in_flight=max_in_flight, retries=retries)
+    except MetadataValidationError as e:
+        print_validation_errors(f"depósito {deposition_id}", e.errors)
+        print("Metadados inválidos; nenhuma versão foi criada.")
+        return None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"!!! Erro ao criar a nova versão: {e}")
+        return None
+
+    plano = resultado['plan']
+    print(f"-> {len(plano.added)} novo(s), {len(plano.changed)} alterado(s), {len(plano.removed)} removido(s), "
+          f"{len(plano.unchanged)} inalterado(s)")
+    print(f"-> Enviados: {plano.upload_bytes / (1024 * 1024):.1f} MB; "
+          f"não reenviados: {plano.skipped_bytes / (1024 * 1024):.1f} MB")
+    if not plano.has_changes:
+        print("Nenhum arquivo mudou em relação à versão anterior; nenhuma versão foi criada.")
+        return None
+    if resultado['failed']:
+        for filename, error in sorted(resultado['failed'].items()):
+            print(f"!!! Falha em '{filename}': {error}")
+        print(f"Rascunho da nova versão {resultado['draft']['id']} mantido sem publicar. Repita o comando para continuar.")
+        return None
+    record = resultado['record']
+    print("\n--- SUCESSO! ---")
+    print(f"Nova versão publicada. DOI: {record.get('doi')}")
+    print(f"Link: {record.get('links', {}).get('html')}")
+    return record
+
+
+def load_queue_metadata(file_path, future):
+    """
+    Lê os metadados de um arquivo da pasta de monitoramento a partir do
+    resultado do MetadataGenerator (sidecar <nome>.metadata.json, cache por
+    hash do conteúdo, comando ZENODO_METADATA_COMMAND como o fabric, ou o
+    metadata.json compartilhado). Retorna None se não for possível.
+    """
+    filename = os.path.basename(file_path)
+    try:
+        metadata_from_file = future.result()
+    except MetadataError as e:
+        print(f"!!! Erro: metadados indisponíveis para {filename} ({e}). Pulando este arquivo.")
+        return None
+    except Exception as e:
+        print(f"!!! Erro inesperado ao carregar metadados de {filename}: {e}. Pulando este arquivo.")
+        return None
+    # Garantir que a licença seja CC BY 4.0, sobrescrevendo se necessário
+    metadata_from_file['license'] = 'cc-by-4.0'
+    erros = validate_metadata(metadata_from_file)
+    if erros:
+        print_validation_errors(file_path, erros)
+        print(f"!!! Corrija {os.path.basename(sidecar_path(file_path))} e o arquivo será tentado de novo. Pulando por ora.")
+        return None
+    return metadata_from_file
+
+
+def print_validation_errors(label, erros):
+    """Mostra todos os erros de validação de um registro de uma só vez."""
+    print(f"!!! Metadados inválidos para {os.path.basename(label)}:")
+    for erro in erros:
+        print(f"    - {erro}")
+
+
+def watch_upload_queue(upload_queue_folder, archive_folder_path, job_store, dedup_index, generator, workers=4, settle_time=0.5):
+    """
+    Modo daemon: monitora a pasta continuamente e envia cada arquivo assim que
+    ele estiver completo (renomeado para a pasta, ou com tamanho/mtime estáveis).
+    Um arquivo cujo envio falhou é tentado de novo após QUEUE_RETRY_INTERVAL segundos.
+    """
+    def on_result(r):
+        print(format_result(r))
+        if not r.ok:
+            # O arquivo continua na fila: sem isso, novos eventos dele seriam ignorados
+            watcher.retry_later(r.file_path, QUEUE_RETRY_INTERVAL)
+
+    # Cada resultado já é mostrado por on_result; o relatório guarda só os totais (o daemon não termina)
+    pool = BatchPool(process_file_for_upload, max_workers=workers, on_result=on_result, keep_results=False)
+
+    def on_ready(file_path):
+        # A geração roda em paralelo aos uploads; o arquivo entra no pool quando os metadados ficam prontos
+        def dispatch(future):
+            metadata_from_file = load_queue_metadata(file_path, future)
+            if metadata_from_file is None:
+                watcher.retry_later(file_path)  # Tenta de novo mais tarde (metadados ainda não gerados)
+                return
+            pool.submit(file_path, (metadata_from_file, archive_folder_path, job_store, dedup_index))
+
+        generator.submit(file_path).add_done_callback(dispatch)
+        return True
+
+    # Retenção e compactação do arquivo de enviados em segundo plano, sem bloquear os uploads
+    archive = get_archive(archive_folder_path)
+    archive.start_maintenance(ARCHIVE_MAINTENANCE_INTERVAL)
+    watcher = QueueWatcher(upload_queue_folder, on_ready, settle_time=settle_time)
+    print(f"Monitorando '{upload_queue_folder}' continuamente (modo: {watcher.mode}). Pressione Ctrl+C para encerrar.")
+    if watcher.mode == "polling":
+        print("!!! Pacote 'watchdog' não instalado: usando verificação periódica da pasta.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nEncerrando monitoramento; aguardando uploads em andamento...")
+    finally:
+        watcher.stop()
+        generator.shutdown()
+        report = pool.shutdown()
+        archive.stop_maintenance()
+        remove_legacy_metadata(upload_queue_folder)
+    print("\n--- RESUMO DA SESSÃO ---")
+    for line in report.summary_lines():
+        print(line)
+    print_metadata_stats(generator)
+    print_rate_limit_stats()
+
+
+def process_upload_queue(upload_queue_folder, archive_folder_path, job_store, dedup_index, generator, workers=4):
+    """Envia, uma vez, os PDFs presentes na pasta de monitoramento e sai."""
+    print(f"Processando os arquivos presentes na pasta mágica: {upload_queue_folder}")
+    print("Use --monitor --watch para monitoramento contínuo.")
+
+    # Processar arquivos existentes na pasta 'upload_queue' (exemplo simples)
+    files_in_queue = [f for f in os.listdir(upload_queue_folder) if f.lower().endswith('.pdf') and not f.startswith('.')] # Only process PDFs, ignore hidden files
+    if not files_in_queue:
+        print(f"Nenhum arquivo .pdf encontrado na pasta de monitoramento '{upload_queue_folder}'.")
+
+    if files_in_queue:
+        print(f"\nEnviando {len(files_in_queue)} arquivo(s) com {workers} worker(s)...")
+        # Geração de metadados e uploads em paralelo: cada arquivo entra no pool
+        # de upload assim que seus metadados ficam prontos
+        pool = BatchPool(process_file_for_upload, max_workers=workers)
+        futures = {generator.submit(os.path.join(upload_queue_folder, f)): os.path.join(upload_queue_folder, f)
+                   for f in sorted(files_in_queue)}
+        for future in as_completed(futures):
+            file_path_to_process = futures[future]
+            metadata_from_file = load_queue_metadata(file_path_to_process, future)
+            if metadata_from_file is not None:
+                pool.submit(file_path_to_process, (metadata_from_file, archive_folder_path, job_store, dedup_index))
+        generator.shutdown()
+        report = pool.shutdown()
+        remove_legacy_metadata(upload_queue_folder)
+        print("\n--- RESUMO DO LOTE ---")
+        for line in report.summary_lines():
+            print(line)
+        print_metadata_stats(generator)
+        print_rate_limit_stats()
+
+    print("\nProcessamento de arquivos existentes na pasta de monitoramento concluído.")
+
+
+def run_bulk_ingest(manifest_path, results_path, job_store, dedup_index, workers=4, restart=False):
+    """
+    Envia os arquivos descritos em um manifesto JSONL/CSV, lido em streaming.
+    Os arquivos de origem não são movidos. O resultado de cada linha é gravado
+    à medida que termina, e uma execução interrompida retoma da última linha concluída;
+    as linhas que falharam são tentadas de novo a cada execução.
+    """
+    def worker(file_path, metadata):
+        return process_file_for_upload(file_path, metadata, None, job_store, dedup_index)
+
+    def on_result(result):
+        detail = result['doi'] or result['error'] or ''
+        print(f"  [linha {result['row']}] {result['status'].upper()} {os.path.basename(result['file'] or '')} {detail}".rstrip())
+
+    ingest = BulkIngest(manifest_path, worker, results_path=results_path, max_workers=workers, on_result=on_result)
+    print(f"Envio em massa: {manifest_path} -> {ingest.results_path} ({workers} worker(s))")
+    try:
+        counts = ingest.run(restart=restart)
+    except ManifestError as e:
+        print(f"!!! Erro: {e}. Use --restart para começar do início.")
+        return None
+    except KeyboardInterrupt:
+        print("\nInterrompido; execute o mesmo comando para continuar de onde parou.")
+        return None
+    print("\n--- RESUMO DO ENVIO EM MASSA ---")
+    for status, count in sorted(counts.items()):
+        print(f"  {status}: {count}")
+    print_rate_limit_stats()
+    return counts
+
+
+def print_metadata_stats(generator):
+    """Mostra de onde vieram os metadados da sessão (gerados, cache, sidecar)."""
+    stats = generator.stats()
+    print(f"  Metadados: {stats['generated']} gerado(s), {stats['cache_hits']} do cache, "
+          f"{stats['sidecar_hits']} de sidecar, {stats['legacy']} do metadata.json, {stats['failures']} falha(s)")
+
+
+def print_rate_limit_stats():
+    """Mostra quanto tempo as requisições esperaram pelo limitador de taxa."""
+    stats = get_api_client().rate_limiter.stats()
+    print(f"  Limite de taxa: {stats['requests']} requisições, {stats['waits']} esperas "
+          f"({stats['wait_time']:.1f}s), {stats['throttled']} respostas 429, {stats['retries']} retentativas")
+
+
+def iter_account_depositions(page_size=100):
+    """Percorre todos os depósitos da conta, página por página (com pré-carregamento)."""
+    api = DepositionAPI(get_api_client(), base_url=depositions_url())
+    return api.iter_depositions(page_size=page_size)
+
+
+def claim_is_stale(owner, job_store=None):
+    """
+    True se o dono de uma reivindicação do índice de duplicidade não vai mais
+    concluí-la: o job falhou, ou o arquivo sumiu ou mudou (processo
+    interrompido, arquivo renomeado ou editado).
+    """
+    if os.path.exists(owner):
+        return False  # Dono sem job store: o próprio caminho, ainda na fila
+    job = job_store.get(owner) if job_store is not None else None
+    if job is not None and job['error'] and job['stage'] != 'published':
+        return True
+    path = job['file_path'] if job is not None else owner.rsplit(':', 2)[0]
+    try:
+        return JobStore.key_for(path) != owner
+    except OSError:
+        return True
+
+
+def rebuild_dedup_index(dedup_index, job_store=None):
+    """Reconstrói o índice de duplicidade a partir dos depósitos publicados da conta."""
+    print("Reconstruindo índice de duplicidade a partir dos depósitos da conta...")
+    count = dedup_index.rebuild(iter_account_depositions(),
+                                is_stale=lambda owner: claim_is_stale(owner, job_store))
+    print(f"-> Índice reconstruído com {count} arquivo(s) publicado(s).")
@@ -0,0 +1,106 @@
+import json
+import os
+import time
+
+from ..core.sqlite import SQLiteStore
+
+# Pipeline stages in the order they are completed
+STAGES = ("pending", "created", "uploaded", "metadata", "published")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key         TEXT PRIMARY KEY,
+    file_path       TEXT NOT NULL,
+    file_size       INTEGER,
+    file_mtime_ns   INTEGER,
+    stage           TEXT NOT NULL,
+    deposition_id   INTEGER,
+    bucket_url      TEXT,
+    deposition_json TEXT,
+    doi             TEXT,
+    error           TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (stage);
+"""
+
+
+class JobStore(SQLiteStore):
+    """
+    Durable record of each file's progress through the upload pipeline.
+
+    A job is identified by the file's absolute path, size and mtime, so a
+    different file dropped under the same name starts a new job.
+    """
+
+    schema = _SCHEMA
+
+    @staticmethod
+    def key_for(file_path):
+        """Returns the job key of a local file."""
+        st = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+    @staticmethod
+    def reached(job, stage):
+        """True if ``job`` has completed ``stage`` (or a later one)."""
+        if not job:
+            return False
+        return STAGES.index(job["stage"]) >= STAGES.index(stage)
+
+    def get(self, job_key):
+        """Returns the job as a dict (with the stored deposition decoded), or None."""
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_key = ?", (job_key,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["deposition"] = json.loads(job["deposition_json"]) if job["deposition_json"] else None
+        return job
+
+    def record(self, job_key, file_path, stage, deposition=None, doi=None, error=None):
+        """Creates or advances a job. Fields passed as None keep their stored value."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        try:
+            st = os.stat(file_path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+        deposition_json = json.dumps(deposition) if deposition is not None else None
+        deposition_id = deposition.get("id") if deposition else None
+        bucket_url = deposition.get("links", {}).get("bucket") if deposition else None
+        now = time.time()
+        self._connect().execute(
+            """
+            INSERT INTO jobs (job_key, file_path, file_size, file_mtime_ns, stage, deposition_id,
+                              bucket_url, deposition_json, doi, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job_key) DO UPDATE SET
+                stage = excluded.stage,
+                deposition_id = COALESCE(excluded.deposition_id, jobs.deposition_id),
+                bucket_url = COALESCE(excluded.bucket_url, jobs.bucket_url),
+                deposition_json = COALESCE(excluded.deposition_json, jobs.deposition_json),
+                doi = COALESCE(excluded.doi, jobs.doi),
+                error = excluded.error,
+                updated_at = excluded.updated_at
+            """,
+            (job_key, os.path.abspath(file_path), size, mtime_ns, stage, deposition_id,
+             bucket_url, deposition_json, doi, error, now, now),
+        )
+
+    def mark_failed(self, job_key, error):
+        """Stores the last error of a job without changing its stage."""
+        self._connect().execute(
+            "UPDATE jobs SET error = ?, updated_at = ? WHERE job_key = ?",
+            (str(error), time.time(), job_key),
+        )
+
+    def list_jobs(self, stage=None):
+        """Lists jobs, optionally only those at a given stage."""
+        conn = self._connect()
+        if stage is None:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY updated_at").fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM jobs WHERE stage = ? ORDER BY updated_at", (stage,)).fetchall()
+        return [dict(r) for r in rows]
@@ -0,0 +1,177 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ..api.actions import ActionsAPI
+from ..api.deposition import DepositionAPI
+from ..api.files import FilesAPI
+from ..core.hashing import file_checksum, normalize_checksum
+from ..core.instrumentation import span
+from ..core.validation import KNOWN_FIELDS, ensure_valid
+
+logger = logging.getLogger(__name__)
+
+# Set by Zenodo on each version; never copied into the next one
+VERSION_SPECIFIC_FIELDS = ("doi", "prereserve_doi")
+
+
+def carried_metadata(metadata):
+    """
+    The part of a published record's metadata a new version starts from:
+    fields the deposition API accepts, minus the version-specific ones.
+    Keys Zenodo manages itself (``relations``...) are dropped.
+    """
+    return {k: v for k, v in metadata.items() if k in KNOWN_FIELDS and k not in VERSION_SPECIFIC_FIELDS}
+
+
+class DeltaPlan:
+    """
+    What a new version has to change, by filename: ``added`` and ``changed``
+    map to local paths, ``removed`` lists files only in the previous
+    version and ``unchanged`` those whose MD5 already matches.
+    """
+
+    def __init__(self, added, changed, removed, unchanged, checksums, sizes):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.unchanged = unchanged
+        self.checksums = checksums  # filename -> local md5
+        self.sizes = sizes  # filename -> local size
+
+    @property
+    def to_upload(self):
+        return {**self.added, **self.changed}
+
+    @property
+    def has_changes(self):
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def upload_bytes(self):
+        return sum(self.sizes[name] for name in self.to_upload)
+
+    @property
+    def skipped_bytes(self):
+        return sum(self.sizes[name] for name in self.unchanged)
+
+    def summary(self):
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": len(self.unchanged),
+            "upload_bytes": self.upload_bytes,
+            "skipped_bytes": self.skipped_bytes,
+        }
+
+
+def local_checksums(file_paths, max_workers=4):
+    """MD5 of each file, hashed in parallel (hashlib releases the GIL on large reads)."""
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="zenodo-hash") as executor:
+        return dict(zip(file_paths, executor.map(file_checksum, file_paths)))
+
+
+def plan_delta(file_paths, remote_files, max_workers=4):
+    """
+    Compares local files with the file listing of the previous version
+    (``FilesAPI.list_files_of_deposition``), by filename and MD5.
+    """
+    names = [os.path.basename(p) for p in file_paths]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate file names in one deposition: {', '.join(duplicates)}")
+
+    remote = {f["filename"]: normalize_checksum(f.get("checksum")) for f in remote_files}
+    md5s = local_checksums(file_paths, max_workers)
+    added, changed, unchanged = {}, {}, []
+    checksums, sizes = {}, {}
+    for path in file_paths:
+        name = os.path.basename(path)
+        checksums[name] = md5s[path]
+        sizes[name] = os.path.getsize(path)
+        if name not in remote:
+            added[name] = path
+        elif remote[name] != md5s[path]:
+            changed[name] = path
+        else:
+            unchanged.append(name)
+    removed = sorted(name for name in remote if name not in checksums)
+    return DeltaPlan(added, changed, removed, sorted(unchanged), checksums, sizes)
+
+
+def publish_new_version(deposition_id, file_paths, metadata_updates=None, client=None, base_url=None,
+                        max_in_flight=4, retries=3, publish=True):
+    """
+    Publishes a new version of ``deposition_id`` whose files are exactly
+    ``file_paths``, sending only what differs from the previous version.
+
+    The new version draft starts with the previous files attached: removed
+    and changed files are deleted from it, added and changed ones uploaded
+    in parallel, unchanged ones kept as they are. ``metadata_updates`` is
+    merged over the previous metadata and validated before anything is
+    created. If uploads fail the draft is kept; running again continues it
+    (Zenodo returns the same draft) and skips files already sent.
+
+    Returns a dict with the ``plan``, the ``draft``, the published
+    ``record`` (None when nothing changed, on failure or with
+    ``publish=False``), ``deleted`` filenames and ``failed`` uploads.
+    """
+    depositions = DepositionAPI(client, base_url)
+    files = FilesAPI(depositions.client, base_url)
+    actions = ActionsAPI(depositions.client, base_url)
+    result = {"plan": None, "draft": None, "record": None, "deleted": [], "failed": {}}
+
+    previous = depositions.get_deposition(deposition_id)
+    if not previous.get("submitted"):
+        raise ValueError(f"Deposition {deposition_id} is not published; only published records get new versions.")
+    metadata = carried_metadata(previous.get("metadata", {}))
+    metadata.update(metadata_updates or {})
+    ensure_valid(metadata)
+
+    with span("pipeline.delta_plan", deposition_id=deposition_id, files=len(file_paths)) as s:
+        plan = result["plan"] = plan_delta(file_paths, files.list_files_of_deposition(deposition_id), max_in_flight)
+        s.set(**plan.summary())
+    logger.info("New version of %s: %s added, %s changed, %s removed, %s unchanged (%.1f MB not re-sent)",
+                deposition_id, len(plan.added), len(plan.changed), len(plan.removed), len(plan.unchanged),
+                plan.skipped_bytes / (1024 * 1024))
+    if not plan.has_changes:
+        # Zenodo rejects a version whose files are identical to an earlier one
+        logger.info("Files of deposition %s are unchanged; no new version created.", deposition_id)
+        return result
+
+    draft = result["draft"] = actions.new_version(deposition_id)
+    draft_id = draft["id"]
+
+    # The draft carries the previous files, and a resumed draft whatever an earlier run sent: drop
+    # every file not in file_paths (removed, or dropped since that run) and stale copies of changed ones
+    with span("pipeline.delta_delete", deposition_id=draft_id):
+        for f in files.list_files_of_deposition(draft_id):
+            name = f["filename"]
+            stale = name in plan.changed and normalize_checksum(f.get("checksum")) != plan.checksums[name]
+            if name not in plan.checksums or stale:
+                files.delete_file(draft_id, f["id"])
+                result["deleted"].append(name)
+
+    with span("pipeline.upload", deposition_id=draft_id, files=len(plan.to_upload)):
+        _, failed = files.upload_files(draft_id, draft["links"]["bucket"], list(plan.to_upload.values()),
+                                       max_in_flight=max_in_flight, retries=retries, skip_existing=True)
+    result["failed"] = failed
+    if failed:
+        logger.warning("%s file(s) failed; draft %s kept for a retry.", len(failed), draft_id)
+        return result
+
+    mismatches = files.verify_checksums(draft_id, plan.checksums)
+    if mismatches:
+        result["failed"] = {name: f"checksum mismatch (local {local}, server {remote})"
+                            for name, local, remote in mismatches}
+        logger.warning("Checksums of draft %s do not match; not publishing.", draft_id)
+        return result
+
+    with span("pipeline.metadata", deposition_id=draft_id):
+        # Exactly what was validated above
+        depositions.update_metadata(draft_id, metadata)
+    if publish:
+        with span("pipeline.publish", deposition_id=draft_id):
+            result["record"] = actions.publish(draft_id)
+    return result
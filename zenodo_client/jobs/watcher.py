@@ -0,0 +1,241 @@
+import logging
+import os
+import threading
+import time
+
+try:  # Optional dependency: inotify/FSEvents/ReadDirectoryChanges via watchdog
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - depends on the environment
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+def _has_complete_trailer(path):
+    """
+    PDFs end with an ``%%EOF`` marker; a file without it in its last KiB is
+    still being written (or truncated) and must not be uploaded yet.
+    Other file types have no such marker and always pass.
+    """
+    if not path.lower().endswith(".pdf"):
+        return True
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for the queue folder to the QueueWatcher."""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_closed(self, event):
+        # close() after writing (IN_CLOSE_WRITE): the writer is done with the file
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, complete=True)
+
+    def on_moved(self, event):
+        # A file renamed into the queue is complete by definition (atomic rename)
+        if not event.is_directory:
+            self.watcher.forget(event.src_path)
+            self.watcher.notify(event.dest_path, complete=True)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.forget(event.src_path)
+
+
+class QueueWatcher:
+    """
+    Long-running watcher for the upload queue folder.
+
+    Files are handed to ``on_ready(file_path)`` only once they are complete:
+    either renamed/closed into place, or with size and mtime unchanged for
+    ``settle_time`` seconds. Uses filesystem events through ``watchdog`` when
+    it is installed and falls back to polling the queue folder otherwise.
+    Only the queue folder itself is scanned, never the archive.
+
+    ``on_ready`` returns a falsy value to have the file retried after
+    ``retry_interval`` seconds (e.g. its metadata is not there yet); work that
+    fails after it returned calls retry_later() or forget() itself. A file
+    waiting for its retry is skipped by scans but not by new events.
+    """
+
+    def __init__(self, folder, on_ready, extensions=(".pdf",), settle_time=0.5,
+                 poll_interval=1.0, retry_interval=5.0, use_events=True):
+        self.folder = os.path.abspath(folder)
+        self.on_ready = on_ready
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.use_events = use_events and Observer is not None
+
+        # path -> (size, mtime_ns, stable since, renamed/closed into place)
+        self._candidates = {}
+        self._dispatched = set()
+        self._waiting = set()  # failed, queued again when their retry timer fires
+        self._dirty = False
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+
+    @property
+    def mode(self):
+        return "events" if self.use_events else "polling"
+
+    def _accepts(self, path):
+        name = os.path.basename(path)
+        return (os.path.dirname(os.path.abspath(path)) == self.folder
+                and not name.startswith('.')
+                and name.lower().endswith(self.extensions))
+
+    def notify(self, path, complete=False):
+        """Registers activity on ``path``; ``complete`` skips the settle wait."""
+        path = os.path.abspath(path)
+        if not self._accepts(path):
+            return
+        with self._cond:
+            if path in self._dispatched:
+                return
+            self._waiting.discard(path)
+            self._candidates[path] = (None, None, None, complete)
+            self._dirty = True
+            self._cond.notify()
+
+    def forget(self, path):
+        """Called when a file leaves the queue, so the same name can be queued again."""
+        path = os.path.abspath(path)
+        with self._cond:
+            self._candidates.pop(path, None)
+            self._dispatched.discard(path)
+            self._waiting.discard(path)
+
+    def _scan(self):
+        """Polls the queue folder (also used once at startup in events mode)."""
+        present = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and self._accepts(entry.path):
+                    present.add(entry.path)
+                    with self._cond:
+                        if entry.path not in self._dispatched and entry.path not in self._candidates \
+                                and entry.path not in self._waiting:
+                            self._candidates[entry.path] = (None, None, None, False)
+        with self._cond:
+            # Files archived or removed since the last scan may be queued again later
+            self._dispatched &= present
+
+    def _check_candidates(self):
+        """Returns the candidates that are stable, and the wait until the next check."""
+        now = time.monotonic()
+        ready = []
+        next_wait = None
+        with self._cond:
+            self._dirty = False
+            for path, (size, mtime_ns, stable_since, complete) in list(self._candidates.items()):
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    del self._candidates[path]
+                    continue
+                if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                    # First look or still being written: restart the settle clock
+                    stable_since = now
+                    self._candidates[path] = (st.st_size, st.st_mtime_ns, stable_since, complete)
+                remaining = 0 if complete else self.settle_time - (now - stable_since)
+                if remaining <= 0 and not _has_complete_trailer(path):
+                    # Stable but truncated (e.g. a stalled copy): keep waiting for more data
+                    remaining = self.settle_time
+                if remaining > 0:
+                    next_wait = remaining if next_wait is None else min(next_wait, remaining)
+                    continue
+                del self._candidates[path]
+                self._dispatched.add(path)
+                ready.append(path)
+        return ready, next_wait
+
+    def _dispatch(self, path):
+        try:
+            accepted = self.on_ready(path)
+        except Exception:
+            logger.exception("!!! Erro ao despachar %s", path)
+            accepted = False
+        if not accepted:
+            self.retry_later(path)
+
+    def retry_later(self, path, delay=None):
+        """Queues ``path`` again after ``delay`` (default ``retry_interval``), e.g. its upload failed."""
+        path = os.path.abspath(path)
+        with self._cond:
+            self._dispatched.discard(path)
+            self._candidates.pop(path, None)
+            self._waiting.add(path)
+        timer = threading.Timer(self.retry_interval if delay is None else delay, self._retry, args=(path,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, path):
+        with self._cond:
+            if path not in self._waiting:
+                return  # Queued again by an event, or gone, in the meantime
+        self.notify(path)
+
+    def start(self):
+        """Starts the filesystem observer (if available) and queues the files already present."""
+        if self.use_events:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.folder, recursive=False)
+            self._observer.start()
+        self._scan()
+
+    def run(self):
+        """Blocks, handing ready files to ``on_ready`` until stop() is called."""
+        if self._observer is None and self.use_events:
+            self.start()
+        elif not self.use_events:
+            self._scan()
+        last_scan = time.monotonic()
+        while not self._stopped.is_set():
+            ready, next_wait = self._check_candidates()
+            for path in ready:
+                self._dispatch(path)
+            if ready:
+                continue
+
+            if not self.use_events:
+                until_scan = self.poll_interval - (time.monotonic() - last_scan)
+                if until_scan <= 0:
+                    self._scan()
+                    last_scan = time.monotonic()
+                    continue
+                next_wait = until_scan if next_wait is None else min(next_wait, until_scan)
+
+            with self._cond:
+                # Idle with no candidates in events mode: sleep until an event arrives
+                if not self._stopped.is_set() and not self._dirty:
+                    self._cond.wait(timeout=next_wait)
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
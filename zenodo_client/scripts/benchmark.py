@@ -0,0 +1,273 @@
+"""
+Offline benchmark of the upload pipeline against the local fake Zenodo
+server (zenodo_client/tests/fake_zenodo.py).
+
+Each deposition goes through create -> upload -> metadata -> publish using
+the zenodo_client APIs. The report covers depositions per second, per-step
+latency percentiles, bytes per second and peak memory. Each workload runs
+in a fresh child process, so its peak memory is its own and not that of a
+workload that ran before it in the same process. Results are appended
+to a JSON-lines file together with the current git commit, so runs from
+different commits can be compared with --compare.
+
+    python -m zenodo_client.scripts.benchmark --workload small-pdfs --compare
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from ..api.actions import ActionsAPI
+from ..api.deposition import DepositionAPI
+from ..api.files import FilesAPI
+from ..core.client import ZenodoClient
+from ..core.ratelimit import RateLimiter
+from ..core.session import configure_session
+from ..jobs.batch import BatchPool
+
+MB = 1024 * 1024
+
+# Representative workloads; sizes can be scaled down with --scale for quick runs
+WORKLOADS = {
+    "small-pdfs": {"files": 200, "size": 256 * 1024, "workers": 8},
+    "large-files": {"files": 3, "size": 2 * 1024 * MB, "workers": 3},
+}
+
+STEPS = ("create", "upload", "metadata", "publish")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def make_files(folder, count, size):
+    """Writes ``count`` files of ``size`` bytes with distinct content, in constant memory."""
+    block = os.urandom(MB)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"bench-{i:05d}.pdf")
+        with open(path, "wb") as f:
+            f.write(f"%PDF-1.4 bench {i}\n".encode())
+            remaining = size
+            while remaining > 0:
+                f.write(block[:min(len(block), remaining)])
+                remaining -= len(block)
+            f.write(b"\n%%EOF\n")
+        paths.append(path)
+    return paths
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def fake_server_process(latency=0.0, bandwidth=None, error_rate=0.0, rate_limit=None):
+    """Runs the fake server in a child process so its memory is not counted."""
+    port = _free_port()
+    cmd = [sys.executable, "-m", "zenodo_client.tests.fake_zenodo", "--port", str(port),
+           "--latency", str(latency), "--error-rate", str(error_rate)]
+    if bandwidth:
+        cmd += ["--bandwidth", str(bandwidth)]
+    if rate_limit:
+        cmd += ["--rate-limit", str(rate_limit)]
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    proc = subprocess.Popen(cmd, cwd=root, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("fake Zenodo server did not start")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}/api/deposit/depositions"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run_deposition(file_path, apis, timings):
+    """One full deposition; appends (step, seconds) to ``timings``."""
+    depositions, files, actions = apis
+
+    def timed(step, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((step, time.perf_counter() - start))
+        return result
+
+    draft = timed("create", depositions.create_draft)
+    timed("upload", files.upload_file, draft["id"], draft["links"]["bucket"], file_path)
+    metadata = {
+        "title": f"Benchmark {os.path.basename(file_path)}",
+        "upload_type": "publication",
+        "publication_type": "article",
+        "description": "Benchmark deposition",
+        "creators": [{"name": "Bench, Mark"}],
+    }
+    timed("metadata", depositions.update_metadata, draft["id"], metadata)
+    return timed("publish", actions.publish, draft["id"])
+
+
+def run_workload(name, files, size, workers, latency=0.0, bandwidth=None, error_rate=0.0,
+                 rate_limit=None, client_rate=100000):
+    """Runs one workload and returns its result dict."""
+    with tempfile.TemporaryDirectory(prefix="zenodo-bench-") as folder:
+        paths = make_files(folder, files, size)
+        total_bytes = sum(os.path.getsize(p) for p in paths)
+
+        with fake_server_process(latency, bandwidth, error_rate, rate_limit) as depositions_url:
+            configure_session(pool_size=workers)
+            client = ZenodoClient(token="bench", rate_limiter=RateLimiter(per_minute=client_rate, burst=workers * 4))
+            apis = (DepositionAPI(client, depositions_url), FilesAPI(client, depositions_url),
+                    ActionsAPI(client, depositions_url))
+            timings = []
+
+            pool = BatchPool(run_deposition, max_workers=workers)
+            for path in paths:
+                pool.submit(path, (apis, timings))
+            report = pool.shutdown()
+
+    elapsed = report.elapsed
+    steps = {}
+    for step in STEPS:
+        values = [t for s, t in timings if s == step]
+        steps[step] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "mean": sum(values) / len(values) if values else None,
+        }
+    limiter = client.rate_limiter.stats()
+    return {
+        "workload": name,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {"files": files, "size": size, "workers": workers, "latency": latency,
+                   "bandwidth": bandwidth, "error_rate": error_rate, "rate_limit": rate_limit},
+        "elapsed": elapsed,
+        "succeeded": len(report.succeeded),
+        "failed": len(report.failed),
+        "depositions_per_s": len(report.succeeded) / elapsed if elapsed else None,
+        "bytes_per_s": total_bytes / elapsed if elapsed else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "rate_limit_wait": limiter["wait_time"],
+        "throttled": limiter["throttled"],
+        "steps": steps,
+    }
+
+
+def run_workload_isolated(name, **kwargs):
+    """run_workload in a new process: ru_maxrss is the high-water mark of the whole process."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_workload, name, **kwargs).result()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(results_path, workload):
+    """Returns the last saved result for a workload, or None."""
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                result = json.loads(line)
+                if result.get("workload") == workload:
+                    previous = result
+    return previous
+
+
+def _size(n):
+    return f"{n / MB:.2f} MB" if n >= MB else f"{n / 1024:.1f} KB"
+
+
+def _ms(value):
+    return f"{value * 1000:.1f}ms" if value is not None else "-"
+
+
+def format_result(result, previous=None):
+    lines = [
+        f"== {result['workload']} @ {result['commit'] or 'unknown'} "
+        f"({result['params']['files']} x {_size(result['params']['size'])}, {result['params']['workers']} workers)",
+        f"  depositions/s: {result['depositions_per_s']:.2f}   MB/s: {result['bytes_per_s'] / MB:.2f}   "
+        f"peak RSS: {result['peak_rss_mb']:.1f} MB   ok/failed: {result['succeeded']}/{result['failed']}",
+    ]
+    for step, s in result["steps"].items():
+        lines.append(f"  {step:<9} p50 {_ms(s['p50']):>9}  p90 {_ms(s['p90']):>9}  p99 {_ms(s['p99']):>9}")
+    if previous:
+        def delta(key):
+            old, new = previous.get(key), result.get(key)
+            return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        lines.append(f"  vs {previous.get('commit') or 'unknown'} ({previous.get('timestamp')}): "
+                     f"depositions/s {delta('depositions_per_s')}, MB/s {delta('bytes_per_s')}, "
+                     f"peak RSS {delta('peak_rss_mb')}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Zenodo upload pipeline.")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="Workload to run (repeatable; default: all).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies file sizes (e.g. 0.01 for a quick run).")
+    parser.add_argument("--files", type=int, help="Overrides the number of files.")
+    parser.add_argument("--workers", type=int, help="Overrides the number of concurrent depositions.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency per request (seconds).")
+    parser.add_argument("--bandwidth", type=float, help="Server upload cap per connection (bytes/s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--rate-limit", type=int, help="Server limit in requests per minute (429 beyond it).")
+    parser.add_argument("--output", default="benchmarks/results.jsonl", help="JSON-lines file the results are appended to.")
+    parser.add_argument("--compare", action="store_true", help="Compares with the last saved result of each workload.")
+    parser.add_argument("--no-save", action="store_true", help="Does not append the results to --output.")
+    args = parser.parse_args()
+
+    for name in args.workload or sorted(WORKLOADS):
+        spec = WORKLOADS[name]
+        result = run_workload_isolated(
+            name,
+            files=args.files or spec["files"],
+            size=max(1, int(spec["size"] * args.scale)),
+            workers=args.workers or spec["workers"],
+            latency=args.latency,
+            bandwidth=args.bandwidth,
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+        )
+        previous = load_previous(args.output, name) if args.compare else None
+        print(format_result(result, previous))
+        if not args.no_save:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
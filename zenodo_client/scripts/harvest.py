@@ -0,0 +1,59 @@
+"""
+Nightly OAI-PMH mirror: harvests the records changed since the previous run
+into a gzip-compressed JSON-lines file.
+
+    python -m zenodo_client.scripts.harvest --set user-minha-comunidade --output acervo.jsonl.gz
+
+The checkpoint (``<output>.checkpoint``) remembers where the last run
+stopped; run the same command again to continue or to fetch only what
+changed since.
+"""
+import argparse
+import logging
+import resource
+import sys
+import time
+
+from ..api.oai_pmh import OAIPMHAPI, OAIPMHError
+from ..config.settings import OAI_PMH_URL
+from ..jobs.harvest import Harvest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvests Zenodo records over OAI-PMH into compressed JSON lines.")
+    parser.add_argument("--output", required=True, help="Output file (.jsonl.gz); records are appended.")
+    parser.add_argument("--url", default=OAI_PMH_URL, help=f"OAI-PMH endpoint (default: {OAI_PMH_URL}).")
+    parser.add_argument("--set", help="Set to harvest, e.g. user-<community>.")
+    parser.add_argument("--prefix", default="oai_dc", help="metadataPrefix (default: oai_dc).")
+    parser.add_argument("--from", dest="from_date", help="Start date; default: where the previous run ended.")
+    parser.add_argument("--until", help="End date.")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint).")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and harvest everything again.")
+    parser.add_argument("--no-prefetch", action="store_true", help="Parse straight from the socket, one page at a time.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+
+    def progress(page, state):
+        total = f"/{state['complete_list_size']}" if state.get("complete_list_size") else ""
+        logging.info("%s%s records", state["records"], total)
+
+    harvest = Harvest(args.output, args.checkpoint, api=OAIPMHAPI(base_url=args.url), metadata_prefix=args.prefix,
+                      set_spec=args.set, prefetch=not args.no_prefetch, on_page=progress)
+    try:
+        counts = harvest.run(args.from_date, args.until, restart=args.restart)
+    except (OAIPMHError, ValueError, OSError) as e:
+        # ValueError/OSError: bad --url, unreachable endpoint, unwritable output or checkpoint
+        logging.error("Harvest failed: %s", e)
+        return 1
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logging.info("%s records (%s deleted), %s pages in %.1fs (%.0f records/s), peak RSS %.0f MB",
+                 counts["records"], counts["deleted"], counts["pages"], elapsed,
+                 counts["records"] / elapsed if elapsed else 0, peak_mb)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Local index of the account's depositions, for queries without API calls.
+
+    python -m zenodo_client.scripts.index sync
+    python -m zenodo_client.scripts.index search "machine learning" --published
+    python -m zenodo_client.scripts.index search --creator Silva --without-orcid
+    python -m zenodo_client.scripts.index show 123456
+
+``sync`` fetches only what changed since the previous sync (``--full`` pages
+everything and drops deleted drafts). The token and endpoint come from
+ZENODO_TOKEN and ZENODO_API_URL (environment or .env), as in zenodoapp.py.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from ..api.deposition import DepositionAPI
+from ..config.settings import get_access_token, get_depositions_url
+from ..core.client import ZenodoClient
+from ..jobs.local_index import DepositionIndex
+
+DEFAULT_INDEX_FILE = "zenodo_index.db"
+
+
+def _print_rows(rows, as_json):
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    for row in rows:
+        state = "published" if row["state"] == "done" else row["state"]
+        print(f"{row['id']:>9}  {row['doi'] or '-':<28}  {(row['modified'] or '')[:10]}  {state:<11}  {row['title']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local full-text index of the account's depositions.")
+    parser.add_argument("--db", default=DEFAULT_INDEX_FILE, help=f"Index database (default: {DEFAULT_INDEX_FILE}).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="Fetch depositions modified since the last sync.")
+    sync.add_argument("--full", action="store_true", help="Page through every deposition and drop deleted ones.")
+
+    search = commands.add_parser("search", help="Query the index (no API calls).")
+    search.add_argument("text", nargs="?", help="Words to find in title, description, creators, keywords or filenames.")
+    search.add_argument("--creator", help="Creator name contains this text.")
+    search.add_argument("--without-orcid", action="store_true", help="Only records with a (matching) creator lacking an ORCID.")
+    search.add_argument("--keyword", help="Keyword (* as wildcard).")
+    search.add_argument("--filename", help="File name (* as wildcard).")
+    search.add_argument("--checksum", help="MD5 of a file.")
+    search.add_argument("--type", dest="upload_type", help="upload_type.")
+    status = search.add_mutually_exclusive_group()
+    status.add_argument("--published", action="store_const", const=True, dest="published")
+    status.add_argument("--drafts", action="store_const", const=False, dest="published")
+    search.add_argument("--since", help="Modified on or after this date (YYYY-MM-DD).")
+    search.add_argument("--limit", type=int, default=50)
+    search.add_argument("--json", action="store_true", help="One JSON object per line.")
+
+    show = commands.add_parser("show", help="Print the stored JSON of a deposition.")
+    show.add_argument("id", type=int)
+
+    commands.add_parser("stats", help="Counts and time of the last sync.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    index = DepositionIndex(args.db)
+
+    if args.command == "sync":
+        try:
+            token = get_access_token()
+        except EnvironmentError as e:
+            print(e, file=sys.stderr)
+            return 1
+        api = DepositionAPI(ZenodoClient(token=token), base_url=get_depositions_url())
+        started = time.perf_counter()
+        result = index.sync(api, full=args.full)
+        print(f"{result['updated']} updated, {result['removed']} removed "
+              f"({'full' if result['full'] else 'incremental'}) in {time.perf_counter() - started:.1f}s")
+    elif args.command == "search":
+        started = time.perf_counter()
+        try:
+            rows = index.search(args.text, creator=args.creator, without_orcid=args.without_orcid,
+                                keyword=args.keyword, filename=args.filename, checksum=args.checksum,
+                                upload_type=args.upload_type, published=args.published,
+                                modified_since=args.since, limit=args.limit)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        _print_rows(rows, args.json)
+        if not args.json:
+            print(f"-- {len(rows)} record(s) in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    elif args.command == "show":
+        deposition = index.get(args.id)
+        if deposition is None:
+            print(f"Deposition {args.id} is not in the index.", file=sys.stderr)
+            return 1
+        print(json.dumps(deposition, indent=2, ensure_ascii=False))
+    elif args.command == "stats":
+        print(json.dumps(index.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
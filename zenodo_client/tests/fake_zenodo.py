@@ -0,0 +1,650 @@
+"""
+Local stand-in for the parts of the Zenodo REST API used by zenodoapp.py
+and zenodo_client.api: depositions, bucket uploads, metadata, publish and
+new versions, plus an OAI-PMH endpoint serving synthetic records.
+
+The server keeps everything in memory (uploaded files are reduced to their
+size and MD5 while they stream in) and can simulate latency, bandwidth
+caps, random server errors and rate limiting with 429 responses.
+"""
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+_CHUNK = 64 * 1024
+
+# Metadata keys Zenodo adds itself; a PUT that sends them back is rejected
+_SERVER_MANAGED_METADATA = ("relations",)
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.depositions = {}
+        self.buckets = {}  # bucket id -> deposition id
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.maintenance = 0  # requests still to answer with 503
+        self.maintenance_retry_after = 1
+        self.oai_datestamps = array("q")  # epoch seconds of the synthetic OAI records, ascending
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeZenodo/1.0"
+    # Headers and body are separate writes; without this, Nagle plus delayed
+    # ACKs add ~40ms to every response and swamp what is being measured
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers ---------------------------------------------------------
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _base(self):
+        return f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+    def _send_json(self, status, payload, headers=None):
+        # 204 has no body; sending one would corrupt the next response on a kept-alive connection
+        body = json.dumps(payload).encode() if status != 204 else b""
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.command == "GET" and status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.command == "GET" and status in (200, 304):
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        for name, value in self.fake.rate_limit_headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _reject(self, status, payload, headers=None):
+        # The body was not read: close the connection instead of reusing it
+        self.close_connection = True
+        self._send_json(status, payload, {**(headers or {}), "Connection": "close"})
+
+    def _read_body(self, digest=None):
+        """Reads the request body in chunks, honoring the bandwidth cap."""
+        fake = self.fake
+        total = 0
+        data = [] if digest is None else None
+        start = time.monotonic()
+
+        def consume(chunk):
+            nonlocal total
+            total += len(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            else:
+                data.append(chunk)
+            if fake.bandwidth:
+                ahead = total / fake.bandwidth - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(_CHUNK, remaining))
+                    remaining -= len(chunk)
+                    consume(chunk)
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                chunk = self.rfile.read(min(_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                consume(chunk)
+        with fake.state.lock:
+            fake.state.bytes_received += total
+        return total if digest is not None else b"".join(data)
+
+    def _json_body(self):
+        raw = self._read_body()
+        return json.loads(raw) if raw else {}
+
+    def _gate(self):
+        """Applies latency, rate limit and error injection. Returns False if the request was rejected."""
+        fake = self.fake
+        with fake.state.lock:
+            fake.state.requests += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+        retry_after = fake.take_token()
+        if retry_after is not None:
+            with fake.state.lock:
+                fake.state.throttled += 1
+            self._reject(429, {"status": 429, "message": "Too many requests"},
+                         {"Retry-After": str(max(1, int(retry_after + 0.999)))})
+            return False
+        with fake.state.lock:
+            in_maintenance = fake.state.maintenance > 0
+            if in_maintenance:
+                fake.state.maintenance -= 1
+                fake.state.errors += 1
+        if in_maintenance:
+            self._reject(503, {"status": 503, "message": "Service under maintenance"},
+                         {"Retry-After": str(fake.state.maintenance_retry_after)})
+            return False
+        if fake.error_rate and fake.random.random() < fake.error_rate:
+            with fake.state.lock:
+                fake.state.errors += 1
+            self._reject(500, {"status": 500, "message": "Injected server error"})
+            return False
+        public = self.path.startswith("/oai2d")
+        if not public and not self.headers.get("Authorization", "").startswith("Bearer ") and "access_token=" not in self.path:
+            self._reject(401, {"status": 401, "message": "Missing token"})
+            return False
+        return True
+
+    def _deposition_json(self, dep):
+        base = self._base()
+        dep_url = f"{base}/api/deposit/depositions/{dep['id']}"
+        payload = {k: v for k, v in dep.items() if k not in ("bucket", "files", "draft_id")}
+        payload["files"] = [self._file_json(dep, f) for f in dep["files"].values()]
+        payload["links"] = {
+            "self": dep_url,
+            "html": f"{base}/deposit/{dep['id']}",
+            "bucket": f"{base}/api/files/{dep['bucket']}",
+            "files": f"{dep_url}/files",
+            "publish": f"{dep_url}/actions/publish",
+            "edit": f"{dep_url}/actions/edit",
+            "discard": f"{dep_url}/actions/discard",
+            "newversion": f"{dep_url}/actions/newversion",
+            "latest_html": f"{base}/records/{dep['id']}",
+        }
+        if dep.get("draft_id"):
+            payload["links"]["latest_draft"] = f"{base}/api/deposit/depositions/{dep['draft_id']}"
+        return payload
+
+    def _file_json(self, dep, f):
+        return {
+            "id": f["id"],
+            "filename": f["filename"],
+            "filesize": f["filesize"],
+            "checksum": f["checksum"],
+            "links": {"self": f"{self._base()}/api/deposit/depositions/{dep['id']}/files/{f['id']}"},
+        }
+
+    def _find(self, deposition_id):
+        dep = self.fake.state.depositions.get(int(deposition_id))
+        if dep is None:
+            self._send_json(404, {"status": 404, "message": "PID does not exist."})
+        return dep
+
+    # --- routing ---------------------------------------------------------
+
+    _routes = [
+        ("GET", re.compile(r"^/api/deposit/depositions/?$"), "list_depositions"),
+        ("POST", re.compile(r"^/api/deposit/depositions/?$"), "create_deposition"),
+        ("GET", re.compile(r"^/api/deposit/depositions/(\d+)$"), "get_deposition"),
+        ("PUT", re.compile(r"^/api/deposit/depositions/(\d+)$"), "update_deposition"),
+        ("DELETE", re.compile(r"^/api/deposit/depositions/(\d+)$"), "delete_deposition"),
+        ("GET", re.compile(r"^/api/deposit/depositions/(\d+)/files$"), "list_files"),
+        ("DELETE", re.compile(r"^/api/deposit/depositions/(\d+)/files/([\w-]+)$"), "delete_file"),
+        ("POST", re.compile(r"^/api/deposit/depositions/(\d+)/actions/publish$"), "publish"),
+        ("POST", re.compile(r"^/api/deposit/depositions/(\d+)/actions/newversion$"), "new_version"),
+        ("POST", re.compile(r"^/api/deposit/depositions/(\d+)/actions/discard$"), "discard"),
+        ("PUT", re.compile(r"^/api/files/([\w-]+)/(.+)$"), "put_object"),
+        ("GET", re.compile(r"^/oai2d/?$"), "oai"),
+    ]
+
+    def _dispatch(self):
+        path = urlparse(self.path).path
+        for method, pattern, name in self._routes:
+            match = pattern.match(path)
+            if method == self.command and match:
+                if self._gate():
+                    getattr(self, name)(*match.groups())
+                return
+        self._reject(404, {"status": 404, "message": "Not found"})
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    # --- endpoints -------------------------------------------------------
+
+    def list_depositions(self):
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query.get("page", ["1"])[0])
+        size = int(query.get("size", ["10"])[0])
+        sort = query.get("sort", ["mostrecent"])[0]
+        with self.fake.state.lock:
+            # "mostrecent": last modified first, as Zenodo orders the deposit listing
+            key = (lambda d: (d["modified"], d["id"])) if sort == "mostrecent" else (lambda d: d["id"])
+            deps = sorted(self.fake.state.depositions.values(), key=key, reverse=True)
+            items = [self._deposition_json(d) for d in deps[(page - 1) * size:page * size]]
+            has_next = page * size < len(deps)
+        headers = {}
+        if has_next:
+            headers["Link"] = f'<{self._base()}/api/deposit/depositions?page={page + 1}&size={size}&sort={sort}>; rel="next"'
+        self._send_json(200, items, headers)
+
+    def _new_draft(self, conceptrecid=None):
+        # Caller holds the state lock
+        state = self.fake.state
+        dep_id = state.next_id
+        state.next_id += 1
+        bucket = f"bucket-{dep_id}-{self.fake.random.getrandbits(32):08x}"
+        now = datetime.now(timezone.utc).isoformat()
+        dep = {
+            "id": dep_id, "conceptrecid": conceptrecid or str(dep_id), "created": now, "modified": now,
+            "metadata": {}, "state": "unsubmitted", "submitted": False,
+            "bucket": bucket, "files": {},
+        }
+        state.depositions[dep_id] = dep
+        state.buckets[bucket] = dep_id
+        return dep
+
+    def create_deposition(self):
+        self._json_body()
+        with self.fake.state.lock:
+            payload = self._deposition_json(self._new_draft())
+        self._send_json(201, payload)
+
+    def get_deposition(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is not None:
+                payload = self._deposition_json(dep)
+        if dep is not None:
+            self._send_json(200, payload)
+
+    def update_deposition(self, deposition_id):
+        body = self._json_body()
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            if dep["submitted"]:
+                return self._send_json(400, {"status": 400, "message": "Deposition is published."})
+            metadata = body.get("metadata", {})
+            managed = sorted(k for k in metadata if k in _SERVER_MANAGED_METADATA)
+            if managed:
+                return self._send_json(400, {"status": 400, "message": "Validation error.",
+                                             "errors": [{"field": f"metadata.{k}", "message": "Unknown field name."}
+                                                        for k in managed]})
+            dep["metadata"] = metadata
+            dep["modified"] = datetime.now(timezone.utc).isoformat()
+            payload = self._deposition_json(dep)
+        self._send_json(200, payload)
+
+    def delete_deposition(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            del self.fake.state.depositions[dep["id"]]
+        self._send_json(204, {})
+
+    def list_files(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is not None:
+                payload = [self._file_json(dep, f) for f in dep["files"].values()]
+        if dep is not None:
+            self._send_json(200, payload)
+
+    def delete_file(self, deposition_id, file_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            for key, f in list(dep["files"].items()):
+                if f["id"] == file_id:
+                    del dep["files"][key]
+                    break
+            else:
+                return self._send_json(404, {"status": 404, "message": "File does not exist."})
+        self._send_json(204, {})
+
+    def publish(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            if not dep["files"]:
+                return self._send_json(400, {"status": 400, "message": "Minimum one file must be provided."})
+            missing = [k for k in ("title", "upload_type", "description", "creators") if not dep["metadata"].get(k)]
+            if missing:
+                return self._send_json(400, {"status": 400, "message": "Validation error.",
+                                             "errors": [{"field": f"metadata.{k}", "message": "Required."} for k in missing]})
+            dep.update(state="done", submitted=True, modified=datetime.now(timezone.utc).isoformat(),
+                       doi=f"10.5072/zenodo.{dep['id']}",
+                       doi_url=f"https://doi.org/10.5072/zenodo.{dep['id']}", record_id=dep["id"])
+            # Like Zenodo: the published metadata gains fields only the server sets
+            versions = sum(1 for d in self.fake.state.depositions.values()
+                           if d["conceptrecid"] == dep["conceptrecid"] and d["submitted"])
+            dep["metadata"] = {**dep["metadata"], "doi": dep["doi"], "relations": {"version": [{
+                "index": versions - 1, "is_last": True, "count": versions,
+                "parent": {"pid_type": "recid", "pid_value": dep["conceptrecid"]},
+            }]}}
+            payload = self._deposition_json(dep)
+        self._send_json(202, payload)
+
+    def new_version(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            if not dep["submitted"]:
+                return self._send_json(400, {"status": 400, "message": "Deposition is not published."})
+            # Only one new version draft per record: a second call returns the same draft
+            current = self.fake.state.depositions.get(dep.get("draft_id"))
+            if current is None or current["submitted"]:
+                draft = self._new_draft(dep["conceptrecid"])
+                draft["metadata"] = {k: v for k, v in dep["metadata"].items() if k != "doi"}
+                for key, f in dep["files"].items():
+                    draft["files"][key] = {**f, "id": f"{draft['id']}-{len(draft['files']) + 1}-{self.fake.random.getrandbits(24):06x}"}
+                dep["draft_id"] = draft["id"]
+            payload = self._deposition_json(dep)
+        self._send_json(201, payload)
+
+    def discard(self, deposition_id):
+        with self.fake.state.lock:
+            dep = self._find(deposition_id)
+            if dep is None:
+                return
+            if dep["submitted"]:
+                return self._send_json(400, {"status": 400, "message": "Deposition is published."})
+            payload = self._deposition_json(dep)
+            del self.fake.state.depositions[dep["id"]]
+        self._send_json(201, payload)
+
+    # --- OAI-PMH ---------------------------------------------------------
+
+    @staticmethod
+    def _oai_date(seconds):
+        return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    @staticmethod
+    def _oai_seconds(value):
+        if len(value) == 10:
+            value += "T00:00:00Z"
+        return int(datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+
+    def _send_xml(self, body):
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _oai_envelope(self, params, inner):
+        attrs = "".join(f" {k}={quoteattr(v)}" for k, v in sorted(params.items()))
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">'
+                f"<responseDate>{self._oai_date(time.time())}</responseDate>"
+                f"<request{attrs}>{escape(self._base())}/oai2d</request>{inner}</OAI-PMH>")
+
+    def _oai_record(self, index, seconds):
+        record_id = index + 1
+        header_status = ' status="deleted"' if record_id % 97 == 0 else ""
+        header = (f"<header{header_status}><identifier>oai:zenodo.org:{record_id}</identifier>"
+                  f"<datestamp>{self._oai_date(seconds)}</datestamp><setSpec>user-fake</setSpec></header>")
+        if header_status:
+            return f"<record>{header}</record>"
+        return (f"<record>{header}<metadata>"
+                '<oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/" '
+                'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+                f"<dc:title>Registro sintético {record_id}</dc:title>"
+                "<dc:creator>Silva, Maria</dc:creator><dc:creator>Souza, João</dc:creator>"
+                f"<dc:identifier>https://doi.org/10.5072/zenodo.{record_id}</dc:identifier>"
+                f"<dc:date>{self._oai_date(seconds)[:10]}</dc:date>"
+                "<dc:description>Descrição &amp; resumo do registro.</dc:description>"
+                "<dc:type>info:eu-repo/semantics/article</dc:type>"
+                "</oai_dc:dc></metadata></record>")
+
+    def oai(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        verb = params.get("verb")
+        fake = self.fake
+
+        def error(code, message):
+            self._send_xml(self._oai_envelope(params, f'<error code="{code}">{escape(message)}</error>'))
+
+        if verb == "Identify":
+            with fake.state.lock:
+                earliest = fake.state.oai_datestamps[0] if fake.state.oai_datestamps else time.time()
+            return self._send_xml(self._oai_envelope(params, (
+                "<Identify><repositoryName>Fake Zenodo</repositoryName>"
+                f"<baseURL>{escape(self._base())}/oai2d</baseURL><protocolVersion>2.0</protocolVersion>"
+                f"<earliestDatestamp>{self._oai_date(earliest)}</earliestDatestamp>"
+                "<deletedRecord>persistent</deletedRecord>"
+                "<granularity>YYYY-MM-DDThh:mm:ssZ</granularity></Identify>")))
+        if verb != "ListRecords":
+            return error("badVerb", f"Illegal verb: {verb}")
+
+        token = params.get("resumptionToken")
+        if token:
+            # Opaque to clients: "<first index>.<next index>.<end index>.<prefix>"
+            match = re.match(r"^(\d+)\.(\d+)\.(\d+)\.(\w+)$", token)
+            if not match:
+                return error("badResumptionToken", "The value of the resumptionToken argument is invalid or expired.")
+            first, start, end = int(match.group(1)), int(match.group(2)), int(match.group(3))
+            prefix = match.group(4)
+        else:
+            prefix = params.get("metadataPrefix")
+            if prefix != "oai_dc":
+                return error("cannotDisseminateFormat", f"Unsupported metadataPrefix: {prefix}")
+            if params.get("set") not in (None, "user-fake"):
+                return error("noRecordsMatch", "No records match the request.")
+            try:
+                low = self._oai_seconds(params["from"]) if "from" in params else None
+                high = self._oai_seconds(params["until"]) if "until" in params else None
+            except ValueError:
+                return error("badArgument", "Invalid date.")
+            with fake.state.lock:
+                stamps = fake.state.oai_datestamps
+                start = bisect.bisect_left(stamps, low) if low is not None else 0
+                end = bisect.bisect_right(stamps, high) if high is not None else len(stamps)
+            if start >= end:
+                return error("noRecordsMatch", "No records match the request.")
+            first = start
+
+        stop = min(end, start + fake.oai_page_size)
+        with fake.state.lock:
+            stamps = fake.state.oai_datestamps[start:stop]
+        parts = ["<ListRecords>"]
+        parts.extend(self._oai_record(start + i, seconds) for i, seconds in enumerate(stamps))
+        size = f'completeListSize="{end - first}" cursor="{start - first}"'
+        if stop < end:
+            parts.append(f"<resumptionToken {size}>{first}.{stop}.{end}.{prefix}</resumptionToken>")
+        elif token:
+            parts.append(f"<resumptionToken {size}/>")
+        parts.append("</ListRecords>")
+        self._send_xml(self._oai_envelope(params, "".join(parts)))
+
+    def put_object(self, bucket, key):
+        with self.fake.state.lock:
+            dep_id = self.fake.state.buckets.get(bucket)
+            dep = self.fake.state.depositions.get(dep_id)
+        if dep is None:
+            return self._reject(404, {"status": 404, "message": "Bucket does not exist."})
+        digest = hashlib.md5()
+        size = self._read_body(digest)
+        md5 = digest.hexdigest()
+        if self.fake.corrupt_rate and self.fake.random.random() < self.fake.corrupt_rate:
+            md5 = hashlib.md5(md5.encode()).hexdigest()
+        with self.fake.state.lock:
+            if dep["submitted"]:
+                return self._send_json(403, {"status": 403, "message": "Bucket is locked."})
+            file_id = dep["files"].get(key, {}).get("id") or f"{dep['id']}-{len(dep['files']) + 1}-{self.fake.random.getrandbits(24):06x}"
+            dep["files"][key] = {"id": file_id, "filename": key, "filesize": size, "checksum": md5}
+        self._send_json(201, {"key": key, "size": size, "checksum": f"md5:{md5}",
+                              "mimetype": "application/octet-stream",
+                              "links": {"self": f"{self._base()}/api/files/{bucket}/{key}"}})
+
+
+class FakeZenodoServer:
+    """
+    In-process fake Zenodo server.
+
+    ``latency`` adds seconds to every request, ``bandwidth`` caps upload
+    bodies in bytes per second (per connection), ``error_rate`` answers
+    that fraction of requests with 500, ``corrupt_rate`` reports a wrong
+    checksum for that fraction of uploads and ``rate_limit`` (requests per
+    ``rate_window`` seconds) answers 429 with Retry-After once exceeded.
+    ``oai_records`` synthetic records are served at ``oai_url``,
+    ``oai_page_size`` per ListRecords response (every 97th is deleted).
+
+    Use as a context manager; ``api_url`` and ``depositions_url`` point at it.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, error_rate=0.0, corrupt_rate=0.0,
+                 rate_limit=None, rate_window=60.0, host="127.0.0.1", port=0, seed=None,
+                 oai_records=0, oai_page_size=100):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.corrupt_rate = corrupt_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.random = random.Random(seed)
+        self.state = _State()
+        self._window_start = time.time()
+        self._window_count = 0
+        self._limit_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+        self.oai_page_size = oai_page_size
+        if oai_records:
+            # Spread over the past so that records added later are strictly newer
+            self.add_oai_records(oai_records, start=int(time.time()) - oai_records - 1)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/api"
+
+    @property
+    def depositions_url(self):
+        return f"{self.api_url}/deposit/depositions"
+
+    @property
+    def oai_url(self):
+        return f"{self.base_url}/oai2d"
+
+    def add_oai_records(self, count, start=None):
+        """Appends ``count`` OAI records, one second apart from ``start`` (default: now)."""
+        with self.state.lock:
+            stamps = self.state.oai_datestamps
+            first = max(start if start is not None else int(time.time()), stamps[-1] + 1 if stamps else 0)
+            stamps.extend(range(first, first + count))
+
+    def start_maintenance(self, requests, retry_after=1):
+        """Answers the next ``requests`` requests with 503 and ``Retry-After: retry_after``."""
+        with self.state.lock:
+            self.state.maintenance = requests
+            self.state.maintenance_retry_after = retry_after
+
+    def take_token(self):
+        """Fixed-window limiter; returns seconds until reset when over the limit."""
+        if not self.rate_limit:
+            return None
+        with self._limit_lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_count = now, 0
+            if self._window_count >= self.rate_limit:
+                return self._window_start + self.rate_window - now
+            self._window_count += 1
+            return None
+
+    def rate_limit_headers(self):
+        if not self.rate_limit:
+            return {}
+        with self._limit_lock:
+            return {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(max(0, self.rate_limit - self._window_count)),
+                "X-RateLimit-Reset": str(int(self._window_start + self.rate_window)),
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-zenodo", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self.state.lock:
+            return {
+                "requests": self.state.requests,
+                "throttled": self.state.throttled,
+                "errors": self.state.errors,
+                "bytes_received": self.state.bytes_received,
+                "depositions": len(self.state.depositions),
+            }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs a local fake Zenodo API server.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--bandwidth", type=float, help="Upload cap in bytes per second.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--rate-limit", type=int, help="Requests per minute before answering 429.")
+    parser.add_argument("--oai-records", type=int, default=0, help="Synthetic records served at /oai2d.")
+    args = parser.parse_args()
+
+    server = FakeZenodoServer(latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate,
+                              rate_limit=args.rate_limit, port=args.port, oai_records=args.oai_records)
+    print(f"Fake Zenodo API at {server.depositions_url} (use as ZENODO_API_URL). Ctrl+C to stop.")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
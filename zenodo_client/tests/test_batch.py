@@ -0,0 +1,87 @@
+import threading
+import time
+
+from zenodo_client.jobs.batch import BatchPool
+
+
+def test_pool_never_runs_more_than_max_workers():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def worker(file_path):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return {"doi": file_path}
+
+    pool = BatchPool(worker, max_workers=3)
+    for i in range(12):
+        pool.submit(f"{i}.pdf")
+    report = pool.shutdown()
+    assert peak[0] == 3
+    assert len(report.succeeded) == 12
+
+
+def test_on_result_is_called_once_per_file_in_completion_order_one_at_a_time():
+    delays = {"lento.pdf": 0.15, "medio.pdf": 0.08, "rapido.pdf": 0.01}
+    seen, overlaps = [], []
+    inside = threading.Lock()
+
+    def on_result(result):
+        if not inside.acquire(blocking=False):
+            overlaps.append(result.file_path)
+            return
+        try:
+            time.sleep(0.02)  # A slow printer must not see calls interleave
+            seen.append(result.file_path)
+        finally:
+            inside.release()
+
+    def worker(file_path):
+        time.sleep(delays[file_path])
+        return {"doi": f"10.5281/{file_path}"}
+
+    pool = BatchPool(worker, max_workers=3, on_result=on_result)
+    for name in delays:
+        pool.submit(name)
+    pool.shutdown()
+    assert overlaps == []
+    assert seen == ["rapido.pdf", "medio.pdf", "lento.pdf"]
+
+
+def test_a_failing_file_does_not_affect_the_others():
+    def worker(file_path, metadata):
+        if file_path == "quebrado.pdf":
+            raise RuntimeError("upload recusado")
+        if file_path == "vazio.pdf":
+            return None
+        return {"doi": f"10.5281/{metadata['title']}"}
+
+    pool = BatchPool(worker, max_workers=2)
+    for name in ("a.pdf", "quebrado.pdf", "vazio.pdf", "b.pdf"):
+        pool.submit(name, ({"title": name},))
+    report = pool.shutdown()
+
+    assert sorted(r.file_path for r in report.succeeded) == ["a.pdf", "b.pdf"]
+    errors = {r.file_path: r.error for r in report.failed}
+    assert errors == {"quebrado.pdf": "upload recusado", "vazio.pdf": "pipeline retornou falha"}
+    assert "Sucesso: 2 | Falha: 2" in "\n".join(report.summary_lines())
+
+
+def test_daemon_pool_keeps_only_totals():
+    seen = []
+
+    def worker(file_path):
+        return {"doi": file_path} if not file_path.startswith("x") else None
+
+    pool = BatchPool(worker, max_workers=4, on_result=seen.append, keep_results=False)
+    for i in range(500):
+        pool.submit(f"{'x' if i % 10 == 0 else 'a'}{i}.pdf")
+    report = pool.shutdown()
+
+    assert len(seen) == 500 and report.results == []
+    assert (report.total, report.succeeded_count, report.failed_count) == (500, 450, 50)
+    assert "Arquivos: 500 | Sucesso: 450 | Falha: 50" in "\n".join(report.summary_lines())
@@ -0,0 +1,94 @@
+import json
+
+from zenodo_client.api.deposition import DepositionAPI
+from zenodo_client.cli import main as cli_main
+from zenodo_client.core.cache import ResponseCache
+from zenodo_client.core.client import ZenodoClient
+from zenodo_client.core.ratelimit import RateLimiter
+from zenodo_client.jobs import pipeline
+from zenodo_client.tests.fake_zenodo import FakeZenodoServer
+
+
+def _api(server, cache, token="test"):
+    client = ZenodoClient(token=token, rate_limiter=RateLimiter(per_minute=60000, burst=100), cache=cache)
+    return DepositionAPI(client, server.depositions_url)
+
+
+def test_stale_entries_are_revalidated_with_etag():
+    cache = ResponseCache(ttl=0)  # every entry is stale at once
+    with FakeZenodoServer() as server:
+        api = _api(server, cache)
+        draft = api.create_draft()
+        first = api.get_deposition(draft["id"])
+        requests_before = server.stats()["requests"]
+        assert api.get_deposition(draft["id"]) == first
+        assert server.stats()["requests"] == requests_before + 1  # a 304, not a download
+
+    assert cache.stats()["misses"] == 1 and cache.stats()["revalidated"] == 1
+
+
+def test_fresh_entries_skip_the_network_until_a_write():
+    cache = ResponseCache(ttl=300)
+    with FakeZenodoServer() as server:
+        api = _api(server, cache)
+        draft = api.create_draft()
+        api.get_deposition(draft["id"])
+        api.list_depositions()
+        requests_before = server.stats()["requests"]
+        api.get_deposition(draft["id"])
+        assert server.stats()["requests"] == requests_before
+
+        api.update_metadata(draft["id"], {"title": "Novo"})
+        # The PUT dropped the deposition and the listing above it
+        assert api.get_deposition(draft["id"])["metadata"]["title"] == "Novo"
+        assert api.list_depositions()[0]["metadata"]["title"] == "Novo"
+
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    for path in (None, str(tmp_path / "cache.db")):
+        cache = ResponseCache(ttl=300, max_entries=2, path=path)
+        with FakeZenodoServer() as server:
+            api = _api(server, cache)
+            a, b, c = (api.create_draft()["id"] for _ in range(3))
+            api.get_deposition(a)
+            api.get_deposition(b)
+            api.get_deposition(a)  # a is now more recent than b
+            api.get_deposition(c)
+            requests_before = server.stats()["requests"]
+            api.get_deposition(a)
+            assert server.stats()["requests"] == requests_before
+            api.get_deposition(b)
+            assert server.stats()["requests"] == requests_before + 1
+        assert cache.stats()["evictions"] >= 1
+
+
+def test_entries_are_not_shared_between_tokens(tmp_path):
+    cache = ResponseCache(ttl=300, path=str(tmp_path / "shared.db"))
+    with FakeZenodoServer() as server:
+        mine = _api(server, cache, token="conta-a")
+        mine.create_draft()
+        mine.list_depositions()
+        requests_before = server.stats()["requests"]
+        _api(server, cache, token="conta-b").list_depositions()
+        assert server.stats()["requests"] == requests_before + 1
+    assert not any("conta-" in key for key in cache.backend.keys())
+
+
+def test_cli_enables_the_cache(monkeypatch, capsys):
+    with FakeZenodoServer() as server:
+        monkeypatch.setenv("ZENODO_TOKEN", "test")
+        monkeypatch.setattr(pipeline, "_client", None)
+        monkeypatch.setattr(pipeline, "_cache_ttl", None)
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        _api(server, None).create_draft()
+
+        assert cli_main(["list", "--json", "--cache-ttl", "300"]) == 0
+        requests_before = server.stats()["requests"]
+        assert cli_main(["list", "--json"]) == 0
+        assert server.stats()["requests"] == requests_before
+        assert pipeline.get_api_client().cache.stats()["hits"] == 1
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2 and json.loads(lines[0]) == json.loads(lines[1])
@@ -0,0 +1,105 @@
+import threading
+import time
+from email.utils import formatdate
+
+import requests
+
+from zenodo_client.core.client import ZenodoClient
+from zenodo_client.core.ratelimit import RateLimiter, parse_retry_after
+
+
+class _ScriptedSession:
+    """Answers each request with the next status code of a script; records the methods seen."""
+
+    def __init__(self, statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.calls = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls.append(method)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response.headers.update(self.headers)
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+
+def _client(session):
+    limiter = RateLimiter(per_minute=600000, burst=1000, base_backoff=0.001, max_backoff=0.001)
+    return ZenodoClient(session=session, token="test", rate_limiter=limiter, max_retries=3)
+
+
+def test_5xx_is_retried_only_for_idempotent_methods():
+    """A 502 after a POST may hide a created draft: it is returned, not resent. 429 is always retried."""
+    for method, statuses, expected_calls, final in [
+        ("GET", [502, 503, 200], 3, 200),
+        ("PUT", [504, 200], 2, 200),
+        ("DELETE", [500, 204], 2, 204),
+        ("POST", [502, 200], 1, 502),
+        ("POST", [504, 200], 1, 504),
+        ("POST", [429, 429, 201], 3, 201),
+    ]:
+        session = _ScriptedSession(statuses, headers={"Retry-After": "0"})
+        try:
+            response = _client(session).request(method, "http://zenodo.test/api/deposit/depositions")
+            status = response.status_code
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code
+        assert (len(session.calls), status) == (expected_calls, final), method
+
+
+def test_limiter_learns_budget_from_headers():
+    limiter = RateLimiter(per_minute=6000, burst=10)
+    limiter.update_from_headers({"X-RateLimit-Limit": "60", "X-RateLimit-Remaining": "20",
+                                 "X-RateLimit-Reset": "10"})
+    assert limiter.capacity == 60
+    assert abs(limiter.rate - 2.0) < 1e-9  # what is left, spread over the rest of the window
+
+    limiter.update_from_headers({"X-RateLimit-Limit": "60", "X-RateLimit-Remaining": "0",
+                                 "X-RateLimit-Reset": str(int(time.time()) + 5)})
+    assert 3.5 < limiter.reserve() <= 5.0  # budget spent: wait for the reset
+
+    untouched = RateLimiter(per_minute=60, burst=5)
+    untouched.update_from_headers({"Content-Type": "application/json"})
+    assert untouched.reserve() == 0.0
+
+
+def test_retry_after_blocks_every_caller():
+    assert parse_retry_after("7") == 7.0
+    assert 28 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after("soon") is None
+
+    limiter = RateLimiter(per_minute=6000, burst=100, base_backoff=0.5)
+    delay = limiter.on_throttled({"Retry-After": "3"}, attempt=0)
+    assert 3.0 <= delay <= 3.5
+    # Another caller with tokens to spare still waits out the Retry-After
+    assert limiter.reserve() > 2.5
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_bucket_is_shared_across_threads():
+    """20 threads drawing from a 5-token bucket refilled at 10/s are spaced 0.1s apart after the burst."""
+    limiter = RateLimiter(per_minute=600, burst=5)
+    waits = []
+    lock = threading.Lock()
+    start = threading.Barrier(20)
+
+    def worker():
+        start.wait()
+        wait = limiter.reserve()
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    waits.sort()
+    assert waits[:5] == [0.0] * 5
+    for i, wait in enumerate(waits[5:], start=1):
+        assert abs(wait - i * 0.1) < 0.05
+    assert limiter.stats()["requests"] == 20 and limiter.stats()["waits"] == 15
@@ -0,0 +1,437 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from zenodo_client.api.actions import ActionsAPI
+from zenodo_client.api.async_api import AsyncActionsAPI, AsyncDepositionAPI, AsyncFilesAPI
+from zenodo_client.api.deposition import DepositionAPI
+from zenodo_client.api.files import ChecksumMismatchError, FilesAPI
+from zenodo_client.api.oai_pmh import OAIPMHAPI
+from zenodo_client.cli import main as cli_main
+from zenodo_client.core.async_client import AsyncZenodoClient
+from zenodo_client.core.client import ZenodoClient
+from zenodo_client.core.hashing import file_checksum
+from zenodo_client.core.ratelimit import RateLimiter
+from zenodo_client.jobs.harvest import Harvest
+from zenodo_client.jobs import pipeline
+from zenodo_client.jobs.local_index import DepositionIndex
+from zenodo_client.jobs.metadata import MetadataGenerator
+from zenodo_client.jobs.versioning import publish_new_version
+from zenodo_client.tests.fake_zenodo import FakeZenodoServer
+
+
+def test_full_deposition_against_fake_server(tmp_path):
+    """Create -> upload -> metadata -> publish runs offline against the fake server."""
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 100000 + b"\n%%EOF\n")
+
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        depositions = DepositionAPI(client, server.depositions_url)
+        files = FilesAPI(client, server.depositions_url)
+
+        draft = depositions.create_draft()
+        files.upload_file(draft["id"], draft["links"]["bucket"], str(pdf))
+        assert files.verify_checksums(draft["id"], {"artigo.pdf": file_checksum(str(pdf))}) == []
+
+        depositions.update_metadata(draft["id"], {
+            "title": "Teste",
+            "upload_type": "publication",
+            "publication_type": "article",
+            "description": "Teste offline",
+            "creators": [{"name": "Silva, Maria"}],
+        })
+        published = ActionsAPI(client, server.depositions_url).publish(draft["id"])
+
+        assert published["state"] == "done"
+        assert published["doi"]
+        assert server.stats()["depositions"] == 1
+
+
+def test_streamed_upload_hashes_in_one_pass_and_retries_mismatches(tmp_path):
+    """Digests come from the bytes sent; a checksum the bucket got wrong is sent again."""
+    data = os.urandom(3 * 1024 * 1024 + 123)
+    path = tmp_path / "dados.bin"
+    path.write_bytes(data)
+    progress = []
+
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        files = FilesAPI(client, server.depositions_url)
+        draft = DepositionAPI(client, server.depositions_url).create_draft()
+        before = server.stats()["bytes_received"]
+        result = files.upload_file(draft["id"], draft["links"]["bucket"], str(path), algorithms=("sha256",),
+                                   block_size=256 * 1024, use_mmap=True,
+                                   on_progress=lambda *args: progress.append(args))
+
+        assert result["digests"] == {"md5": hashlib.md5(data).hexdigest(), "sha256": hashlib.sha256(data).hexdigest()}
+        assert progress[-1][:3] == ("dados.bin", len(data), len(data))
+        assert server.stats()["bytes_received"] - before == len(data)
+
+        server.corrupt_rate = 1.0
+        with pytest.raises(ChecksumMismatchError):
+            files.upload_file(draft["id"], draft["links"]["bucket"], str(path), retries=2)
+        assert server.stats()["bytes_received"] - before == 4 * len(data)
+
+
+def test_async_client_runs_concurrent_depositions(tmp_path):
+    """Many drafts created, described, uploaded and published concurrently from one event loop."""
+    pytest.importorskip("aiohttp")
+    small, large = tmp_path / "leiame.txt", tmp_path / "dados.csv"
+    small.write_bytes(b"leia-me\n")
+    large.write_bytes(b"a,b\n" * 300000)
+
+    async def deposit(depositions, files, actions, i):
+        draft = await depositions.create_draft()
+        await depositions.update_metadata(draft["id"], {
+            "title": f"Lote {i}", "upload_type": "dataset", "description": "async",
+            "creators": [{"name": "Silva, Maria"}],
+        })
+        data = large if i % 10 == 0 else small
+        uploaded, failed = await files.upload_files(draft["id"], draft["links"]["bucket"], [str(data)])
+        assert not failed and uploaded[data.name]["checksum"] == file_checksum(str(data))
+        return await actions.publish(draft["id"])
+
+    async def run(url):
+        async with AsyncZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=600000, burst=1000),
+                                     max_concurrency=50) as client:
+            depositions = AsyncDepositionAPI(client, url)
+            files = AsyncFilesAPI(client, url)
+            actions = AsyncActionsAPI(client, url)
+            published = await asyncio.gather(*(deposit(depositions, files, actions, i) for i in range(200)))
+            listed = [d async for d in depositions.iter_depositions(page_size=30)]
+            return published, listed
+
+    with FakeZenodoServer() as server:
+        published, listed = asyncio.run(run(server.depositions_url))
+
+    assert all(p["state"] == "done" for p in published)
+    assert len({p["id"] for p in published}) == len(listed) == 200
+
+
+def test_new_version_sends_only_changed_files(tmp_path):
+    """A new version uploads added/changed files, deletes removed ones and keeps the rest."""
+    for name in ("a.bin", "b.bin", "c.bin"):
+        (tmp_path / name).write_bytes(name.encode() * 10000)
+
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        depositions = DepositionAPI(client, server.depositions_url)
+        files = FilesAPI(client, server.depositions_url)
+        draft = depositions.create_draft()
+        files.upload_files(draft["id"], draft["links"]["bucket"], [str(p) for p in sorted(tmp_path.iterdir())])
+        depositions.update_metadata(draft["id"], {
+            "title": "Dados", "upload_type": "dataset", "description": "v1", "creators": [{"name": "Silva, Maria"}],
+        })
+        ActionsAPI(client, server.depositions_url).publish(draft["id"])
+
+        (tmp_path / "b.bin").write_bytes(b"changed")
+        (tmp_path / "c.bin").unlink()
+        (tmp_path / "d.bin").write_bytes(b"new")
+        result = publish_new_version(draft["id"], [str(p) for p in sorted(tmp_path.iterdir())], {"version": "v2"},
+                                     client=client, base_url=server.depositions_url)
+
+        plan = result["plan"]
+        assert (sorted(plan.added), sorted(plan.changed), plan.removed, plan.unchanged) == (["d.bin"], ["b.bin"], ["c.bin"], ["a.bin"])
+        assert plan.skipped_bytes == 50000
+        assert sorted(result["deleted"]) == ["b.bin", "c.bin"]
+        record = result["record"]
+        assert record["state"] == "done" and record["id"] != draft["id"]
+        assert record["metadata"]["version"] == "v2"
+        # "relations" came back from the published v1 and was not sent to the new draft
+        assert record["metadata"]["relations"]["version"][0]["count"] == 2
+        assert sorted(f["filename"] for f in record["files"]) == ["a.bin", "b.bin", "d.bin"]
+
+
+def test_resumed_version_draft_drops_files_no_longer_requested(tmp_path):
+    """A file sent by an earlier run and then left out of file_paths is not published."""
+    for name in ("a.bin", "b.bin"):
+        (tmp_path / name).write_bytes(name.encode() * 1000)
+
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        depositions = DepositionAPI(client, server.depositions_url)
+        files = FilesAPI(client, server.depositions_url)
+        draft = depositions.create_draft()
+        files.upload_files(draft["id"], draft["links"]["bucket"], [str(tmp_path / "a.bin"), str(tmp_path / "b.bin")])
+        depositions.update_metadata(draft["id"], {
+            "title": "Dados", "upload_type": "dataset", "description": "v1", "creators": [{"name": "Silva, Maria"}],
+        })
+        ActionsAPI(client, server.depositions_url).publish(draft["id"])
+
+        (tmp_path / "b.bin").write_bytes(b"changed")
+        (tmp_path / "extra.bin").write_bytes(b"sent once, then dropped")
+        first = publish_new_version(draft["id"], [str(tmp_path / n) for n in ("a.bin", "b.bin", "extra.bin")],
+                                    client=client, base_url=server.depositions_url, publish=False)
+        assert sorted(f["filename"] for f in files.list_files_of_deposition(first["draft"]["id"])) == \
+            ["a.bin", "b.bin", "extra.bin"]
+
+        second = publish_new_version(draft["id"], [str(tmp_path / n) for n in ("a.bin", "b.bin")],
+                                     client=client, base_url=server.depositions_url)
+
+    assert second["draft"]["id"] == first["draft"]["id"]
+    assert second["deleted"] == ["extra.bin"]
+    assert sorted(f["filename"] for f in second["record"]["files"]) == ["a.bin", "b.bin"]
+
+
+def test_harvest_resumes_and_fetches_only_new_records(tmp_path):
+    """An interrupted harvest continues at its token; the next run asks only for newer records."""
+    output = str(tmp_path / "acervo.jsonl.gz")
+
+    class Interrupted(Exception):
+        pass
+
+    def stop_after_first_page(page, state):
+        raise Interrupted()
+
+    with FakeZenodoServer(oai_records=250, oai_page_size=100) as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        api = OAIPMHAPI(client, server.oai_url)
+
+        with pytest.raises(Interrupted):
+            Harvest(output, api=api, on_page=stop_after_first_page).run()
+        assert Harvest(output, api=api).run()["records"] == 150
+
+        server.add_oai_records(5)
+        assert Harvest(output, api=api).run()["records"] == 5
+
+    with gzip.open(output, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len({r["identifier"] for r in records}) == len(records) == 255
+    assert sum(r["deleted"] for r in records) == 2
+    assert records[0]["metadata"]["creator"] == ["Silva, Maria", "Souza, João"]
+
+
+def test_harvest_runs_without_token_and_never_sends_it(tmp_path, monkeypatch):
+    """OAI-PMH is public: the harvest CLI needs no ZENODO_TOKEN and does not leak one that is set."""
+    import requests
+
+    from zenodo_client.core import client as client_module
+
+    monkeypatch.chdir(tmp_path)  # no .env here
+    session = requests.Session()
+    sent = []
+    session.hooks["response"].append(lambda r, *args, **kwargs: sent.append(r.request.headers.get("Authorization")))
+    monkeypatch.setattr(client_module, "get_session", lambda: session)
+
+    with FakeZenodoServer(oai_records=30, oai_page_size=10) as server:
+        monkeypatch.delenv("ZENODO_TOKEN", raising=False)
+        assert cli_main(["harvest", "--url", server.oai_url, "--output", str(tmp_path / "a.jsonl.gz")]) == 0
+        monkeypatch.setenv("ZENODO_TOKEN", "segredo")
+        assert cli_main(["harvest", "--url", server.oai_url, "--output", str(tmp_path / "b.jsonl.gz")]) == 0
+
+    assert len(sent) == 6 and not any(sent)
+    # Unreachable endpoint: an error message and exit code, not a traceback
+    assert cli_main(["harvest", "--url", "http://127.0.0.1:9/oai2d", "--output", str(tmp_path / "c.jsonl.gz")]) == 1
+
+
+def test_503_retry_after_is_honored(tmp_path):
+    """A maintenance 503 is retried no sooner than its Retry-After, without blocking other callers."""
+    with FakeZenodoServer(oai_records=3) as server:
+        limiter = RateLimiter(per_minute=6000, burst=100, base_backoff=0.001, max_backoff=0.001)
+        api = OAIPMHAPI(ZenodoClient(anonymous=True, rate_limiter=limiter), server.oai_url)
+        server.start_maintenance(1, retry_after=1)
+        started = time.monotonic()
+        assert api.identify()["repositoryName"]
+        assert time.monotonic() - started >= 1.0
+        assert server.stats()["errors"] == 1 and server.stats()["requests"] == 2
+    assert limiter.stats()["throttled"] == 0 and limiter.reserve() == 0.0
+
+
+def test_local_index_syncs_incrementally_and_searches(tmp_path):
+    """The first sync indexes everything; the next one fetches only what changed since."""
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100))
+        depositions = DepositionAPI(client, server.depositions_url)
+        for title, orcid in (("Solos da Amazônia", "0000-0002-1825-0097"), ("Clima urbano", None)):
+            draft = depositions.create_draft()
+            creator = {"name": "Silva, Maria", **({"orcid": orcid} if orcid else {})}
+            depositions.update_metadata(draft["id"], {"title": title, "upload_type": "dataset", "description": title,
+                                                      "creators": [creator], "keywords": ["ambiente"]})
+
+        index = DepositionIndex(str(tmp_path / "index.db"))
+        assert index.sync(depositions) == {"updated": 2, "removed": 0, "full": True}
+
+        requests_before = server.stats()["requests"]
+        draft = depositions.create_draft()
+        depositions.update_metadata(draft["id"], {"title": "Rios e chuvas", "upload_type": "dataset",
+                                                  "description": "Séries de vazão", "creators": [{"name": "Souza, João"}]})
+        result = index.sync(depositions)
+        assert result["full"] is False and 1 <= result["updated"] <= 2
+        assert server.stats()["requests"] - requests_before == 3
+
+    assert [r["title"] for r in index.search("amazonia")] == ["Solos da Amazônia"]
+    assert [r["title"] for r in index.search(creator="silva", without_orcid=True)] == ["Clima urbano"]
+    assert [r["title"] for r in index.search("vazão")] == ["Rios e chuvas"]
+    assert len(index.search(keyword="AMBIENTE")) == 2
+    assert index.get(draft["id"])["metadata"]["title"] == "Rios e chuvas"
+
+
+def test_cli_upload_and_list(tmp_path, monkeypatch, capsys):
+    """The unified CLI validates offline with --dry-run and runs the pipeline against the server."""
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 1000)
+    upload = ["upload", "--file", str(pdf), "--title", "CLI", "--creator", "Silva, Maria", "--type", "publication",
+              "--job-store", str(tmp_path / "jobs.db")]
+
+    monkeypatch.delenv("ZENODO_TOKEN", raising=False)
+    assert cli_main(upload + ["--dry-run"]) == 1  # publication_type missing; no token needed
+    assert cli_main(upload + ["--publication-type", "article", "--dry-run"]) == 0
+
+    with FakeZenodoServer() as server:
+        monkeypatch.setenv("ZENODO_TOKEN", "test")
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        assert cli_main(upload + ["--publication-type", "article"]) == 0
+        capsys.readouterr()
+        assert cli_main(["list", "--json"]) == 0
+
+    listed = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [d["metadata"]["title"] for d in listed] == ["CLI"]
+    assert pdf.exists()  # upload moves the file only with --archive
+
+
+def test_upload_to_a_missing_draft_fails_cleanly(tmp_path, monkeypatch, capsys):
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 1000)
+    with FakeZenodoServer() as server:
+        monkeypatch.setenv("ZENODO_TOKEN", "test")
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        assert cli_main(["upload", "--file", str(pdf), "--title", "CLI", "--creator", "Silva, Maria",
+                         "--type", "dataset", "--draft", "999999"]) == 1
+        assert server.stats()["depositions"] == 0
+    assert "!!! Erro HTTP ao buscar o rascunho 999999 (404)" in capsys.readouterr().out
+
+
+def test_dedup_claims_do_not_outlive_their_job(tmp_path, monkeypatch):
+    """A failed upload releases its claim; a claim left by a crashed run on a moved file is taken over."""
+    content = b"%PDF-1.4\n" + b"y" * 2000
+    metadata = {"title": "Dedup", "upload_type": "dataset", "description": "x", "creators": [{"name": "Silva, Maria"}]}
+    job_store, dedup_index, _ = pipeline.open_job_stores(str(tmp_path / "jobs.db"))
+    first, crashed, second, third = (tmp_path / name for name in ("a.pdf", "b.pdf", "c.pdf", "d.pdf"))
+    for path in (first, crashed, second, third):
+        path.write_bytes(content)
+    md5 = file_checksum(str(first))
+
+    with FakeZenodoServer() as server:
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+
+        with monkeypatch.context() as m:
+            m.setattr(pipeline, "upload_file", lambda deposition, path: None)
+            assert pipeline.process_file_for_upload(str(first), metadata, None, job_store, dedup_index) is None
+        assert dedup_index.lookup(md5) is None
+
+        # A run that died mid-upload: its claim stays, and blocks copies while its file is in place
+        assert dedup_index.claim(md5, job_store.key_for(str(crashed))) is None
+        assert pipeline.process_file_for_upload(str(second), metadata, None, job_store, dedup_index) is None
+        crashed.rename(tmp_path / "renomeado.pdf")
+        record = pipeline.process_file_for_upload(str(third), metadata, None, job_store, dedup_index)
+
+    assert record and not record.get("duplicate")
+    assert dedup_index.lookup(md5)["doi"] == record["doi"]
+
+
+def test_killed_run_resumes_the_same_draft(tmp_path, monkeypatch):
+    """A run killed after 'created' or 'uploaded' is continued by the next one, on the same draft."""
+    metadata = {"title": "Retomada", "upload_type": "dataset", "description": "x", "creators": [{"name": "Silva, Maria"}]}
+    job_store, dedup_index, _ = pipeline.open_job_stores(str(tmp_path / "jobs.db"))
+    after_created, after_uploaded = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    after_created.write_bytes(b"%PDF-1.4\n" + b"a" * 2000)
+    after_uploaded.write_bytes(b"%PDF-1.4\n" + b"b" * 2000)
+
+    def killed(*args):
+        raise KeyboardInterrupt  # The process dies here: no failure is recorded, nothing is cleaned up
+
+    with FakeZenodoServer() as server:
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        for path, step in ((after_created, "upload_file"), (after_uploaded, "add_metadata")):
+            with monkeypatch.context() as m, pytest.raises(KeyboardInterrupt):
+                m.setattr(pipeline, step, killed)
+                pipeline.process_file_for_upload(str(path), metadata, None, job_store, dedup_index)
+        stages = {p: job_store.get(job_store.key_for(str(p))) for p in (after_created, after_uploaded)}
+        assert [job["stage"] for job in stages.values()] == ["created", "uploaded"]
+
+        uploads = []
+        real_upload = pipeline.upload_file
+        monkeypatch.setattr(pipeline, "upload_file", lambda draft, path: uploads.append(path) or real_upload(draft, path))
+        records = {p: pipeline.process_file_for_upload(str(p), metadata, None, job_store, dedup_index) for p in stages}
+        assert server.stats()["depositions"] == 2  # No new draft for either file
+
+    assert uploads == [str(after_created)]  # The uploaded file is not sent again
+    for path, job in stages.items():
+        assert records[path]["id"] == job["deposition_id"] and records[path]["doi"]
+        assert job_store.get(job_store.key_for(str(path)))["stage"] == "published"
+
+
+def test_published_files_are_archived_in_shards_and_indexed(tmp_path, monkeypatch):
+    """After publishing, the file is renamed into a date shard and its name resolves to the DOI."""
+    queue, archive = tmp_path / "upload_queue", tmp_path / "uploaded_files"
+    queue.mkdir()
+    archive.mkdir()
+    (archive / "20240105-093000_antigo.pdf").write_bytes(b"%PDF-1.4 antigo")  # old flat layout
+    pdf = queue / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 1000)
+    inode = pdf.stat().st_ino
+    metadata = {"title": "Arquivo", "upload_type": "publication", "publication_type": "article",
+                "description": "x", "creators": [{"name": "Silva, Maria"}]}
+
+    with FakeZenodoServer() as server:
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        record = pipeline.process_file_for_upload(str(pdf), metadata, str(archive))
+
+    store = pipeline.get_archive(str(archive))
+    [entry] = store.lookup("artigo.pdf")
+    assert entry["doi"] == record["doi"]
+    assert not pdf.exists() and os.stat(entry["path"]).st_ino == inode  # renamed, not copied
+    assert os.path.dirname(os.path.relpath(entry["path"], archive)).count(os.sep) == 2  # YYYY/MM/DD
+
+    assert store.compact()["adopted"] == 1
+    assert os.path.relpath(store.lookup("antigo.pdf")[0]["path"], archive) == os.path.join("2024", "01", "05",
+                                                                                             "093000_antigo.pdf")
+
+
+def test_shared_metadata_json_outlives_the_first_upload(tmp_path, monkeypatch):
+    """Every file of the batch gets the legacy metadata.json; it is removed only once the queue is empty."""
+    queue, archive = tmp_path / "upload_queue", tmp_path / "uploaded_files"
+    queue.mkdir()
+    archive.mkdir()
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (queue / name).write_bytes(b"%PDF-1.4\n" + name.encode() * 1000)
+    legacy = queue / "metadata.json"
+    legacy.write_text(json.dumps({"title": "Legado", "upload_type": "dataset", "description": "x",
+                                  "creators": [{"name": "Silva, Maria"}]}))
+    job_store, dedup_index, _ = pipeline.open_job_stores(str(tmp_path / "jobs.db"))
+    generator = MetadataGenerator(command=[], max_workers=2)
+
+    # The other files only reach the metadata stage once a.pdf has been archived
+    archived = threading.Event()
+    real_archive, real_load = pipeline.archive_uploaded_file, generator.load
+    monkeypatch.setattr(pipeline, "archive_uploaded_file",
+                        lambda *args: real_archive(*args) or archived.set())
+    monkeypatch.setattr(generator, "load",
+                        lambda path: (path.endswith("a.pdf") or archived.wait(10)) and real_load(path))
+
+    with FakeZenodoServer() as server:
+        monkeypatch.setattr(pipeline, "_client",
+                            ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=6000, burst=100)))
+        monkeypatch.setattr(pipeline, "_depositions_url", server.depositions_url)
+        pipeline.process_upload_queue(str(queue), str(archive), job_store, dedup_index, generator, workers=2)
+        assert server.stats()["depositions"] == 3
+
+    assert generator.stats()["legacy"] == 3
+    assert not legacy.exists() and not list(queue.glob("*.pdf"))
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+import pytest
+import requests
+
+from zenodo_client.api.files import FilesAPI, IncompleteUploadError, upload_file_to_bucket
+from zenodo_client.core.client import ZenodoClient
+from zenodo_client.core.hashing import file_checksum
+from zenodo_client.core.ratelimit import RateLimiter
+
+
+class _BucketSession:
+    """
+    Stands in for the bucket: each PUT reads the whole body and answers with
+    the next status of the script (200 carries the MD5 of what was received).
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def request(self, method, url, headers=None, data=None, **kwargs):
+        self.calls.append((method, url, dict(headers or {})))
+        status = self.statuses.pop(0)
+        if status == "short":
+            # The connection closed after the first block, but the server still answered
+            received, status = bytes(next(iter(data))), 200
+        else:
+            received = b"".join(bytes(block) for block in data) if data is not None else b""
+        if isinstance(status, Exception):
+            raise status
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        if status == 200:
+            response._content = json.dumps({"checksum": f"md5:{hashlib.md5(received).hexdigest()}"}).encode()
+        else:
+            response._content = b'{"message": "erro"}'
+        return response
+
+
+def _files(session):
+    limiter = RateLimiter(per_minute=600000, burst=1000, base_backoff=0.001, max_backoff=0.001)
+    # No client-level retries: only the per-file policy of upload_files is exercised
+    return FilesAPI(ZenodoClient(session=session, token="test", rate_limiter=limiter, max_retries=0),
+                    "http://zenodo.test/api/deposit/depositions")
+
+
+def test_upload_files_retries_only_transient_errors(tmp_path):
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 5000 + b"\n%%EOF\n")
+    for statuses, expected_calls, ok in [
+        ([503, 429, 200], 3, True),
+        ([requests.exceptions.ConnectionError("reset"), 200], 2, True),
+        ([requests.exceptions.ReadTimeout("lento"), 200], 2, True),
+        ([403, 200], 1, False),  # A closed draft or bad token does not get better
+        ([400, 200], 1, False),
+        ([502, 502, 502, 502], 4, False),  # retries=3: four attempts in all
+    ]:
+        session = _BucketSession(statuses)
+        uploaded, failed = _files(session).upload_files(1, "http://zenodo.test/api/files/b", [str(pdf)], retries=3)
+        assert (len(session.calls), "artigo.pdf" in uploaded) == (expected_calls, ok), statuses
+        if ok:
+            assert uploaded["artigo.pdf"]["checksum"] == file_checksum(str(pdf))
+        else:
+            assert "artigo.pdf" in failed
+
+
+def test_upload_file_to_bucket_keeps_the_token_out_of_the_url(tmp_path):
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n%%EOF\n")
+    session = _BucketSession([200])
+    result = upload_file_to_bucket("http://zenodo.test/api/files/b", str(pdf), token="segredo", session=session)
+    assert result["digests"]["md5"] == file_checksum(str(pdf))
+    method, url, headers = session.calls[0]
+    assert (method, url) == ("PUT", "http://zenodo.test/api/files/b/artigo.pdf")
+    assert "segredo" not in url and headers["Authorization"] == "Bearer segredo"
+
+
+def test_single_file_upload_retries_a_truncated_body(tmp_path):
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"x" * 5000 + b"\n%%EOF\n")
+    session = _BucketSession(["short", 200])
+    result = _files(session).upload_file(1, "http://zenodo.test/api/files/b", str(pdf), block_size=1024)
+    assert len(session.calls) == 2 and result["digests"]["md5"] == file_checksum(str(pdf))
+
+    session = _BucketSession(["short", "short"])
+    with pytest.raises(IncompleteUploadError):
+        upload_file_to_bucket("http://zenodo.test/api/files/b", str(pdf), token="test", session=session, retries=1,
+                              block_size=1024)
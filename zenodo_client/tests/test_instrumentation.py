@@ -0,0 +1,103 @@
+import pytest
+
+from zenodo_client.api.deposition import DepositionAPI
+from zenodo_client.api.files import FilesAPI
+from zenodo_client.core import instrumentation
+from zenodo_client.core.client import ZenodoClient
+from zenodo_client.core.instrumentation import Instrumentation, PrometheusExporter
+from zenodo_client.core.ratelimit import RateLimiter
+from zenodo_client.tests.fake_zenodo import FakeZenodoServer
+
+
+class _Collector:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def named(self, name):
+        return [s for s in self.spans if s["name"] == name]
+
+
+@pytest.fixture
+def collector():
+    exporter = instrumentation.add_exporter(_Collector())
+    yield exporter
+    instrumentation.remove_exporter(exporter)
+
+
+def test_child_counters_roll_up_into_their_parent():
+    registry = Instrumentation()
+    spans = registry.add_exporter(_Collector())
+    with registry.span("pipeline.upload", file="a.pdf") as stage:
+        for sent, retries in ((1000, 0), (500, 2)):
+            with registry.span("http.PUT") as request:
+                request.add("bytes_sent", sent)
+                request.set(retries=retries, status_code=200)
+        with registry.span("local.hash") as other:
+            other.set(algorithm="md5")  # Not a rolled-up field
+    with registry.span("pipeline.publish"):
+        pass
+
+    assert stage.attributes == {"file": "a.pdf", "bytes_sent": 1500, "retries": 2}
+    [put_1, put_2, hashed, upload, publish] = spans.spans
+    assert put_1["parent_id"] == put_2["parent_id"] == hashed["parent_id"] == upload["span_id"]
+    assert put_1["trace_id"] == upload["trace_id"] != publish["trace_id"]
+    assert publish["parent_id"] is None
+
+
+def test_prometheus_rendering():
+    registry = Instrumentation()
+    metrics = registry.add_exporter(PrometheusExporter(buckets=(0.5, 1)))
+    with registry.span("http.GET") as request:
+        request.set(status_code=200, rate_limit_wait=0.25)
+    with pytest.raises(RuntimeError):
+        with registry.span("pipeline.publish"):
+            raise RuntimeError("recusado")
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE zenodo_span_duration_seconds histogram" in lines
+    assert 'zenodo_span_duration_seconds_bucket{span="http.GET",outcome="200",le="0.5"} 1' in lines
+    assert 'zenodo_span_duration_seconds_bucket{span="http.GET",outcome="200",le="+Inf"} 1' in lines
+    assert 'zenodo_span_duration_seconds_count{span="pipeline.publish",outcome="error"} 1' in lines
+    assert 'zenodo_span_rate_limit_wait_seconds_total{span="http.GET"} 0.25' in lines
+    assert "# TYPE zenodo_span_bytes_sent_total counter" in lines
+    assert not any(line.startswith("zenodo_span_bytes_sent_total{") for line in lines)
+
+
+def test_spans_are_shared_no_ops_while_nothing_listens():
+    registry = Instrumentation()
+    assert not registry.enabled
+    with registry.span("a", file="x") as first:
+        first.add("bytes_sent", 10)
+        first.set(ok=False)
+        assert registry.current() is None
+    assert registry.span("b") is first
+
+    exporter = registry.add_exporter(_Collector())
+    with registry.span("c"):
+        pass
+    registry.remove_exporter(exporter)
+    assert registry.span("d") is first
+    assert [s["name"] for s in exporter.spans] == ["c"]
+
+
+def test_upload_worker_threads_keep_the_callers_span(tmp_path, collector):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"parte{i}.bin"
+        path.write_bytes(bytes([i]) * (10000 + i))
+        paths.append(str(path))
+
+    with FakeZenodoServer() as server:
+        client = ZenodoClient(token="test", rate_limiter=RateLimiter(per_minute=60000, burst=100))
+        draft = DepositionAPI(client, server.depositions_url).create_draft()
+        with instrumentation.span("pipeline.upload") as stage:
+            uploaded, failed = FilesAPI(client, server.depositions_url).upload_files(
+                draft["id"], draft["links"]["bucket"], paths, max_in_flight=4)
+
+    assert len(uploaded) == 4 and not failed
+    puts = collector.named("http.PUT")
+    assert len(puts) == 4 and {s["parent_id"] for s in puts} == {stage.span_id}
+    assert stage.attributes["bytes_sent"] == sum(10000 + i for i in range(4))
@@ -0,0 +1,106 @@
+import json
+import threading
+
+import pytest
+
+from zenodo_client.jobs.manifest import BulkIngest, Checkpoint
+
+METADATA = {"upload_type": "publication", "publication_type": "article",
+            "description": "Resumo", "creators": [{"name": "Silva, Maria"}]}
+
+
+def _manifest(tmp_path, fmt, count):
+    for i in range(1, count + 1):
+        (tmp_path / f"{i:02d}.pdf").write_bytes(b"%PDF-1.4\n%%EOF\n")
+    path = tmp_path / f"acervo.{fmt}"
+    if fmt == "csv":
+        lines = ["file,title,upload_type,publication_type,description,creators"]
+        lines += [f'{i:02d}.pdf,"Artigo, parte {i}",publication,article,Resumo,"Silva, Maria"' for i in range(1, count + 1)]
+    else:
+        lines = [json.dumps({"file": f"{i:02d}.pdf", "metadata": {**METADATA, "title": f"Artigo, parte {i}"}}) for i in range(1, count + 1)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _rows(results_path):
+    with open(results_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_interrupted_run_resumes_and_retries_failed_rows(tmp_path, fmt):
+    manifest = _manifest(tmp_path, fmt, 10)
+    results = str(tmp_path / "resultados.jsonl")
+    published = []
+    flaky = {"03.pdf", "08.pdf"}
+
+    def worker(file_path, metadata):
+        name = file_path[-6:]
+        if name in flaky:
+            return None  # a transient upload error
+        published.append(name)
+        return {"id": len(published), "doi": f"10.5281/zenodo.{len(published)}"}
+
+    five_done = threading.Event()
+
+    def stop_at_row_6(metadata):
+        if metadata["title"].endswith("6"):
+            five_done.wait(5)  # Ctrl+C once rows 1-5 are recorded
+            raise KeyboardInterrupt
+        return []
+
+    def on_result(result):
+        if result["row"] == 5:
+            five_done.set()
+
+    with pytest.raises(KeyboardInterrupt):
+        BulkIngest(manifest, worker, results, max_workers=1, validator=stop_at_row_6, on_result=on_result).run()
+    assert sorted(published) == ["01.pdf", "02.pdf", "04.pdf", "05.pdf"]
+
+    # The failed row 3 is retried first; the run then continues at row 6
+    flaky.discard("03.pdf")
+    counts = BulkIngest(manifest, worker, results, max_workers=1).run()
+    assert counts == {"published": 5, "failed": 1}
+    assert published[4] == "03.pdf"
+    assert len(published) == len(set(published)) == 9
+
+    flaky.clear()
+    assert BulkIngest(manifest, worker, results).run() == {"published": 1}
+    assert BulkIngest(manifest, worker, results).run() == {}
+    assert sorted(published) == [f"{i:02d}.pdf" for i in range(1, 11)]
+    latest = {r["row"]: r["status"] for r in _rows(results)}
+    assert latest == {row: "published" for row in range(1, 11)}
+
+    # --restart starts the results over instead of appending to them
+    BulkIngest(manifest, worker, results).run(restart=True)
+    assert sorted(r["row"] for r in _rows(results)) == list(range(1, 11))
+
+
+def test_checkpoint_is_saved_in_batches_and_failures_only_appended(tmp_path, monkeypatch):
+    manifest = _manifest(tmp_path, "jsonl", 10)
+    results = str(tmp_path / "resultados.jsonl")
+    saves = []
+    original_save = Checkpoint.save
+
+    def counting_save(self, *args):
+        saves.append(args[2])  # the watermark row
+        original_save(self, *args)
+
+    monkeypatch.setattr(Checkpoint, "save", counting_save)
+
+    def worker(file_path, metadata):
+        return None if file_path.endswith(("02.pdf", "07.pdf")) else {"id": 1, "doi": "10.5281/zenodo.1"}
+
+    ingest = BulkIngest(manifest, worker, results, max_workers=1, checkpoint_every=4, checkpoint_interval=3600)
+    assert ingest.run() == {"published": 8, "failed": 2}
+    assert saves == [4, 8, 10]  # every 4 rows, then once on the way out
+
+    state = json.loads(open(results + ".checkpoint").read())
+    assert "failed" not in state
+    log = [json.loads(line) for line in open(results + ".checkpoint.failed")]
+    assert [entry["row"] for entry in log] == [2, 7]
+
+    # The retry that succeeds appends a line instead of rewriting the log
+    assert BulkIngest(manifest, lambda f, m: {"id": 1, "doi": "x"}, results).run() == {"published": 2}
+    assert [line.strip() for line in open(results + ".checkpoint.failed")][-1] == '{"row": 7, "offset": null}'
+    assert BulkIngest(manifest, worker, results).run() == {}
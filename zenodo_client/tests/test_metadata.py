@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+
+import pytest
+
+from zenodo_client.jobs.metadata import MetadataCache, MetadataError, MetadataGenerator, sidecar_path
+
+# Stand-in for the fabric pattern: prints the metadata inside a Markdown fence
+# and counts its runs in calls.log next to the file
+GENERATOR = """
+import json, os, sys
+path = sys.argv[1]
+with open(os.path.join(os.path.dirname(path), "calls.log"), "a") as f:
+    f.write(path + "\\n")
+print("```json")
+print(json.dumps({"metadata": {"title": "Gerado de " + os.path.basename(path)}}))
+print("```")
+"""
+
+
+def _runs(folder):
+    log = folder / "calls.log"
+    return log.read_text().splitlines() if log.exists() else []
+
+
+@pytest.fixture
+def generator_command(tmp_path):
+    script = tmp_path / "gerar.py"
+    script.write_text(GENERATOR)
+    return [sys.executable, str(script), "{file}"]
+
+
+def _generator(tmp_path, command, cache=True):
+    cache = MetadataCache(str(tmp_path / "cache.db")) if cache else None
+    return MetadataGenerator(command=command, cache=cache, max_workers=2, timeout=30)
+
+
+def test_sources_are_tried_in_order(tmp_path, generator_command):
+    queue = tmp_path / "fila"
+    queue.mkdir()
+    (queue / "metadata.json").write_text(json.dumps({"title": "Legado"}))
+    pdf = queue / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4 artigo")
+
+    # No generator configured: the shared legacy file, snapshotted into the sidecar
+    legacy_only = _generator(tmp_path, [], cache=False)
+    assert legacy_only.load(str(pdf)) == {"title": "Legado"}
+    assert json.loads(open(sidecar_path(str(pdf))).read()) == {"title": "Legado"}
+    # The sidecar now wins over everything else
+    os.remove(queue / "metadata.json")
+    assert legacy_only.load(str(pdf)) == {"title": "Legado"}
+    assert legacy_only.stats()["legacy"] == 1 and legacy_only.stats()["sidecar_hits"] == 1
+
+    # With a command, a file without a sidecar runs it, even with metadata.json present
+    (queue / "metadata.json").write_text(json.dumps({"title": "Legado"}))
+    other = queue / "outro.pdf"
+    other.write_bytes(b"%PDF-1.4 outro")
+    generator = _generator(tmp_path, generator_command)
+    assert generator.load(str(other)) == {"title": "Gerado de outro.pdf"}
+    assert generator.load(str(pdf)) == {"title": "Legado"}  # its sidecar, not the command
+    assert _runs(queue) == [str(other)]
+    assert generator.stats() == {"sidecar_hits": 1, "cache_hits": 0, "generated": 1, "legacy": 0, "failures": 0}
+
+
+def test_same_content_hits_the_cache_instead_of_running_the_command(tmp_path, generator_command):
+    first, copy, changed = (tmp_path / name for name in ("a.pdf", "copia.pdf", "mudou.pdf"))
+    first.write_bytes(b"%PDF-1.4 mesmo conteudo")
+    copy.write_bytes(b"%PDF-1.4 mesmo conteudo")
+    changed.write_bytes(b"%PDF-1.4 outro conteudo")
+    generator = _generator(tmp_path, generator_command)
+
+    assert generator.load(str(first)) == {"title": "Gerado de a.pdf"}
+    # Same bytes under another name: the cached result, written to its own sidecar
+    assert generator.submit(str(copy)).result() == {"title": "Gerado de a.pdf"}
+    assert os.path.exists(sidecar_path(str(copy)))
+    generator.load(str(changed))
+    assert _runs(tmp_path) == [str(first), str(changed)]
+    assert generator.stats()["cache_hits"] == 1 and generator.stats()["generated"] == 2
+
+    # A different command is a different cache entry
+    os.remove(sidecar_path(str(copy)))
+    _generator(tmp_path, generator_command + ["--extra"]).load(str(copy))
+    assert len(_runs(tmp_path)) == 3
+    generator.shutdown()
+
+
+def test_failing_command_raises_and_writes_no_sidecar(tmp_path):
+    pdf = tmp_path / "artigo.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    for command, message in [
+        ([sys.executable, "-c", "import sys; sys.stderr.write('modelo fora do ar'); sys.exit(3)"],
+         "exited with status 3: modelo fora do ar"),
+        ([sys.executable, "-c", "print('sem json aqui')"], "contains no JSON object"),
+        ([sys.executable, "-c", "print('{\"title\": }')"], "not valid JSON"),
+        ([str(tmp_path / "nao-existe")], "command not found"),
+    ]:
+        generator = _generator(tmp_path, command)
+        future = generator.submit(str(pdf))
+        with pytest.raises(MetadataError, match=message):
+            future.result()
+        assert not os.path.exists(sidecar_path(str(pdf)))
+        assert generator.stats()["failures"] == 1
+        generator.shutdown()
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import requests
+
+from zenodo_client.core.utils import iter_paginated
+
+URL = "http://zenodo.test/api/deposit/depositions"
+
+
+class _PagedClient:
+    """
+    Serves ``items`` in pages of ``size``, by the ``page`` parameter or by
+    ``Link: rel="next"`` headers (``links=True``); records every request.
+    """
+
+    def __init__(self, items, size, links=False, gate=None):
+        self.items = list(items)
+        self.size = size
+        self.links = links
+        self.gate = gate  # When set, pages after the first wait for it
+        self.calls = []
+
+    def request(self, method, url, params=None):
+        page = int(params["page"]) if params else int(url.rsplit("page=", 1)[1])
+        self.calls.append(page)
+        if page > 1 and self.gate is not None:
+            self.gate.wait(5)
+        start = (page - 1) * self.size
+        response = requests.Response()
+        response.status_code = 200
+        response._content = repr(self.items[start:start + self.size]).encode()
+        response.request = requests.Request(method, url, params=params).prepare()
+        response.url = response.request.url
+        if self.links and start + self.size < len(self.items):
+            response.headers["Link"] = f'<{URL}?sort=mostrecent&page={page + 1}>; rel="next"'
+        return response
+
+
+def _prefetch_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("zenodo-prefetch")]
+
+
+def test_link_header_is_followed_before_the_page_number():
+    client = _PagedClient(range(7), size=3, links=True)
+    # A page size the server ignores: only its links say where the next page is
+    assert list(iter_paginated(client, URL, page_size=100)) == list(range(7))
+    assert client.calls == [1, 2, 3]
+
+
+def test_page_number_fallback_stops_at_a_short_page():
+    for count, pages in [(5, [1, 2, 3]), (4, [1, 2, 3]), (0, [1])]:
+        for prefetch in (True, False):
+            client = _PagedClient(range(count), size=2)
+            assert list(iter_paginated(client, URL, page_size=2, prefetch=prefetch)) == list(range(count))
+            assert client.calls == pages, (count, prefetch)
+
+
+def test_max_items_does_not_prefetch_pages_it_will_not_use():
+    for max_items, pages in [(2, [1]), (3, [1, 2]), (4, [1, 2]), (50, [1, 2, 3, 4, 5, 6])]:
+        client = _PagedClient(range(11), size=2)
+        assert list(iter_paginated(client, URL, page_size=2, max_items=max_items)) == list(range(min(max_items, 11)))
+        time.sleep(0.02)  # A stray prefetch would show up here
+        assert client.calls == pages, max_items
+
+
+def test_breaking_early_stops_the_prefetch_thread():
+    gate = threading.Event()
+    client = _PagedClient(range(10), size=2, gate=gate)
+    pages = iter_paginated(client, URL, page_size=2)
+    assert next(pages) == 0
+    deadline = time.monotonic() + 2
+    while client.calls != [1, 2] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.calls == [1, 2]  # Page 2 is being fetched in the background
+
+    pages.close()  # What a `break` out of the for loop does
+    gate.set()
+    deadline = time.monotonic() + 2
+    while _prefetch_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _prefetch_threads() == []
+    assert client.calls == [1, 2]  # Nothing requested after the caller left
@@ -0,0 +1,90 @@
+from datetime import date
+
+import pytest
+
+from zenodo_client.core.validation import MetadataValidationError, ensure_valid, validate_metadata
+
+TODAY = date(2024, 6, 1)
+VALID = {"title": "Artigo", "description": "Resumo", "upload_type": "dataset",
+         "creators": [{"name": "Silva, Maria"}]}
+
+
+def _errors(**fields):
+    return validate_metadata({**VALID, **fields}, today=TODAY)
+
+
+def test_valid_record_has_no_errors():
+    assert validate_metadata(VALID, today=TODAY) == []
+    assert ensure_valid(VALID, today=TODAY) is VALID
+
+
+@pytest.mark.parametrize("orcid, ok", [
+    ("0000-0002-1825-0097", True),
+    ("0000-0002-1694-233X", True),   # check digit 10 is written as X
+    ("0000-0002-1825-0098", False),  # wrong check digit
+    ("0000-0002-1694-2330", False),
+    ("0000-0002-1825-009", False),   # too short
+    ("https://orcid.org/0000-0002-1825-0097", False),  # a URL, not the bare identifier
+    (18250097, False),
+])
+def test_orcid_checksum(orcid, ok):
+    errors = _errors(creators=[{"name": "Silva, Maria", "orcid": orcid}])
+    assert errors == ([] if ok else [f"creators[0].orcid: ORCID inválido: {orcid!r}"])
+
+
+@pytest.mark.parametrize("fields, expected", [
+    ({"access_right": "embargoed", "embargo_date": "2024-06-02"}, []),
+    ({"access_right": "embargoed", "embargo_date": "2024-06-01"},
+     ["embargo_date: deve ser uma data futura (recebido 2024-06-01)"]),
+    ({"access_right": "embargoed", "embargo_date": "2023-12-31"},
+     ["embargo_date: deve ser uma data futura (recebido 2023-12-31)"]),
+    ({"access_right": "embargoed"}, ["embargo_date: obrigatório para acesso embargoed (AAAA-MM-DD)"]),
+    ({"access_right": "embargoed", "embargo_date": "02/06/2024"},
+     ["embargo_date: obrigatório para acesso embargoed (AAAA-MM-DD)"]),
+    ({"embargo_date": "2020-01-01"}, []),  # Ignored by the API when the record is open
+    ({"embargo_date": "amanhã"}, ["embargo_date: data inválida 'amanhã' (AAAA-MM-DD)"]),
+])
+def test_embargo_date(fields, expected):
+    assert _errors(**fields) == expected
+
+
+@pytest.mark.parametrize("related, expected", [
+    ([{"identifier": "10.5281/zenodo.1", "relation": "isSupplementTo"}], []),
+    ([{"identifier": "10.5281/zenodo.1", "relation": "isNewVersionOf"},
+      {"identifier": "https://exemplo.org", "relation": "references"}], []),
+    ([{"identifier": "10.5281/zenodo.1", "relation": "supplements"}],
+     ["related_identifiers[0].relation: relação inválida 'supplements'"]),
+    ([{"identifier": "10.5281/zenodo.1", "relation": "issupplementto"}],  # case matters
+     ["related_identifiers[0].relation: relação inválida 'issupplementto'"]),
+    ([{"relation": "cites"}], ["related_identifiers[0].identifier: obrigatório"]),
+    (["10.5281/zenodo.1"], ["related_identifiers[0]: deve ser um objeto com 'identifier' e 'relation'"]),
+    ({"identifier": "10.5281/zenodo.1", "relation": "cites"}, ["related_identifiers: deve ser uma lista"]),
+])
+def test_relations(related, expected):
+    assert _errors(related_identifiers=related) == expected
+
+
+@pytest.mark.parametrize("fields, error", [
+    ({"upload_type": "publication", "publication_type": "article"}, None),
+    ({"upload_type": "publication"}, "publication_type: obrigatório para publication"),
+    ({"upload_type": "publication", "publication_type": "paper"}, "publication_type: obrigatório para publication"),
+    ({"upload_type": "dataset", "publication_type": "paper"}, None),  # Only required for publications
+    ({"upload_type": "image"}, "image_type: obrigatório para image"),
+    ({"upload_type": "artigo"}, "upload_type: obrigatório"),
+])
+def test_publication_type_required_for_publications(fields, error):
+    errors = _errors(**fields)
+    if error is None:
+        assert errors == []
+    else:
+        assert len(errors) == 1 and errors[0].startswith(error)
+
+
+def test_every_problem_is_reported_at_once():
+    metadata = {"title": "", "upload_type": "publication", "creators": [{"orcid": "0000-0002-1825-0098"}],
+                "autor": "x"}
+    with pytest.raises(MetadataValidationError) as e:
+        ensure_valid(metadata, today=TODAY)
+    assert [error.split(":")[0] for error in e.value.errors] == [
+        "campos desconhecidos", "title", "description", "publication_type", "creators[0].name",
+        "creators[0].orcid"]
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from zenodo_client.jobs import watcher as watcher_module
+from zenodo_client.jobs.watcher import QueueWatcher
+
+PDF = b"%PDF-1.4\n" + b"x" * 1000 + b"\n%%EOF\n"
+
+
+class _Recorder:
+    """on_ready callback recording (path, time) of each dispatch; returns ``accept``."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.calls = []
+        self.event = threading.Event()
+
+    def __call__(self, path):
+        self.calls.append((path, time.monotonic()))
+        self.event.set()
+        return self.accept
+
+    def wait(self, count, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while len(self.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.calls) >= count
+
+
+def _run(watcher):
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _stop(watcher, thread):
+    watcher.stop()
+    thread.join(timeout=5)
+
+
+def test_file_is_dispatched_only_after_it_settles(tmp_path):
+    recorder = _Recorder()
+    watcher = QueueWatcher(str(tmp_path), recorder, settle_time=0.3, poll_interval=0.05, use_events=False)
+    pdf = tmp_path / "artigo.pdf"
+    with open(pdf, "wb") as f:
+        f.write(PDF[:500])
+        thread = _run(watcher)
+        for _ in range(4):  # Still growing: the settle clock restarts each time
+            time.sleep(0.1)
+            f.write(b"y" * 100)
+            f.flush()
+        f.write(PDF[500:])
+    last_write = time.monotonic()
+    try:
+        assert recorder.wait(1)
+        assert recorder.calls[0][1] - last_write >= 0.25
+        time.sleep(0.2)
+        assert len(recorder.calls) == 1  # Not dispatched again while it stays in the queue
+    finally:
+        _stop(watcher, thread)
+
+
+def test_truncated_pdf_waits_for_its_trailer(tmp_path):
+    recorder = _Recorder()
+    watcher = QueueWatcher(str(tmp_path), recorder, settle_time=0.05, poll_interval=0.05, use_events=False)
+    pdf = tmp_path / "parcial.pdf"
+    pdf.write_bytes(PDF[:-7])  # A stalled copy: no %%EOF yet
+    (tmp_path / "notas.txt").write_bytes(b"ignored: not a queued extension")
+    thread = _run(watcher)
+    try:
+        time.sleep(0.4)
+        assert recorder.calls == []
+        with open(pdf, "ab") as f:
+            f.write(PDF[-7:])
+        assert recorder.wait(1)
+        assert recorder.calls[0][0] == str(pdf)
+    finally:
+        _stop(watcher, thread)
+
+
+def test_polling_picks_up_new_files_and_retries_failures_after_the_delay(tmp_path):
+    recorder = _Recorder(accept=False)  # e.g. metadata not generated yet
+    watcher = QueueWatcher(str(tmp_path), recorder, settle_time=0.05, poll_interval=0.05,
+                           retry_interval=0.5, use_events=False)
+    assert watcher.mode == "polling"
+    thread = _run(watcher)
+    try:
+        time.sleep(0.1)
+        (tmp_path / "novo.pdf").write_bytes(PDF)
+        assert recorder.wait(1)
+        recorder.accept = True
+        assert recorder.wait(2)
+        # The scans in between did not queue it again before retry_interval
+        assert recorder.calls[1][1] - recorder.calls[0][1] >= 0.45
+        time.sleep(0.3)
+        assert len(recorder.calls) == 2
+    finally:
+        _stop(watcher, thread)
+
+
+@pytest.mark.skipif(watcher_module.Observer is None, reason="watchdog is not installed")
+def test_failed_upload_is_queued_again_by_a_later_event(tmp_path):
+    """A file whose upload failed after on_ready accepted it must not be stuck as dispatched."""
+    recorder = _Recorder()
+    watcher = QueueWatcher(str(tmp_path), recorder, settle_time=0.05, retry_interval=60)
+    assert watcher.mode == "events"
+    watcher.start()
+    thread = _run(watcher)
+    pdf = tmp_path / "artigo.pdf"
+    try:
+        pdf.write_bytes(PDF)
+        assert recorder.wait(1)
+        watcher.retry_later(str(pdf))  # What the upload pool does when the upload fails
+        pdf.write_bytes(PDF + b"% fixed\n%%EOF\n")
+        assert recorder.wait(2)
+        assert recorder.calls[1][0] == str(pdf)
+    finally:
+        _stop(watcher, thread)
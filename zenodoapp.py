@@ -1,201 +1,25 @@
-import requests
-import json
-import os
+"""
+Script de linha de comando original (modos interativo, CLI, --monitor, --bulk
+e --new-version). O pipeline fica em zenodo_client.jobs.pipeline; importar
+este módulo não lê o .env nem exige o token. Para execuções curtas (cron,
+contêineres) prefira ``python -m zenodo_client``, que carrega só o necessário.
+"""
 import argparse
-import shutil
-from datetime import datetime
-import time
-import dotenv  # Added for .env support
-
-# --- Load environment variables ---
-dotenv.load_dotenv()  # Load .env file if exists
-
-# --- CONFIGURAÇÃO ---
-# Pasta para mover os arquivos após o upload bem-sucedido.
-ARCHIVE_FOLDER = "uploaded_files"  # Caminho relativo ao diretório do script
-
-# Get access token from environment
-ACCESS_TOKEN = os.getenv("ZENODO_TOKEN")
-if not ACCESS_TOKEN:
-    raise EnvironmentError("ZENODO_TOKEN não encontrado. Crie um arquivo .env com ZENODO_TOKEN=seu_token")
-
-# Configure API URL - use sandbox as default
-ZENODO_API_URL = os.getenv("ZENODO_API_URL", "https://zenodo.org/api/deposit/depositions")
-
-print(f"Usando URL da API: {ZENODO_API_URL}")
-print(f"Token {'encontrado' if ACCESS_TOKEN else 'NÃO encontrado'}")
-
-# Headers for API requests
-HEADERS = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {ACCESS_TOKEN}"
-}
-
-# Tipos de submissão permitidos pela API do Zenodo
-UPLOAD_TYPES = [
-    'publication', 'poster', 'presentation', 'dataset', 'image',
-    'video', 'software', 'lesson', 'physicalobject', 'other'
-]
-
-# --- FUNÇÕES DA API ---
-
-def create_new_deposition():
-    """Passo 1: Cria um novo rascunho (deposition) no Zenodo."""
-    print(" PASSO 1: Criando novo rascunho no Zenodo...")
-    try:
-        response = requests.post(ZENODO_API_URL, headers=HEADERS, json={})
-        response.raise_for_status()
-        deposition_data = response.json()
-        print(f"-> Sucesso! Rascunho criado com ID: {deposition_data['id']}")
-        return deposition_data
-    except requests.exceptions.HTTPError as err:
-        print(f"!!! Erro HTTP ao criar rascunho ({err.response.status_code}): {err.response.text}")
-        return None
-    except json.JSONDecodeError:
-        print("!!! Erro: Resposta inválida da API")
-        return None
-
-def upload_file(deposition_data, file_path):
-    """Passo 2: Faz o upload de um arquivo para o 'bucket' do rascunho."""
-    print(f"\n PASSO 2: Fazendo upload do arquivo '{os.path.basename(file_path)}'...")
-    if not os.path.exists(file_path):
-        print(f"!!! Erro: O arquivo '{file_path}' não foi encontrado.")
-        return False
-        
-    bucket_url = deposition_data['links']['bucket']
-    file_name = os.path.basename(file_path)
-    
-    try:
-        with open(file_path, "rb") as fp:
-            # Use bucket URL directly with auth token in headers
-            response = requests.put(
-                f"{bucket_url}/{file_name}", 
-                data=fp,
-                headers={"Authorization": f"Bearer {ACCESS_TOKEN}"}
-            )
-            response.raise_for_status()
-        print("-> Sucesso! Upload do arquivo concluído.")
-        return True
-    except requests.exceptions.HTTPError as err:
-        print(f"!!! Erro HTTP no upload do arquivo ({err.response.status_code}): {err.response.text}")
-        return False
-    except Exception as e:
-        print(f"!!! Erro inesperado no upload: {str(e)}")
-        return False
-
-def add_metadata(deposition_data, metadata):
-    """Passo 3: Adiciona os metadados ao rascunho."""
-    print("\n PASSO 3: Adicionando metadados...")
-    url = f"{ZENODO_API_URL}/{deposition_data['id']}"
-    try:
-        response = requests.put(
-            url, 
-            data=json.dumps({'metadata': metadata}), 
-            headers=HEADERS
-        )
-        response.raise_for_status()
-        print("-> Sucesso! Metadados adicionados.")
-        return True
-    except requests.exceptions.HTTPError as err:
-        print(f"!!! Erro HTTP ao adicionar metadados ({err.response.status_code}): {err.response.text}")
-        return False
-    except Exception as e:
-        print(f"!!! Erro inesperado ao adicionar metadados: {str(e)}")
-        return False
-
-def publish_deposition(deposition_data):
-    """Passo 4: Publica o rascunho, tornando-o um registro permanente com DOI."""
-    print("\n PASSO 4: Publicando o registro...")
-    publish_url = deposition_data['links']['publish']
-    try:
-        response = requests.post(publish_url, headers=HEADERS)
-        response.raise_for_status()
-        published_record = response.json()
-        print("-" * 50)
-        print(" SUCESSO! Registro publicado.")
-        print(f" DOI: {published_record.get('doi', 'DOI não disponível')}")
-        print(f" Link: {published_record['links']['latest_html']}")
-        print("-" * 50)
-        return published_record
-    except requests.exceptions.HTTPError as err:
-        print(f"!!! Erro HTTP ao publicar ({err.response.status_code}): {err.response.text}")
-        return None
-    except json.JSONDecodeError:
-        print("!!! Erro: Resposta inválida da API após publicação")
-        return None
-
-# --- FUNÇÕES DE PROCESSAMENTO ---
-
-def process_file_for_upload(file_path, metadata, archive_folder_path):
-    """
-    Orquestra o processo de upload de um único arquivo para o Zenodo,
-    incluindo a movimentação para o arquivo após o sucesso.
-    """
-    print("\n--- INICIANDO PROCESSO DE UPLOAD ---")
-    print(f"Arquivo: {file_path}")
-    print(f"Metadados: {json.dumps(metadata, indent=2, ensure_ascii=False)}")
-
-    # Executa a sequência de passos da API
-    rascunho = create_new_deposition()
-    if rascunho:
-        if upload_file(rascunho, file_path):
-            if add_metadata(rascunho, metadata):
-                print("\nO rascunho foi criado e os dados enviados com sucesso.")
-                # No fluxo atual, publicamos imediatamente a primeira versão
-                published_record = publish_deposition(rascunho)
-                if published_record:
-                    doi = published_record.get('doi')
-                    if doi:
-                        print(f"DOI obtido: {doi}")
-
-                        # --- Lógica de Modificação do Arquivo Local e Versionamento ---
-                        print(f"\n--- Próximos Passos (Ainda Não Implementados) ---")
-                        print(f"1. Tentar incluir o DOI ({doi}) no arquivo local original: {file_path}")
-                        print("   !!! NOTA: A modificação automática de PDF é complexa e requer bibliotecas adicionais.")
-                        print("   !!! Alternativas: renomear o arquivo local, criar um arquivo .txt com o DOI, ou atualizar a fonte do documento.")
-                        print(f"2. Se a modificação for bem-sucedida, criar uma NOVA VERSÃO do depósito ID {rascunho['id']} via API.")
-                        print("3. Uploadar o arquivo LOCAL MODIFICADO (com DOI) para esta nova versão.")
-                        print("4. Publicar a NOVA VERSÃO.")
-                        print("--------------------------------------------------")
-                        # --- Fim Lógica de Modificação/Versionamento ---
-
-
-                    # --- Mover e Renomear o arquivo processado para o arquivo ---
-                    try:
-                        # Verifique se o arquivo original ainda existe antes de mover
-                        if os.path.exists(file_path):
-                            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-                            original_filename = os.path.basename(file_path)
-                            new_filename = f"{timestamp}_{original_filename}"
-                            destination_path = os.path.join(archive_folder_path, new_filename)
-
-                            print(f"\nMovendo arquivo para arquivo: {original_filename} -> {destination_path}")
-                            shutil.move(file_path, destination_path)
-                            print("-> Arquivo movido com sucesso.")
-
-                            # Opcional: Remover o arquivo metadata.json associado na pasta de origem
-                            # Supondo que o metadata.json está na mesma pasta do arquivo original
-                            metadata_file_path = os.path.join(os.path.dirname(file_path), "metadata.json")
-                            if os.path.exists(metadata_file_path):
-                                 print(f"Removendo arquivo de metadados: {metadata_file_path}")
-                                 os.remove(metadata_file_path)
-                        else:
-                            print(f"!!! Aviso: Arquivo original não encontrado para mover para o arquivo: {file_path}")
-
-
-                    except Exception as e:
-                        print(f"!!! Erro ao mover o arquivo para o arquivo: {e}")
-
-
-                else:
-                    print("Falha ao publicar o registro.")
-
-            else:
-                print("Falha ao adicionar metadados.")
-        else:
-            print("Falha no upload do arquivo.")
-    else:
-        print("Falha ao criar novo rascunho.")
+import logging
+import os
+
+from zenodo_client.config.settings import (ARCHIVE_FOLDER, HTTP_POOL_SIZE, JOB_STORE_FILE, UPLOAD_QUEUE_FOLDER,
+                                           get_access_token, get_depositions_url)
+from zenodo_client.core import instrumentation
+from zenodo_client.core.session import configure_session
+from zenodo_client.core.utils import collect_files
+from zenodo_client.core.validation import IMAGE_TYPES, PUBLICATION_TYPES, UPLOAD_TYPES
+# Reexportadas para quem importava as funções do pipeline a partir deste módulo
+from zenodo_client.jobs.pipeline import (  # noqa: F401
+    add_metadata, archive_uploaded_file, configure, create_new_deposition, get_api_client, iter_account_depositions,
+    load_queue_metadata, open_job_stores, print_metadata_stats, print_rate_limit_stats, print_validation_errors,
+    process_file_for_upload, process_files_for_upload, process_new_version, process_upload_queue,
+    publish_deposition, rebuild_dedup_index, run_bulk_ingest, upload_file, watch_upload_queue)
 
 # --- FUNÇÕES DE INTERAÇÃO COM O USUÁRIO (mantidas para o modo interativo existente) ---
 
@@ -239,6 +63,22 @@ def get_user_inputs():
 
     upload_type = UPLOAD_TYPES[choice - 1]
 
+    # Subtipo exigido pela API para publicações e imagens
+    subtypes = {'publication': ('publication_type', PUBLICATION_TYPES), 'image': ('image_type', IMAGE_TYPES)}
+    subtype = None
+    if upload_type in subtypes:
+        subtype_field, subtype_options = subtypes[upload_type]
+        print(f"\nSelecione o subtipo ({subtype_field}):")
+        for i, name in enumerate(subtype_options):
+            print(f"  [{i+1}] {name}")
+        choice = 0
+        while not (1 <= choice <= len(subtype_options)):
+            try:
+                choice = int(input(f"? Escolha uma opção [1-{len(subtype_options)}]: "))
+            except ValueError:
+                print("! Entrada inválida. Digite o número correspondente.")
+        subtype = subtype_options[choice - 1]
+
     # Adicionando licença CC BY 4.0 por padrão
     metadata = {
         'title': title,
@@ -248,6 +88,8 @@ def get_user_inputs():
         'access_right': 'open', # Defaulting to open access
         'license': 'cc-by-4.0' # Setting default license
     }
+    if subtype:
+        metadata[subtype_field] = subtype
 
 
     return {
@@ -261,31 +103,88 @@ def get_user_inputs():
 def main():
     """Configura e executa o modo CLI ou o modo de monitoramento de pasta."""
     parser = argparse.ArgumentParser(description="Script para automatizar uploads no Zenodo.")
-    parser.add_argument("--file", help="Caminho do arquivo para upload.")
+    parser.add_argument("--file", action='append', help="Caminho do arquivo para upload. Use múltiplos para enviar vários arquivos em um único depósito.")
+    parser.add_argument("--dir", help="Pasta cujos arquivos serão enviados juntos em um único depósito.")
+    parser.add_argument("--parallel-uploads", type=int, default=4, help="Transferências simultâneas no modo de múltiplos arquivos (padrão: 4).")
+    parser.add_argument("--upload-retries", type=int, default=3, help="Retentativas por arquivo no modo de múltiplos arquivos (padrão: 3).")
+    parser.add_argument("--draft", type=int, help="ID de um rascunho existente para continuar um depósito de múltiplos arquivos.")
+    parser.add_argument("--new-version", type=int, metavar="ID", help="Publica uma nova versão do depósito ID com --file/--dir, enviando só os arquivos novos ou alterados.")
+    parser.add_argument("--version-label", help="Com --new-version: valor do campo 'version' (ex.: v2.0).")
     parser.add_argument("--title", help="Título da publicação.")
     parser.add_argument("--desc", help="Descrição da publicação.")
     # Permite múltiplos criadores: --creator "Silva, J" --creator "Souza, M"
     parser.add_argument("--creator", action='append', help="Criador no formato 'Nome, Sobrenome'. Use múltiplos para adicionar mais de um.")
     parser.add_argument("--type", choices=UPLOAD_TYPES, help="Tipo de publicação.")
+    parser.add_argument("--publication-type", choices=PUBLICATION_TYPES, help="Subtipo, obrigatório com --type publication (ex.: article).")
+    parser.add_argument("--image-type", choices=IMAGE_TYPES, help="Subtipo, obrigatório com --type image (ex.: figure).")
     # Adicionado argumento para ativar o modo de monitoramento de pasta
     parser.add_argument("--monitor", action='store_true', help="Ativa o modo de monitoramento da pasta 'upload_queue'.")
+    parser.add_argument("--watch", action='store_true', help="Com --monitor: fica em execução e envia novos arquivos assim que estiverem completos.")
+    parser.add_argument("--settle", type=float, default=0.5, help="Segundos sem alteração de tamanho/mtime para considerar um arquivo completo (padrão: 0.5).")
+    parser.add_argument("--job-store", help=f"Banco de jobs para retomar uploads interrompidos (padrão: {JOB_STORE_FILE}).")
+    parser.add_argument("--rebuild-index", action='store_true', help="Reconstrói o índice de duplicidade a partir dos depósitos da conta e sai.")
+    parser.add_argument("--workers", type=int, default=4, help="Número de uploads simultâneos no modo --monitor (padrão: 4).")
+    parser.add_argument("--bulk", help="Manifesto JSONL ou CSV (arquivo + metadados por linha) para envio em massa.")
+    parser.add_argument("--results", help="Manifesto de resultados do --bulk (padrão: <manifesto>.results.jsonl; .csv também aceito).")
+    parser.add_argument("--restart", action='store_true', help="Com --bulk: ignora o checkpoint, sobrescreve os resultados e começa do início do manifesto.")
+    parser.add_argument("--metadata-command", help="Comando que imprime o JSON de metadados de um arquivo ({file} = caminho). Padrão: ZENODO_METADATA_COMMAND.")
+    parser.add_argument("--metadata-workers", type=int, help="Gerações de metadados simultâneas no modo --monitor (padrão: ZENODO_METADATA_WORKERS ou 2).")
+    parser.add_argument("--trace-file", help="Grava a duração de cada chamada à API e etapa do pipeline neste arquivo JSON-lines.")
+    parser.add_argument("--metrics-file", help="Grava métricas no formato Prometheus neste arquivo (textfile collector).")
+    parser.add_argument("--metrics-port", type=int, help="Expõe métricas Prometheus em http://127.0.0.1:PORTA/metrics.")
 
 
     args = parser.parse_args()
 
+    # Token e URL lidos só agora (ambiente ou .env); sem token, encerra com EnvironmentError
+    get_access_token()
+    print(f"Usando URL da API: {get_depositions_url()}")
+    print("Token encontrado")
+
+    # Mensagens das bibliotecas (zenodo_client) no console, como antes
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Instrumentação desligada por padrão; ativada por argumentos ou ZENODO_TRACE_FILE/ZENODO_METRICS_*
+    instrumentation.configure(args.trace_file, args.metrics_file, args.metrics_port)
+
     # Defina o caminho da pasta de monitoramento (magic folder)
-    upload_queue_folder = os.path.join(os.path.dirname(__file__), "upload_queue")
+    upload_queue_folder = os.path.join(os.path.dirname(__file__), UPLOAD_QUEUE_FOLDER)
     # Defina o caminho da pasta de arquivos enviados
     archive_folder_path = os.path.join(os.path.dirname(__file__), ARCHIVE_FOLDER)
 
     # Certifique-se de que a pasta de arquivos enviados exista
     os.makedirs(archive_folder_path, exist_ok=True)
 
+    # Progresso persistente dos uploads (retomado automaticamente após falhas), índice de
+    # duplicidade e cache de metadados, no mesmo banco
+    job_store_path = args.job_store or os.path.join(os.path.dirname(__file__), JOB_STORE_FILE)
+    job_store, dedup_index, generator = open_job_stores(job_store_path, args.metadata_command,
+                                                        args.metadata_workers)
+
+    if args.rebuild_index:
+        rebuild_dedup_index(dedup_index, job_store)
+        return
+
+    file_paths = collect_files(args.file, args.dir)
+
+    # Nova versão de um depósito publicado: metadados da versão anterior, com o que for informado por cima
+    if args.new_version:
+        if not file_paths:
+            parser.error("--new-version requer --file ou --dir")
+        updates = {'title': args.title, 'description': args.desc, 'upload_type': args.type,
+                   'publication_type': args.publication_type, 'image_type': args.image_type,
+                   'version': args.version_label}
+        updates = {k: v for k, v in updates.items() if v}
+        if args.creator:
+            updates['creators'] = [{'name': name, 'affiliation': ''} for name in args.creator]
+        configure_session(pool_size=max(HTTP_POOL_SIZE, args.parallel_uploads))
+        process_new_version(args.new_version, file_paths, updates, max_in_flight=args.parallel_uploads,
+                            retries=args.upload_retries)
+
     # Modo CLI (se --file e outros argumentos forem fornecidos)
-    if args.file and args.title and args.creator and args.type:
+    elif file_paths and args.title and args.creator and args.type:
         print("Modo não-interativo (via argumentos de linha de comando) detectado.")
         user_data = {
-            'file_path': args.file,
+            'file_path': file_paths[0],
             'metadata': {
                 'title': args.title,
                 'upload_type': args.type,
@@ -295,83 +194,42 @@ def main():
                 'license': 'cc-by-4.0' # Setting default license for CLI mode
             }
         }
-        process_file_for_upload(user_data['file_path'], user_data['metadata'], archive_folder_path)
+        if args.publication_type:
+            user_data['metadata']['publication_type'] = args.publication_type
+        if args.image_type:
+            user_data['metadata']['image_type'] = args.image_type
+        if len(file_paths) > 1 or args.dir or args.draft:
+            configure_session(pool_size=max(HTTP_POOL_SIZE, args.parallel_uploads))
+            process_files_for_upload(file_paths, user_data['metadata'], max_in_flight=args.parallel_uploads,
+                                     retries=args.upload_retries, draft_id=args.draft)
+            return
+        process_file_for_upload(user_data['file_path'], user_data['metadata'], archive_folder_path, job_store, dedup_index)
+
+    # Modo de envio em massa a partir de um manifesto
+    elif args.bulk:
+        configure_session(pool_size=max(HTTP_POOL_SIZE, args.workers))
+        run_bulk_ingest(args.bulk, args.results, job_store, dedup_index, workers=args.workers, restart=args.restart)
+
+    # Modo Monitoramento contínuo (daemon) da pasta
+    elif args.monitor and args.watch:
+        os.makedirs(upload_queue_folder, exist_ok=True)
+        # Um pool de conexões pelo menos do tamanho do número de workers
+        configure_session(pool_size=max(HTTP_POOL_SIZE, args.workers))
+        watch_upload_queue(upload_queue_folder, archive_folder_path, job_store, dedup_index, generator,
+                           workers=args.workers, settle_time=args.settle)
 
     # Modo Monitoramento de Pasta (se --monitor for ativado)
     elif args.monitor:
-        print(f"Iniciando monitoramento da pasta mágica: {upload_queue_folder}")
-        # !!! IMPLEMENTAÇÃO DO WATCHDOG VIRÁ AQUI !!!
-        # Por enquanto, processa arquivos existentes e depois fica inativo ou espera por nova implementação.
-        print("!!! A funcionalidade de monitoramento em tempo real com 'watchdog' não está totalmente implementada nesta versão. !!!")
-        print("!!! O script irá apenas processar arquivos .pdf existentes na pasta 'upload_queue' e sair. !!!")
-
-
-        # Processar arquivos existentes na pasta 'upload_queue' (exemplo simples)
-        files_in_queue = [f for f in os.listdir(upload_queue_folder) if f.lower().endswith('.pdf') and not f.startswith('.')] # Only process PDFs, ignore hidden files
-        if not files_in_queue:
-            print(f"Nenhum arquivo .pdf encontrado na pasta de monitoramento '{upload_queue_folder}'.")
-
-        for filename in files_in_queue:
-            file_path_to_process = os.path.join(upload_queue_folder, filename)
-            metadata_file_path = os.path.join(upload_queue_folder, "metadata.json") # Assumes metadata.json is generated here
-
-            print(f"\nProcessando arquivo: {file_path_to_process}")
-
-            # --- Gerar Metadados via Fabric (Etapa que você já implementou externamente) ---
-            # Esta parte conceitualmente chama seu comando fabric.
-            # Exemplo (descomente e ajuste conforme sua configuração):
-            # try:
-            #     print(f"Executando comando fabric para gerar metadados para {filename}...")
-            #     # Assumes 'fabric' command is in your PATH
-            #     # Assumes 'create_zenodo_json' is the task name in your tasks.py/fabfile.py
-            #     # You might need to pass file_path_to_process to your fabric task
-            #     subprocess.run(['fabric', '-ps', 'create_zenodo_json', file_path_to_process], 
-            #                    stdout=open(metadata_file_path, 'w'), check=True)
-            #     print("Comando fabric executado com sucesso.")
-            # except FileNotFoundError:
-            #     print("!!! Erro: Comando 'fabric' não encontrado. Certifique-se de que o fabric esteja instalado e acessível no PATH.")
-            #     continue # Skip this file
-            # except subprocess.CalledProcessError as e:
-            #     print(f"!!! Erro ao executar comando fabric: {e}")
-            #     print("!!! Verifique sua tarefa 'create_zenodo_json' e a saída gerada.")
-            #     continue # Skip this file
-            # except Exception as e:
-            #      print(f"!!! Erro inesperado ao chamar fabric: {e}")
-            #      continue # Skip this file
-
-            # --- Carregar metadados do arquivo JSON gerado ---
-            # Adicionado um pequeno delay para garantir que o arquivo metadata.json seja salvo após a chamada externa do fabric
-            time.sleep(1) # Adjust delay if needed
-
-            try:
-                with open(metadata_file_path, 'r', encoding='utf-8') as f:
-                    metadata_from_file = json.load(f)
-                # Garantir que a licença seja CC BY 4.0, sobrescrevendo se necessário
-                metadata_from_file['license'] = 'cc-by-4.0'
-                print("Metadados carregados e licença definida para CC BY 4.0.")
-            except FileNotFoundError:
-                print(f"!!! Erro: metadata.json não encontrado para {filename} após a chamada do fabric. Pulando este arquivo.")
-                continue # Skip this file
-            except json.JSONDecodeError:
-                print(f"!!! Erro: metadata.json inválido para {filename}. Verifique o conteúdo gerado pelo fabric. Pulando este arquivo.")
-                continue # Skip this file
-            except Exception as e:
-                 print(f"!!! Erro inesperado ao carregar metadados: {e}. Pulando este arquivo.")
-                 continue # Skip this file
-
-
-            # --- Processar o arquivo e metadados ---
-            process_file_for_upload(file_path_to_process, metadata_from_file, archive_folder_path)
-
-        print("\nProcessamento de arquivos existentes na pasta de monitoramento concluído.")
-        print("Para monitoramento contínuo, a implementação com 'watchdog' é necessária.")
-
+        # Um pool de conexões pelo menos do tamanho do número de workers
+        configure_session(pool_size=max(HTTP_POOL_SIZE, args.workers))
+        process_upload_queue(upload_queue_folder, archive_folder_path, job_store, dedup_index, generator,
+                             workers=args.workers)
 
     # Modo Interativo (se nenhum argumento for fornecido)
     else:
         print("Iniciando modo interativo...")
         user_data = get_user_inputs()
-        process_file_for_upload(user_data['file_path'], user_data['metadata'], archive_folder_path)
+        process_file_for_upload(user_data['file_path'], user_data['metadata'], archive_folder_path, job_store, dedup_index)
 
 
 if __name__ == '__main__':